@@ -0,0 +1,30 @@
+"""parsing_runs_parser_node_url
+
+Revision ID: 7c3e91a4b2d8
+Revises: 99235fd52ce6
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c3e91a4b2d8"
+down_revision: str | None = "99235fd52ce6"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    # parser_service node that received the run (multi-node setups)
+    op.add_column(
+        "parsing_runs", sa.Column("parser_node_url", sa.String(length=255), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("parsing_runs", "parser_node_url")
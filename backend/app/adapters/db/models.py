@@ -185,6 +185,8 @@ class ParsingRunModel(Base):
         ForeignKey("parsing_requests.id", ondelete="CASCADE"), nullable=False, index=True
     )
     parser_task_id: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    # parser_service node that owns parser_task_id (results are fetched from it)
+    parser_node_url: Mapped[str | None] = mapped_column(String(255), nullable=True)
     status: Mapped[str] = mapped_column(String(32), nullable=False, index=True)
     depth: Mapped[int | None] = mapped_column(Integer, nullable=True)
     source: Mapped[str | None] = mapped_column(String(32), nullable=True)
@@ -1,7 +1,7 @@
 import json
 from datetime import UTC, datetime
 
-from sqlalchemy import delete, func, select
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -570,6 +570,7 @@ class ParsingRepository:
         depth: int | None = None,
         source: str | None = None,
         parser_task_id: str | None = None,
+        parser_node_url: str | None = None,
     ) -> ParsingRunModel:
         run = ParsingRunModel(
             run_id=run_id,
@@ -578,6 +579,7 @@ class ParsingRepository:
             depth=depth,
             source=source,
             parser_task_id=parser_task_id,
+            parser_node_url=parser_node_url,
         )
         self._session.add(run)
         await self._session.flush()
@@ -611,6 +613,32 @@ class ParsingRepository:
                 run.finished_at = finished_at
             await self._session.flush()
 
+    async def claim_parsing_run_finalization(
+        self,
+        run_id: str,
+        status: str,
+        error_message: str | None = None,
+        finished_at: datetime | None = None,
+    ) -> bool:
+        """
+        Move an unfinished run (queued/running) to its final status.
+        Conditional UPDATE: only one of concurrent callers (callback, poller) wins.
+        """
+        stmt = (
+            update(ParsingRunModel)
+            .where(
+                ParsingRunModel.run_id == run_id,
+                ParsingRunModel.status.in_(("queued", "running")),
+            )
+            .values(status=status, error_message=error_message, finished_at=finished_at)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self._session.execute(stmt)
+        return result.rowcount == 1
+
+    async def get_parsing_request(self, request_id: int) -> ParsingRequestModel | None:
+        return await self._session.get(ParsingRequestModel, request_id)
+
     async def list_parsing_runs(
         self, limit: int = 50, offset: int = 0
     ) -> list[ParsingRunModel]:
@@ -672,6 +700,16 @@ class ParsingRepository:
         result = await self._session.execute(stmt)
         return list(result.scalars().all())
 
+    async def get_known_domains(self) -> list[str]:
+        """
+        Domains a moderator has already handled: blacklisted root domains and domains with a decision.
+        """
+        from app.adapters.db.models import DomainBlacklistDomainModel, DomainDecisionModel
+        
+        blacklist_result = await self._session.execute(select(DomainBlacklistDomainModel.root_domain))
+        decision_result = await self._session.execute(select(DomainDecisionModel.domain))
+        return sorted(set(blacklist_result.scalars().all()) | set(decision_result.scalars().all()))
+    
     async def get_pending_domains(
         self,
         limit: int = 50,
@@ -684,17 +722,8 @@ class ParsingRepository:
         Returns: list of (domain, total_hits, url_count, first_seen_at, last_hit_at)
         """
         from sqlalchemy import func, and_
-        from app.adapters.db.models import DomainBlacklistDomainModel, DomainDecisionModel
-        
-        # Get blacklisted domains
-        blacklist_stmt = select(DomainBlacklistDomainModel.root_domain)
-        blacklist_result = await self._session.execute(blacklist_stmt)
-        blacklisted = set(blacklist_result.scalars().all())
         
-        # Get domains with decisions
-        decision_stmt = select(DomainDecisionModel.domain)
-        decision_result = await self._session.execute(decision_stmt)
-        decided = set(decision_result.scalars().all())
+        known = await self.get_known_domains()
         
         # Get all domains from hits, excluding blacklisted and decided
         stmt = (
@@ -705,8 +734,7 @@ class ParsingRepository:
                 func.min(ParsingHitModel.created_at).label("first_seen_at"),
                 func.max(ParsingHitModel.created_at).label("last_hit_at"),
             )
-            .where(~ParsingHitModel.domain.in_(blacklisted))
-            .where(~ParsingHitModel.domain.in_(decided))
+            .where(~ParsingHitModel.domain.in_(known))
             .group_by(ParsingHitModel.domain)
         )
         
@@ -10,26 +10,39 @@ from app.config import settings
 
 
 class ParserServiceClient:
-    def __init__(self, base_url: str | None = None):
+    def __init__(self, base_url: str | None = None, transport: httpx.AsyncBaseTransport | None = None):
         self.base_url = base_url or settings.PARSER_SERVICE_URL
+        # Custom transport (in-process fake parser apps in tests)
+        self.transport = transport
 
     async def start_parse(
-        self, keyword: str, depth: int, mode: str
+        self,
+        keyword: str,
+        depth: int,
+        mode: str,
+        callback_url: str | None = None,
+        priority: str = "interactive",
+        known_domains: list[str] | None = None,
     ) -> dict[str, Any]:
         """
         POST /parse
-        Request: { keyword, depth (1-10), mode ("yandex"/"google"/"both") }
-        Response: { task_id, message, started_at }
+        Request: { keyword, depth (1-10), mode ("yandex"/"google"/"both"), priority, callback_url?,
+                   early_stop?, known_domains? }
+        Response: { task_id, message, started_at, queue_position, estimated_start_seconds }
         """
+        payload = {"keyword": keyword, "depth": depth, "mode": mode, "priority": priority}
+        if callback_url:
+            payload["callback_url"] = callback_url
+        payload.update(self._early_stop_options(known_domains))
         headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
         }
-        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True) as client:
+        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True, transport=self.transport) as client:
             try:
                 response = await client.post(
                     f"{self.base_url}/parse",
-                    json={"keyword": keyword, "depth": depth, "mode": mode},
+                    json=payload,
                     headers=headers,
                 )
                 response.raise_for_status()
@@ -47,12 +60,67 @@ class ParserServiceClient:
                 logger.error(f"Parser service connection error: {str(e)}")
                 raise
 
+    async def start_batch_parse(
+        self,
+        keywords: list[str],
+        depth: int,
+        mode: str,
+        callback_url: str | None = None,
+        priority: str = "bulk",
+        known_domains: list[str] | None = None,
+    ) -> dict[str, Any]:
+        """
+        POST /parse/batch
+        Request: { keywords: list[str], depth (1-10), mode ("yandex"/"google"/"both"), priority, callback_url?,
+                   early_stop?, known_domains? }
+        Response: { task_id, message, started_at, queue_position, estimated_start_seconds, keywords_count }
+        """
+        payload = {"keywords": keywords, "depth": depth, "mode": mode, "priority": priority}
+        if callback_url:
+            payload["callback_url"] = callback_url
+        payload.update(self._early_stop_options(known_domains))
+        async with httpx.AsyncClient(timeout=60.0, follow_redirects=True, transport=self.transport) as client:
+            try:
+                response = await client.post(
+                    f"{self.base_url}/parse/batch",
+                    json=payload,
+                    headers={"Content-Type": "application/json", "Accept": "application/json"},
+                )
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPStatusError as e:
+                import logging
+                logger = logging.getLogger(__name__)
+                logger.error(f"Parser service HTTP error: {e.response.status_code} - {e.response.text}")
+                raise
+            except httpx.RequestError as e:
+                import logging
+                logger = logging.getLogger(__name__)
+                logger.error(f"Parser service connection error: {str(e)}")
+                raise
+
+    @staticmethod
+    def _early_stop_options(known_domains: list[str] | None) -> dict[str, Any]:
+        """Early stop on known domains; None leaves the parser_service default."""
+        if known_domains is None:
+            return {}
+        return {"early_stop": True, "known_domains": known_domains}
+
+    @staticmethod
+    def callback_url(run_id: str) -> str | None:
+        """Backend endpoint parser_service pushes run completion to (None: callbacks disabled)."""
+        base = settings.PARSER_CALLBACK_BASE_URL.rstrip("/")
+        if not base:
+            return None
+        return f"{base}/moderator/parsing-runs/{run_id}/callback"
+
     async def get_results(self, task_id: str) -> dict[str, Any]:
         """
         GET /results/{task_id}
-        Response: { status: "running"|"completed"|"failed", links?: list[str], error?: str }
+        Response: { status: "queued"|"running"|"completed"|"failed"|"cancelled"|"partial", links?: list[str], error?: str }
+        Batch tasks also return keywords: { <keyword>: { status, links?, error? } }
         """
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async with httpx.AsyncClient(timeout=30.0, transport=self.transport) as client:
             response = await client.get(f"{self.base_url}/results/{task_id}")
             response.raise_for_status()
             return response.json()
@@ -61,7 +129,7 @@ class ParserServiceClient:
         """
         GET /health
         """
-        async with httpx.AsyncClient(timeout=10.0) as client:
+        async with httpx.AsyncClient(timeout=10.0, transport=self.transport) as client:
             response = await client.get(f"{self.base_url}/health")
             response.raise_for_status()
             return response.json()
@@ -0,0 +1,145 @@
+"""
+Registry of parser_service nodes: health, capacity and queue depth from each node's /health.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from app.adapters.parser_client import ParserServiceClient
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ParserNode:
+    url: str
+    healthy: bool = True
+    workers: int = 1
+    queue_depth: int = 0
+    running: int = 0
+    parked: int = 0
+    checked_at: float = 0.0
+    error: str | None = None
+
+    @property
+    def load(self) -> float:
+        """Queued + actively running tasks per worker (parked tasks hold no worker)."""
+        return (self.queue_depth + self.running - self.parked) / max(self.workers, 1)
+
+    def apply_health(self, health: dict[str, Any]) -> None:
+        scheduler = health.get("scheduler") or {}
+        self.healthy = health.get("status") == "ok"
+        self.workers = int(scheduler.get("workers") or 1)
+        self.queue_depth = int(scheduler.get("queue_depth") or 0)
+        self.running = int(scheduler.get("running") or 0)
+        self.parked = int(scheduler.get("parked") or 0)
+        self.error = None if self.healthy else f"status={health.get('status')}"
+
+
+class ParserNodeRegistry:
+    """
+    Parser nodes from settings.parser_service_urls.
+    Health is refreshed lazily, at most once per ttl; with a single node nothing is polled.
+    """
+
+    def __init__(
+        self,
+        urls: list[str] | None = None,
+        ttl: float | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        urls = urls or settings.parser_service_urls
+        self.nodes = {url: ParserNode(url=url) for url in urls}
+        self.ttl = settings.PARSER_NODE_HEALTH_TTL_SECONDS if ttl is None else ttl
+        self.transport = transport
+
+    def client(self, url: str) -> ParserServiceClient:
+        return ParserServiceClient(url, transport=self.transport)
+
+    async def _check(self, node: ParserNode) -> None:
+        try:
+            node.apply_health(await self.client(node.url).health_check())
+        except Exception as e:
+            node.healthy = False
+            node.error = str(e) or type(e).__name__
+            logger.warning(f"Parser node {node.url} is unhealthy: {node.error}")
+        node.checked_at = time.monotonic()
+
+    async def refresh(self, force: bool = False) -> None:
+        if len(self.nodes) < 2 and not force:
+            return
+        stale = [
+            node
+            for node in self.nodes.values()
+            if force or time.monotonic() - node.checked_at >= self.ttl
+        ]
+        if stale:
+            await asyncio.gather(*(self._check(node) for node in stale))
+
+    async def ranked(self) -> list[ParserNode]:
+        """Healthy nodes by load, then unhealthy ones (still tried as a last resort)."""
+        await self.refresh()
+        return sorted(self.nodes.values(), key=lambda node: (not node.healthy, node.load))
+
+    def mark_dispatched(self, node: ParserNode) -> None:
+        # Local estimate until the next /health refresh, so a burst of runs spreads out
+        node.queue_depth += 1
+
+    def mark_failed(self, node: ParserNode, error: Exception) -> None:
+        node.healthy = False
+        node.error = str(error) or type(error).__name__
+        node.checked_at = time.monotonic()
+
+    async def dispatch(
+        self,
+        start: Callable[[ParserServiceClient], Awaitable[dict[str, Any]]],
+        client_factory: Callable[[str], ParserServiceClient] | None = None,
+    ) -> tuple[dict[str, Any], str]:
+        """
+        Run start(client) on the least-loaded node and return (result, node url).
+        Connection errors and 503 (queue full) fall over to the next node;
+        the last error is raised when every node refused.
+        """
+        client_factory = client_factory or self.client
+        last_error: Exception | None = None
+        for node in await self.ranked():
+            try:
+                result = await start(client_factory(node.url))
+            except httpx.RequestError as e:
+                self.mark_failed(node, e)
+                last_error = e
+                continue
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code != 503:
+                    raise
+                logger.warning(f"Parser node {node.url} queue is full, trying next node")
+                last_error = e
+                continue
+            self.mark_dispatched(node)
+            return result, node.url
+        assert last_error is not None
+        raise last_error
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [
+            {
+                "url": node.url,
+                "healthy": node.healthy,
+                "workers": node.workers,
+                "queueDepth": node.queue_depth,
+                "running": node.running,
+                "load": round(node.load, 3),
+                "error": node.error,
+            }
+            for node in self.nodes.values()
+        ]
+
+
+parser_nodes = ParserNodeRegistry()
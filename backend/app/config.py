@@ -23,12 +23,36 @@ class Settings(BaseSettings):
         default="http://127.0.0.1:9003",
         validation_alias=AliasChoices("PARSER_SERVICE_URL", "PARSERSERVICEURL")
     )
+    # Comma-separated parser_service nodes; runs go to the least-loaded one.
+    # Empty: single node at PARSER_SERVICE_URL.
+    PARSER_SERVICE_URLS: str = Field(
+        default="",
+        validation_alias=AliasChoices("PARSER_SERVICE_URLS", "PARSERSERVICEURLS")
+    )
+    # How long a node's /health snapshot is trusted before it is polled again
+    PARSER_NODE_HEALTH_TTL_SECONDS: float = 5.0
+    # Public URL of this backend as seen from parser_service (e.g. http://127.0.0.1:8000).
+    # Empty: no callbacks, run results are polled from parser_service on read.
+    PARSER_CALLBACK_BASE_URL: str = Field(
+        default="",
+        validation_alias=AliasChoices("PARSER_CALLBACK_BASE_URL", "PARSERCALLBACKBASEURL")
+    )
+    # With callbacks on, poll parser_service only for runs older than this (lost callback)
+    PARSER_CALLBACK_FALLBACK_SECONDS: int = 3600
+    # Ask parser_service to stop paging a keyword once result pages stop yielding
+    # new domains; blacklisted and already decided domains are sent as known
+    PARSER_EARLY_STOP: bool = False
 
     @property
     def DATABASE_URL(self) -> str:
         # Back-compat for older code paths
         return self.DATABASEURL
 
+    @property
+    def parser_service_urls(self) -> list[str]:
+        urls = [u.strip().rstrip("/") for u in self.PARSER_SERVICE_URLS.split(",") if u.strip()]
+        return urls or [self.PARSER_SERVICE_URL.rstrip("/")]
+
     ALLOWED_ORIGINS: str = ""
     JWT_SECRET: str = "change_me_dev_only"
 
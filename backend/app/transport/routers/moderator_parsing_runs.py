@@ -7,6 +7,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.adapters.db.session import get_db_session
 from app.transport.schemas.moderator_parsing import (
     ManualParsingRequestDTO,
+    ParserCallbackDTO,
+    ParserCallbackResponseDTO,
     ParsingResultsResponseDTO,
     ParsingStatusResponseDTO,
     StartParsingRequestDTO,
@@ -18,6 +20,10 @@ from app.transport.schemas.moderator_parsing_logs import (
 from app.usecases.get_parsing_results import get_parsing_results
 from app.usecases.get_parsing_run_logs import get_parsing_run_logs
 from app.usecases.get_parsing_status import get_parsing_status
+from app.usecases.ingest_parser_callback import (
+    ParserCallbackMismatchError,
+    ingest_parser_callback,
+)
 from app.usecases.list_parsing_runs import list_parsing_runs as list_parsing_runs_uc
 from app.usecases.start_parsing import manual_parsing, start_parsing
 
@@ -119,6 +125,30 @@ async def get_parsing_run_detail(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post(
+    "/moderator/parsing-runs/{runId}/callback",
+    response_model=ParserCallbackResponseDTO,
+)
+async def parser_callback_endpoint(
+    run_id: Annotated[str, Path(alias="runId")],
+    payload: ParserCallbackDTO,
+    session: AsyncSession = Depends(get_db_session),
+) -> ParserCallbackResponseDTO:
+    """
+    Progress/completion push from parser_service (ParseRequest.callback_url).
+    Repeated completion callbacks are acknowledged with finalized=false.
+    """
+    try:
+        return await ingest_parser_callback(run_id, payload, session)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ParserCallbackMismatchError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.exception("Error in parser_callback_endpoint")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
 @router.get("/moderator/parsing-runs/{runId}/logs")
 async def get_parsing_run_logs_endpoint(
     run_id: Annotated[str, Path(alias="runId")],
@@ -7,7 +7,7 @@ from __future__ import annotations
 
 from enum import Enum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class ParsingRunStatus(str, Enum):
@@ -17,6 +17,9 @@ class ParsingRunStatus(str, Enum):
     running = "running"
     succeeded = "succeeded"
     failed = "failed"
+    # Stopped from parser_service (DELETE /tasks) / deadline hit; links found so far are kept
+    cancelled = "cancelled"
+    partial = "partial"
 
 
 class StartParsingResponseDTO(BaseModel):
@@ -114,3 +117,37 @@ class ParsingResultsResponseDTO(BaseModel):
 
     class Config:
         populate_by_name = True
+
+
+class ParserCallbackEvent(str, Enum):
+    """SSoT: api-contracts.yaml#/components/schemas/ParserCallbackEvent"""
+
+    progress = "progress"
+    completed = "completed"
+    failed = "failed"
+    cancelled = "cancelled"
+    partial = "partial"
+
+
+class ParserCallbackDTO(BaseModel):
+    """SSoT: api-contracts.yaml#/components/schemas/ParserCallbackDTO"""
+
+    model_config = ConfigDict(extra="ignore")
+
+    event: ParserCallbackEvent
+    task_id: str
+    links: list[str] = Field(default_factory=list)
+    keywords: dict[str, dict] | None = None
+    error: str | None = None
+    engine: str | None = None
+    page: int | None = None
+    keyword: str | None = None
+    # Final events: result pages skipped by early stop
+    pages_saved: int | None = None
+
+
+class ParserCallbackResponseDTO(BaseModel):
+    """SSoT: api-contracts.yaml#/components/schemas/ParserCallbackResponseDTO"""
+
+    accepted: bool
+    finalized: bool
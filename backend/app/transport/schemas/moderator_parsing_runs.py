@@ -10,6 +10,8 @@ class ParsingRunStatus(str, Enum):
     RUNNING = "running"
     SUCCEEDED = "succeeded"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+    PARTIAL = "partial"
 
 
 class ParsingRunDTO(BaseModel):
@@ -0,0 +1,126 @@
+"""
+Finalize parsing run usecase.
+"""
+
+import json
+import logging
+from datetime import UTC, datetime
+from typing import Any
+from urllib.parse import urlparse
+
+from app.adapters.db.repositories import ParsingRepository
+
+logger = logging.getLogger(__name__)
+
+# parser_service final task statuses -> parsing run status.
+# cancelled (DELETE /tasks) and partial (deadline) runs keep the links found so far.
+RUN_STATUS_BY_PARSER_STATUS = {
+    "completed": "succeeded",
+    "failed": "failed",
+    "cancelled": "cancelled",
+    "partial": "partial",
+}
+PARSER_FINAL_STATUSES = tuple(RUN_STATUS_BY_PARSER_STATUS)
+
+
+def link_domain(link: str) -> str:
+    parsed = urlparse(link)
+    domain = parsed.netloc or parsed.path.split("/")[0]
+    return domain.lower().strip()
+
+
+async def finalize_parsing_run(
+    parsing_repo: ParsingRepository,
+    run_model: Any,
+    parser_result: dict[str, Any],
+) -> bool:
+    """
+    Store the final parser_service result of a run exactly once.
+
+    parser_result is the /results/{task_id} payload (or the completion callback
+    body): { status: "completed"|"failed"|"cancelled"|"partial", links?, keywords?, error? }.
+    Returns False if the run was already finalized by a concurrent caller.
+    """
+    parser_status = parser_result.get("status")
+    if parser_status not in PARSER_FINAL_STATUSES:
+        raise ValueError(f"Parser task is not finished: status={parser_status}")
+
+    status = RUN_STATUS_BY_PARSER_STATUS[parser_status]
+    error_msg = parser_result.get("error", "Unknown error") if status == "failed" else None
+    claimed = await parsing_repo.claim_parsing_run_finalization(
+        run_id=run_model.run_id,
+        status=status,
+        error_message=error_msg,
+        finished_at=datetime.now(UTC),
+    )
+    if not claimed:
+        logger.info(f"Parsing run {run_model.run_id} is already finalized, skipping")
+        return False
+
+    if status == "failed":
+        await parsing_repo.create_log(
+            run_id=run_model.id,
+            level="error",
+            message=f"Parsing failed: {error_msg}",
+            context=json.dumps({"error": error_msg}),
+        )
+        await parsing_repo.commit()
+        return True
+
+    links = parser_result.get("links") or []
+    parsing_request = await parsing_repo.get_parsing_request(run_model.request_id)
+    keywords_json = (
+        json.loads(parsing_request.raw_keys_json)
+        if parsing_request and parsing_request.raw_keys_json
+        else []
+    )
+    keyword = keywords_json[0] if keywords_json else "unknown"
+
+    # Batch runs report links per keyword; keep the first keyword that found a link
+    link_keywords: dict[str, str] = {}
+    for kw, kw_result in (parser_result.get("keywords") or {}).items():
+        for kw_link in kw_result.get("links") or []:
+            link_keywords.setdefault(kw_link, kw)
+
+    source = run_model.source or "yandex"
+    domains: set[str] = set()
+    for link in links:
+        try:
+            domain = link_domain(link)
+            if domain:
+                await parsing_repo.create_parsing_hit(
+                    run_id=run_model.id,
+                    keyword=link_keywords.get(link, keyword),
+                    url=link,
+                    domain=domain,
+                    source=source,
+                )
+                domains.add(domain)
+        except Exception as hit_err:
+            logger.warning(f"Failed to save hit for URL {link}: {hit_err}")
+
+    if status == "succeeded":
+        level, message = (
+            "info",
+            f"Parsing completed successfully. Found {len(links)} links, saved to database.",
+        )
+    else:
+        reason = "cancelled" if status == "cancelled" else "stopped at its deadline"
+        level, message = (
+            "warn",
+            f"Parsing {reason}. Kept {len(links)} links found before it stopped.",
+        )
+    context = {"links_count": len(links), "domains_count": len(domains)}
+    # Result pages the parser skipped because they stopped yielding new domains
+    pages_saved = parser_result.get("pages_saved") or 0
+    if pages_saved:
+        message += f" Early stop skipped {pages_saved} result pages."
+        context["pages_saved"] = pages_saved
+    await parsing_repo.create_log(
+        run_id=run_model.id,
+        level=level,
+        message=message,
+        context=json.dumps(context),
+    )
+    await parsing_repo.commit()
+    return True
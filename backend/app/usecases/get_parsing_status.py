@@ -13,6 +13,14 @@ from app.transport.schemas.moderator_parsing import (
 )
 
 
+def _run_status(status: str) -> ParsingRunStatus:
+    """DB run status -> API status; unknown values are reported as queued."""
+    try:
+        return ParsingRunStatus(status)
+    except ValueError:
+        return ParsingRunStatus.queued
+
+
 async def get_parsing_status(
     request_id: int,
     session: AsyncSession,
@@ -89,14 +97,7 @@ async def get_parsing_status(
         items_found = len(hits_for_key)
         
         # Determine status
-        if latest_run.status == "succeeded":
-            status = ParsingRunStatus.succeeded
-        elif latest_run.status == "failed":
-            status = ParsingRunStatus.failed
-        elif latest_run.status == "running":
-            status = ParsingRunStatus.running
-        else:
-            status = ParsingRunStatus.queued
+        status = _run_status(latest_run.status)
         
         key_statuses.append(
             ParsingKeyStatusDTO(
@@ -108,14 +109,7 @@ async def get_parsing_status(
         )
     
     # Determine overall status
-    if latest_run.status == "succeeded":
-        overall_status = ParsingRunStatus.succeeded
-    elif latest_run.status == "failed":
-        overall_status = ParsingRunStatus.failed
-    elif latest_run.status == "running":
-        overall_status = ParsingRunStatus.running
-    else:
-        overall_status = ParsingRunStatus.queued
+    overall_status = _run_status(latest_run.status)
     
     return ParsingStatusResponseDTO(
         requestId=request_id,
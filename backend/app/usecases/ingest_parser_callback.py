@@ -0,0 +1,72 @@
+"""
+Ingest parser_service callback usecase.
+"""
+
+import json
+import logging
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.adapters.db.repositories import ParsingRepository
+from app.transport.schemas.moderator_parsing import (
+    ParserCallbackDTO,
+    ParserCallbackEvent,
+    ParserCallbackResponseDTO,
+)
+from app.usecases.finalize_parsing_run import finalize_parsing_run
+
+logger = logging.getLogger(__name__)
+
+
+class ParserCallbackMismatchError(Exception):
+    """Callback task_id does not belong to the run."""
+
+
+async def ingest_parser_callback(
+    run_id: str,
+    dto: ParserCallbackDTO,
+    session: AsyncSession,
+) -> ParserCallbackResponseDTO:
+    """
+    Handle POST from parser_service for a run.
+    progress -> run log entry; completed/failed/cancelled/partial -> finalize the run (exactly once).
+    """
+    parsing_repo = ParsingRepository(session)
+    run_model = await parsing_repo.get_parsing_run_by_run_id(run_id)
+    if run_model is None:
+        raise ValueError(f"Parsing run {run_id} not found")
+    if run_model.parser_task_id and run_model.parser_task_id != dto.task_id:
+        raise ParserCallbackMismatchError(
+            f"Task {dto.task_id} does not belong to parsing run {run_id}"
+        )
+
+    if dto.event == ParserCallbackEvent.progress:
+        if run_model.status not in ("queued", "running"):
+            return ParserCallbackResponseDTO(accepted=False, finalized=False)
+        await parsing_repo.create_log(
+            run_id=run_model.id,
+            level="info",
+            message=f"Parsed {dto.engine} page {dto.page}: {len(dto.links)} links",
+            context=json.dumps(
+                {
+                    "task_id": dto.task_id,
+                    "keyword": dto.keyword,
+                    "engine": dto.engine,
+                    "page": dto.page,
+                    "links_count": len(dto.links),
+                }
+            ),
+        )
+        await parsing_repo.commit()
+        return ParserCallbackResponseDTO(accepted=True, finalized=False)
+
+    finalized = await finalize_parsing_run(
+        parsing_repo,
+        run_model,
+        dto.model_dump(include={"links", "keywords", "error", "pages_saved"})
+        | {"status": dto.event.value},
+    )
+    logger.info(
+        f"Parser callback for run_id={run_id}: event={dto.event.value}, finalized={finalized}"
+    )
+    return ParserCallbackResponseDTO(accepted=True, finalized=finalized)
@@ -79,7 +79,7 @@ async def list_keywords(
         
         # Compute status
         if last_run:
-            if last_run.status == "succeeded":
+            if last_run.status in ("succeeded", "partial"):
                 computed_status = KeywordStatus.parsed
             elif last_run.status == "failed":
                 computed_status = KeywordStatus.failed
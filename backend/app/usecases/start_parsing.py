@@ -12,7 +12,9 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.adapters.db.repositories import ParsingRepository, RequestRepository
 from app.adapters.parser_client import ParserServiceClient
+from app.adapters.parser_registry import parser_nodes
 from app.adapters.db.session import SessionLocal
+from app.config import settings
 from app.transport.schemas.moderator_parsing import (
     ParsingRunStatus,
     StartParsingRequestDTO,
@@ -74,6 +76,16 @@ async def _update_parsing_status_background(
             logger.error(f"Failed to update failed run in DB: {str(db_err)}")
 
 
+async def _early_stop_known_domains(parsing_repo: ParsingRepository) -> list[str] | None:
+    """
+    Domains the parser may treat as already known when PARSER_EARLY_STOP is on
+    (None: early stop is off, parser_service default applies).
+    """
+    if not settings.PARSER_EARLY_STOP:
+        return None
+    return await parsing_repo.get_known_domains()
+
+
 async def start_parsing(
     request_id: int,
     dto: StartParsingRequestDTO,
@@ -84,7 +96,7 @@ async def start_parsing(
     
     Architecture:
     1. Create parsing_request and parsing_run in DB
-    2. Call parser_service to start parsing (get task_id)
+    2. Call parser_service batch endpoint with all request keywords (get task_id)
     3. Save task_id and return runId immediately
     4. Parser service continues parsing in background
     """
@@ -109,8 +121,6 @@ async def start_parsing(
     if not keywords:
         raise ValueError(f"Request {request_id} has no keywords")
 
-    keyword_to_parse = keywords[0]
-    
     # Create parsing_request in DB
     parsing_request = await parsing_repo.create_parsing_request(
         raw_keys_json=json.dumps(keywords),
@@ -124,21 +134,30 @@ async def start_parsing(
     
     logger.info(f"Created parsing_request id={parsing_request.id}, run_id={base_run_id}")
     
-    # Try to call parser service
-    parser_client = ParserServiceClient()
+    # Try to call parser service: the whole request goes out as one batch
+    # to the least-loaded parser node
     task_id = None
+    node_url = None
     parser_status = "queued"
+    known_domains = await _early_stop_known_domains(parsing_repo)
     
     try:
-        logger.info(f"Calling parser service: keyword={keyword_to_parse}, depth={depth}, mode={source}")
-        result = await parser_client.start_parse(
-            keyword=keyword_to_parse,
-            depth=depth,
-            mode=source,
+        logger.info(f"Calling parser service: keywords={len(keywords)}, depth={depth}, mode={source}")
+        result, node_url = await parser_nodes.dispatch(
+            lambda client: client.start_batch_parse(
+                keywords=keywords,
+                depth=depth,
+                mode=source,
+                callback_url=ParserServiceClient.callback_url(base_run_id),
+                # Background request run: the parser serves manual parses first
+                priority="bulk",
+                known_domains=known_domains,
+            ),
+            client_factory=ParserServiceClient,
         )
         task_id = result.get("task_id")
         parser_status = "running"
-        logger.info(f"Parser service started successfully: task_id={task_id}")
+        logger.info(f"Parser service started successfully: task_id={task_id}, node={node_url}")
     except Exception as e:
         logger.error(f"Failed to call parser service: {str(e)}", exc_info=True)
         parser_status = "queued"
@@ -148,6 +167,7 @@ async def start_parsing(
         run_id=base_run_id,
         request_id=parsing_request.id,
         parser_task_id=task_id,
+        parser_node_url=node_url,
         status=parser_status,
         source=source,
         depth=depth,
@@ -190,10 +210,11 @@ async def manual_parsing(
     )
 
     run_id = str(uuid.uuid4())
-    parser_client = ParserServiceClient()
     task_id = None
+    node_url = None
     parser_status = "queued"
     error_msg = None
+    known_domains = await _early_stop_known_domains(parsing_repo)
 
     try:
         logger.info(f"Calling parser service for manual parsing: keyword={keyword}, depth={depth}, mode={source}")
@@ -202,23 +223,30 @@ async def manual_parsing(
         # Health check was causing 503 errors even when service is available
         # The parse endpoint will handle errors gracefully
         
-        result = await parser_client.start_parse(
-            keyword=keyword,
-            depth=depth,
-            mode=source,
+        result, node_url = await parser_nodes.dispatch(
+            lambda client: client.start_parse(
+                keyword=keyword,
+                depth=depth,
+                mode=source,
+                callback_url=ParserServiceClient.callback_url(run_id),
+                # A moderator is waiting at the screen
+                priority="interactive",
+                known_domains=known_domains,
+            ),
+            client_factory=ParserServiceClient,
         )
         task_id = result.get("task_id")
         parser_status = "running"
-        logger.info(f"Manual parser started successfully: task_id={task_id}")
+        logger.info(f"Manual parser started successfully: task_id={task_id}, node={node_url}")
     except (httpx.ConnectError, httpx.TimeoutException, httpx.HTTPStatusError) as e:
         # Handle connection/timeout/status errors
         logger.error(f"Parser service connection error: {str(e)}")
         parser_status = "failed"
-        error_msg = f"Parser service unavailable. Please start parser service on {parser_client.base_url}"
+        error_msg = f"Parser service unavailable. Please start parser service on {', '.join(parser_nodes.nodes)}"
     except ConnectionError as e:
         logger.error(f"Parser service unavailable: {str(e)}")
         parser_status = "failed"
-        error_msg = f"Parser service unavailable. Please start parser service on {parser_client.base_url}"
+        error_msg = f"Parser service unavailable. Please start parser service on {', '.join(parser_nodes.nodes)}"
     except Exception as e:
         logger.error(f"Manual parser call failed: {str(e)}", exc_info=True)
         parser_status = "failed"
@@ -230,6 +258,7 @@ async def manual_parsing(
         run_id=run_id,
         request_id=parsing_request.id,
         parser_task_id=task_id,
+        parser_node_url=node_url,
         status=parser_status,
         source=source,
         depth=depth,
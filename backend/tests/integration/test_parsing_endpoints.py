@@ -18,6 +18,9 @@ def mock_parser_client():
         client_instance.start_parse = AsyncMock(
             return_value={"task_id": "test-task-123", "message": "Started", "started_at": "2025-12-22T00:00:00Z"}
         )
+        client_instance.start_batch_parse = AsyncMock(
+            return_value={"task_id": "batch-task-123", "message": "Queued", "started_at": "2025-12-22T00:00:00Z"}
+        )
         client_instance.get_results = AsyncMock(
             return_value={"status": "completed", "links": ["https://example.com", "https://test.com"]}
         )
@@ -58,6 +61,37 @@ def test_start_parsing_success(mock_parser_client):
         assert data["status"] in ["queued", "running"]
 
 
+def test_start_parsing_sends_all_keys_in_one_batch(mock_parser_client):
+    """Test POST /moderator/requests/{requestId}/start-parsing - all keys fan out in one parser call."""
+    with TestClient(app) as client:
+        create_resp = client.post(
+            "/user/requests",
+            json={
+                "title": "Test Request",
+                "keys": [
+                    {"pos": 1, "text": "кирпич", "qty": 10, "unit": "pcs"},
+                    {"pos": 2, "text": "арматура", "qty": 5, "unit": "t"},
+                ]
+            }
+        )
+        assert create_resp.status_code == 200
+        request_id = create_resp.json()["requestid"]
+
+        response = client.post(
+            f"/moderator/requests/{request_id}/start-parsing",
+            json={"depth": 3, "source": "yandex"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "running"
+        mock_parser_client.start_batch_parse.assert_awaited_once()
+        kwargs = mock_parser_client.start_batch_parse.await_args.kwargs
+        assert kwargs["keywords"] == ["кирпич", "арматура"]
+        assert kwargs["depth"] == 3
+        assert kwargs["mode"] == "yandex"
+        mock_parser_client.start_parse.assert_not_awaited()
+
+
 def test_start_parsing_request_not_found():
     """Test POST /moderator/requests/{requestId}/start-parsing - request not found."""
     with TestClient(app) as client:
@@ -132,3 +166,84 @@ def test_get_parsing_run_detail_success(mock_parser_client):
         assert "runId" in data
         assert "results" in data
         assert isinstance(data["results"], list)
+
+
+def test_parser_callback_finalizes_run_once(mock_parser_client):
+    """Test POST /moderator/parsing-runs/{runId}/callback - completion is stored exactly once."""
+    with TestClient(app) as client:
+        create_resp = client.post(
+            "/user/requests",
+            json={
+                "title": "Test Request",
+                "keys": [
+                    {"pos": 1, "text": "test keyword", "qty": 10, "unit": "pcs"}
+                ]
+            }
+        )
+        assert create_resp.status_code == 200
+        request_id = create_resp.json()["requestid"]
+
+        start_resp = client.post(
+            f"/moderator/requests/{request_id}/start-parsing",
+            json={"depth": 1, "source": "yandex"}
+        )
+        assert start_resp.status_code == 200
+        run_id = start_resp.json()["runId"]
+
+        callback = {
+            "event": "completed",
+            "task_id": "batch-task-123",
+            "links": ["https://example.com/a", "https://example.com/b", "https://test.com"],
+            "keywords": {"test keyword": {"status": "completed", "links": ["https://example.com/a"]}},
+        }
+        first = client.post(f"/moderator/parsing-runs/{run_id}/callback", json=callback)
+        assert first.status_code == 200
+        assert first.json() == {"accepted": True, "finalized": True}
+
+        second = client.post(f"/moderator/parsing-runs/{run_id}/callback", json=callback)
+        assert second.status_code == 200
+        assert second.json() == {"accepted": True, "finalized": False}
+
+        response = client.get(f"/moderator/parsing-runs/{run_id}")
+        assert response.status_code == 200
+        groups = {g["domain"]: g["urls"] for g in response.json()["results"][0]["groups"]}
+        assert groups["example.com"] == ["https://example.com/a", "https://example.com/b"]
+        assert groups["test.com"] == ["https://test.com"]
+        # Finalized run is served from DB, parser_service is not polled
+        mock_parser_client.get_results.assert_not_awaited()
+
+
+def test_parser_callback_rejects_foreign_task(mock_parser_client):
+    """Test POST /moderator/parsing-runs/{runId}/callback - task_id of another run."""
+    with TestClient(app) as client:
+        create_resp = client.post(
+            "/user/requests",
+            json={
+                "title": "Test Request",
+                "keys": [
+                    {"pos": 1, "text": "test keyword", "qty": 10, "unit": "pcs"}
+                ]
+            }
+        )
+        request_id = create_resp.json()["requestid"]
+        start_resp = client.post(
+            f"/moderator/requests/{request_id}/start-parsing",
+            json={"depth": 1, "source": "yandex"}
+        )
+        run_id = start_resp.json()["runId"]
+
+        response = client.post(
+            f"/moderator/parsing-runs/{run_id}/callback",
+            json={"event": "completed", "task_id": "other-task", "links": []},
+        )
+        assert response.status_code == 409
+
+
+def test_parser_callback_run_not_found():
+    """Test POST /moderator/parsing-runs/{runId}/callback - run not found."""
+    with TestClient(app) as client:
+        response = client.post(
+            "/moderator/parsing-runs/non-existent-run-id/callback",
+            json={"event": "failed", "task_id": "t", "error": "boom"},
+        )
+        assert response.status_code == 404
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from app.usecases.finalize_parsing_run import finalize_parsing_run
+
+
+class FakeParsingRepo:
+    def __init__(self, raw_keys: list[str]):
+        self.run_status = "running"
+        self.parsing_request = type("ParsingRequest", (), {"raw_keys_json": json.dumps(raw_keys)})()
+        self.hits = []
+        self.logs = []
+        self.commits = 0
+
+    async def claim_parsing_run_finalization(
+        self, run_id, status, error_message=None, finished_at=None
+    ):
+        if self.run_status not in ("queued", "running"):
+            return False
+        self.run_status = status
+        self.error_message = error_message
+        return True
+
+    async def get_parsing_request(self, request_id):
+        return self.parsing_request
+
+    async def create_parsing_hit(
+        self, run_id, keyword, url, domain, source, key_id=None, title=None
+    ):
+        self.hits.append((keyword, url, domain, source))
+
+    async def create_log(self, run_id, level, message, context=None):
+        self.logs.append((level, message))
+
+    async def commit(self):
+        self.commits += 1
+
+
+def _run(source: str = "yandex"):
+    run = type("Run", (), {})()
+    run.id = 7
+    run.run_id = "run-1"
+    run.request_id = 3
+    run.source = source
+    return run
+
+
+@pytest.mark.asyncio
+async def test_completed_result_is_stored_once():
+    repo = FakeParsingRepo(["кирпич", "арматура"])
+    result = {
+        "status": "completed",
+        "links": ["https://a.ru/1", "https://b.ru/2"],
+        "keywords": {"арматура": {"status": "completed", "links": ["https://b.ru/2"]}},
+    }
+
+    assert await finalize_parsing_run(repo, _run(), result) is True
+    assert await finalize_parsing_run(repo, _run(), result) is False
+
+    assert repo.run_status == "succeeded"
+    assert repo.hits == [
+        ("кирпич", "https://a.ru/1", "a.ru", "yandex"),
+        ("арматура", "https://b.ru/2", "b.ru", "yandex"),
+    ]
+    assert [level for level, _ in repo.logs] == ["info"]
+    assert repo.commits == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_result_stores_error():
+    repo = FakeParsingRepo(["кирпич"])
+
+    assert (
+        await finalize_parsing_run(repo, _run(), {"status": "failed", "error": "captcha"}) is True
+    )
+
+    assert repo.run_status == "failed"
+    assert repo.error_message == "captcha"
+    assert repo.hits == []
+    assert repo.logs == [("error", "Parsing failed: captcha")]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("parser_status", ["cancelled", "partial"])
+async def test_stopped_result_keeps_collected_links(parser_status):
+    repo = FakeParsingRepo(["кирпич"])
+    result = {"status": parser_status, "links": ["https://a.ru/1"]}
+
+    assert await finalize_parsing_run(repo, _run(), result) is True
+
+    assert repo.run_status == parser_status
+    assert repo.error_message is None
+    assert repo.hits == [("кирпич", "https://a.ru/1", "a.ru", "yandex")]
+    assert [level for level, _ in repo.logs] == ["warn"]
+
+
+@pytest.mark.asyncio
+async def test_unfinished_result_is_rejected():
+    repo = FakeParsingRepo(["кирпич"])
+
+    with pytest.raises(ValueError):
+        await finalize_parsing_run(repo, _run(), {"status": "running"})
+    assert repo.run_status == "running"
+
+
+@pytest.mark.asyncio
+async def test_early_stop_pages_saved_is_logged():
+    repo = FakeParsingRepo(["кирпич"])
+    result = {"status": "completed", "links": ["https://a.ru/1"], "pages_saved": 6}
+
+    assert await finalize_parsing_run(repo, _run(), result) is True
+
+    assert repo.logs == [
+        (
+            "info",
+            "Parsing completed successfully. Found 1 links, saved to database. Early stop skipped 6 result pages.",
+        )
+    ]
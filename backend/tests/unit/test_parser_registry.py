@@ -0,0 +1,113 @@
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+
+from app.adapters.parser_registry import ParserNodeRegistry
+
+
+def _fake_parser(
+    queue_depth: int = 0,
+    running: int = 0,
+    workers: int = 2,
+    health_ok: bool = True,
+    queue_full: bool = False,
+):
+    app = FastAPI()
+    app.state.started = []
+
+    @app.get("/health")
+    async def health():
+        if not health_ok:
+            raise HTTPException(status_code=500, detail="browser is down")
+        return {
+            "status": "ok",
+            "scheduler": {
+                "workers": workers,
+                "queue_depth": queue_depth,
+                "running": running,
+                "parked": 0,
+            },
+        }
+
+    @app.post("/parse/batch")
+    async def parse_batch(payload: dict):
+        if queue_full:
+            raise HTTPException(status_code=503, detail="queue is full")
+        app.state.started.append(payload["keywords"])
+        return {"task_id": f"task-{len(app.state.started)}", "queue_position": queue_depth}
+
+    return app
+
+
+class HostRouter(httpx.AsyncBaseTransport):
+    """Routes requests to in-process parser apps by host."""
+
+    def __init__(self, apps: dict[str, FastAPI]):
+        self.transports = {host: httpx.ASGITransport(app=app) for host, app in apps.items()}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        transport = self.transports.get(request.url.host)
+        if transport is None:
+            raise httpx.ConnectError("connection refused", request=request)
+        return await transport.handle_async_request(request)
+
+
+def _registry(apps: dict[str, FastAPI], extra_hosts: tuple[str, ...] = ()) -> ParserNodeRegistry:
+    urls = [f"http://{host}" for host in [*apps, *extra_hosts]]
+    return ParserNodeRegistry(urls=urls, ttl=60.0, transport=HostRouter(apps))
+
+
+def _start(client):
+    return client.start_batch_parse(keywords=["кирпич"], depth=1, mode="yandex")
+
+
+@pytest.mark.asyncio
+async def test_ranked_prefers_least_loaded_healthy_node():
+    registry = _registry(
+        {
+            "busy": _fake_parser(queue_depth=8, running=2),
+            "idle": _fake_parser(queue_depth=0, running=1),
+            "broken": _fake_parser(health_ok=False),
+        },
+        extra_hosts=("down",),
+    )
+
+    ranked = await registry.ranked()
+
+    assert [node.url for node in ranked[:2]] == ["http://idle", "http://busy"]
+    assert {node.url for node in ranked[2:]} == {"http://broken", "http://down"}
+    assert not any(node.healthy for node in ranked[2:])
+
+
+@pytest.mark.asyncio
+async def test_dispatch_returns_node_and_spreads_burst():
+    apps = {"a": _fake_parser(), "b": _fake_parser()}
+    registry = _registry(apps)
+
+    nodes = [(await registry.dispatch(_start))[1] for _ in range(4)]
+
+    # Health is cached for ttl; local queue estimate alternates the nodes
+    assert sorted(nodes) == ["http://a", "http://a", "http://b", "http://b"]
+    assert len(apps["a"].state.started) == len(apps["b"].state.started) == 2
+
+
+@pytest.mark.asyncio
+async def test_dispatch_fails_over_on_full_queue_and_dead_node():
+    apps = {"full": _fake_parser(queue_full=True), "spare": _fake_parser(queue_depth=5)}
+    registry = _registry(apps, extra_hosts=("down",))
+    # Dead node looks healthy until its first failed request
+    registry.nodes["http://down"].checked_at = float("inf")
+
+    result, node_url = await registry.dispatch(_start)
+
+    assert node_url == "http://spare"
+    assert result["task_id"] == "task-1"
+    assert not registry.nodes["http://down"].healthy
+
+
+@pytest.mark.asyncio
+async def test_dispatch_raises_when_every_node_refuses():
+    registry = _registry({"full": _fake_parser(queue_full=True)}, extra_hosts=("down",))
+
+    with pytest.raises(httpx.HTTPError):
+        await registry.dispatch(_start)
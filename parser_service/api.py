@@ -6,15 +6,66 @@ import sys
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-from fastapi import FastAPI, HTTPException
+import json
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
+from src.browser_cluster import BrowserCluster
+from src.callbacks import CallbackSender
+from src.early_stop import known_domain_set
+from src.http_engine import serp_http
+from src.inflight import InflightTasks
+from src.metrics import DEDUPLICATED, FAILURES, TASKS, timed
 from src.parser import SearchParser
+from src.rate_governor import governors
+from src.result_store import ResultStore
+from src.route_profile import RouteProfile
+from src.scheduler import ParseJob, ParseScheduler, QueueFullError
+from src.serp_cache import SerpCache
+from src.task_feed import TaskFeed
+from src.task_store import TaskStore
 from src.utils import save_links, setup_logging
 from src.config import settings
 
-app = FastAPI(title="Search Parser API", version="1.0.0")
+# Подключения ко всем Chrome (settings.cdp_endpoints) на весь процесс (см. lifespan)
+browser_pool = BrowserCluster()
+# Очередь задач: ограниченное число воркеров и сессий на поисковик
+scheduler = ParseScheduler()
+# Кэш страниц выдачи (SQLite в рабочей папке сервиса)
+serp_cache = SerpCache()
+# Уведомления backend о ходе и завершении задач (ParseOptions.callback_url)
+callbacks = CallbackSender()
+# Ссылки задач с движком, страницей и позицией (сжатые сегменты в results/)
+result_store = ResultStore()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger = logging.getLogger(__name__)
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # Chrome может быть ещё не запущен - пул подключится при первой задаче
+        logger.warning(f"Browser pool not connected on startup: {e}")
+    await scheduler.start()
+    serp_cache.purge_expired()
+    results_storage.purge_expired()
+    results_storage.mark_interrupted()
+    result_store.purge_expired()
+    yield
+    await scheduler.stop()
+    await callbacks.close()
+    await serp_http.close()
+    await browser_pool.stop()
+    serp_cache.close()
+    results_storage.close()
+    result_store.close()
+
+app = FastAPI(title="Search Parser API", version="1.0.0", lifespan=lifespan)
 
 # TEMPORARILY DISABLED MIDDLEWARE FOR DEBUGGING
 # Add middleware to log all requests
@@ -36,16 +87,43 @@ app = FastAPI(title="Search Parser API", version="1.0.0")
 #             content={"detail": f"Middleware error: {str(e)}"}
 #         )
 
-class ParseRequest(BaseModel):
-    keyword: str = Field(..., description="Ключевое слово для поиска")
+class ParseOptions(BaseModel):
+    """Общие параметры одиночного и пакетного парсинга"""
     depth: int = Field(3, ge=1, le=10, description="Глубина поиска (1-10 страниц)")
-    mode: Literal["yandex", "google", "both"] = Field("both", description="Режим работы")
-    output_file: Optional[str] = Field(None, description="Имя файла для сохранения")
+    mode: Literal["yandex", "google", "both", "http"] = Field("both", description="Режим работы (http - без браузера)")
+    output_file: Optional[str] = Field(None, description="Дополнительно сохранить ссылки текстом в этот файл")
+    max_age: Optional[int] = Field(None, ge=0, description="Допустимый возраст кэша выдачи, сек (0 - без кэша)")
+    callback_url: Optional[str] = Field(None, description="URL для POST о завершении задачи")
+    callback_progress: bool = Field(False, description="Также слать POST по каждой собранной странице")
+    priority: Literal["interactive", "normal", "bulk"] = Field(
+        "normal", description="Класс приоритета в очереди: interactive (модератор ждёт) раньше bulk (фоновые заявки)"
+    )
+    deadline_seconds: Optional[float] = Field(
+        None, gt=0, description="Бюджет времени с постановки в очередь, сек; по истечении - статус partial с собранными ссылками"
+    )
+    early_stop: Optional[bool] = Field(
+        None, description="Не листать дальше, когда страницы перестают давать новые домены (None - из настроек)"
+    )
+    known_domains: list[str] = Field(
+        default_factory=list, description="Уже известные домены (блеклист, решения модератора) - для early_stop новыми не считаются"
+    )
+
+class ParseRequest(ParseOptions):
+    keyword: str = Field(..., description="Ключевое слово для поиска")
 
 class ParseResponse(BaseModel):
     task_id: str
     message: str
     started_at: datetime
+    queue_position: Optional[int] = None
+    estimated_start_seconds: Optional[float] = Field(None, description="Оценка ожидания в очереди, сек (None - пока не оценить)")
+    estimated_start_at: Optional[datetime] = None
+
+class BatchParseRequest(ParseOptions):
+    keywords: list[str] = Field(..., min_length=1, max_length=500, description="Ключевые слова для поиска")
+
+class BatchParseResponse(ParseResponse):
+    keywords_count: int
 
 class ParseResult(BaseModel):
     links_count: int
@@ -54,34 +132,227 @@ class ParseResult(BaseModel):
     depth: int
     mode: str
 
-results_storage = {}
+# Задачи и результаты: LRU в памяти + SQLite, переживают рестарт
+results_storage = TaskStore()
+# Ссылки незавершённых задач по мере сбора (для ?offset= и /stream)
+live_feeds: dict[str, TaskFeed] = {}
+# Идущие задачи /parse: одинаковые запросы присоединяются к ним
+inflight = InflightTasks()
+
+def page_listener(task_id: str, feed: TaskFeed, options: ParseOptions):
+    """on_page для SearchParser: лента задачи, ResultStore + (опционально) progress-колбэк"""
+    async def on_page(engine: str, page: int, links: list[str], keyword: str, ranks: list[int] = None):
+        await feed.publish(engine, page, links, keyword)
+        result_store.append(task_id, engine, page, links, keyword, ranks)
+        if options.callback_url and options.callback_progress:
+            callbacks.send(options.callback_url, {
+                "event": "progress",
+                "task_id": task_id,
+                "engine": engine,
+                "page": page,
+                "keyword": keyword,
+                "links": links,
+            }, attempts=1)
+    return on_page
+
+# Итоговые статусы задач; cancelled - DELETE /tasks, partial - истёк deadline_seconds
+FINAL_STATUSES = ("completed", "failed", "cancelled", "partial")
+CANCEL_STATUSES = {"cancelled": "cancelled", "deadline": "partial"}
+
+def notify_finished(task_id: str, options: ParseOptions):
+    """Отправка итогового результата задачи на callback_url (один раз, с повторами)"""
+    if not options.callback_url:
+        return
+    result = results_storage.get(task_id)
+    if result is None or result.get("status") not in FINAL_STATUSES:
+        return
+    payload = {k: v for k, v in result.items() if k != "error_traceback"}
+    callbacks.send(options.callback_url, {"event": result["status"], "task_id": task_id, **payload})
+
+def queue_estimate(task_id: str) -> dict:
+    """Позиция задачи в очереди и оценка времени старта для ParseResponse"""
+    info = scheduler.job_info(task_id)
+    estimate = info.get("estimated_start_seconds")
+    if "queue_position" not in info:
+        # Задача уже выполняется
+        estimate = 0.0
+    return {
+        "queue_position": info.get("queue_position"),
+        "estimated_start_seconds": estimate,
+        "estimated_start_at": datetime.now() + timedelta(seconds=estimate) if estimate is not None else None,
+    }
+
+async def until_cancelled(job: ParseJob, coro):
+    """Сбор задачи с кооперативной отменой: (результат, None) или (None, "cancelled"/"partial")
+
+    Отмена прерывает корутины поисковиков, их вкладки закрываются при возврате
+    аренды; собранные до отмены ссылки остаются в ленте задачи.
+    """
+    if job.cancel_reason is None:
+        try:
+            return await coro, None
+        except asyncio.CancelledError:
+            if job.cancel_reason is None:
+                # Остановка сервиса
+                raise
+            asyncio.current_task().uncancel()
+        finally:
+            job.cancellable = False
+    else:
+        # Отменена, пока стояла в очереди
+        coro.close()
+        job.cancellable = False
+    logging.getLogger(__name__).info(f"Task {job.task_id} cancelled: {job.cancel_reason}")
+    return None, CANCEL_STATUSES[job.cancel_reason]
+
+def feed_links(feed: TaskFeed, keyword: str = None, depth: int = None) -> list[str]:
+    """Ссылки ленты (по ключу пакета и/или в пределах глубины) в порядке сбора"""
+    return [
+        link for link, (_, page, kw) in zip(feed.links, feed.origins)
+        if (keyword is None or kw == keyword) and (depth is None or page <= depth)
+    ]
+
+def coalesce_variant(request: ParseOptions) -> Optional[frozenset[str]]:
+    """Политика ранней остановки запроса для singleflight: None - листаем до depth
+
+    С одинаковыми known_domains остановка зависит только от страниц выдачи, так
+    что запрос меньшей глубины получает ровно то, что собрал бы сам.
+    """
+    early_stop = settings.early_stop if request.early_stop is None else request.early_stop
+    return known_domain_set(request.known_domains) if early_stop else None
+
+def queue_parse(task_id: str, request: ParseRequest, lead: bool) -> int:
+    """Постановка задачи /parse в очередь; lead - к ней могут присоединяться одинаковые запросы"""
+    # Parsing runs on the main event loop so tasks can share browser_pool
+    # (Playwright objects are bound to the loop they were created on)
+    position = scheduler.submit(ParseJob(
+        task_id=task_id,
+        run=lambda job: parse_task(task_id, request, job),
+        priority=request.priority,
+        deadline_seconds=request.deadline_seconds,
+    ))
+    results_storage[task_id] = {"status": "queued"}
+    live_feeds.setdefault(task_id, TaskFeed())
+    if lead:
+        inflight.lead(task_id, request.keyword, request.mode, request.depth, coalesce_variant(request))
+    return position
+
+def join_leader(task_id: str, request: ParseRequest, view: TaskFeed = None) -> Optional[str]:
+    """Присоединить запрос к идущей задаче; его лента - ссылки лидера в пределах request.depth"""
+    leader_id = inflight.join(request.keyword, request.mode, request.depth, task_id, request, coalesce_variant(request))
+    if leader_id is None:
+        return None
+    results_storage[task_id] = {"status": results_storage[leader_id]["status"], "deduplicated_from": leader_id}
+    if leader_id in live_feeds:
+        live_feeds[task_id] = live_feeds[leader_id].mirror(request.depth, view)
+    return leader_id
+
+async def finish_followers(task_id: str, feed: Optional[TaskFeed]):
+    """Результат задачи-лидера - объединённым с ней запросам (singleflight)
+
+    Ссылки режутся до глубины запроса. Отменённый лидер свою отмену не передаёт:
+    объединённые запросы встают в очередь заново (самый глубокий - лидером).
+    """
+    result = results_storage[task_id]
+    followers = inflight.finish(task_id)
+    if result["status"] == "cancelled":
+        followers.sort(key=lambda f: f[1].depth, reverse=True)
+    for follower_id, request in followers:
+        view = live_feeds.pop(follower_id, None)
+        if feed is not None and view is not None:
+            feed.detach(view)
+        if result["status"] == "cancelled":
+            try:
+                leader_id = join_leader(follower_id, request, view)
+                if leader_id is None:
+                    if view is not None:
+                        live_feeds[follower_id] = view
+                    queue_parse(follower_id, request, lead=True)
+                results_storage[follower_id]["requeued_after"] = task_id
+                logging.getLogger(__name__).info(
+                    f"Follower {follower_id} requeued after cancelled task {task_id}"
+                    + (f", joined {leader_id}" if leader_id else "")
+                )
+                continue
+            except QueueFullError as e:
+                live_feeds.pop(follower_id, None)
+                follower = {
+                    "status": "failed",
+                    "error": f"Объединённая задача {task_id} отменена, повторно поставить в очередь не удалось: {e}",
+                    "deduplicated_from": task_id,
+                }
+        else:
+            follower = {**result, "deduplicated_from": task_id}
+        if "links" in result:
+            links = result["links"]
+            if request.depth < result["depth"]:
+                # Лидер глубже - только ссылки первых request.depth страниц
+                if view is not None:
+                    links = list(view.links)
+                elif feed is not None:
+                    links = feed_links(feed, depth=request.depth)
+            follower.update({
+                "links": links,
+                "links_count": len(links),
+                "depth": request.depth,
+                "output_file": request.output_file,
+            })
+            if request.output_file:
+                await asyncio.to_thread(save_links, set(links), request.output_file)
+        results_storage[follower_id] = follower
+        if view is not None:
+            await view.close(follower["status"])
+        notify_finished(follower_id, request)
 
 setup_logging(settings.log_file)
 
-async def parse_task(task_id: str, request: ParseRequest):
-    """Фоновая задача парсинга"""
+async def parse_task(task_id: str, request: ParseRequest, job: ParseJob):
+    """Фоновая задача парсинга (выполняется воркером scheduler)"""
     parser = None
     try:
         import logging
         logger = logging.getLogger(__name__)
         logger.info(f"Starting parse_task for task_id={task_id}, keyword={request.keyword}")
+        results_storage[task_id] = {"status": "running"}
+        for follower_id, _ in inflight.followers(task_id):
+            results_storage[follower_id] = {"status": "running", "deduplicated_from": task_id}
         
-        parser = SearchParser()
-        links = await parser.parse(request.keyword, request.depth, request.mode)
+        feed = live_feeds.setdefault(task_id, TaskFeed())
+        parser = SearchParser(
+            pool=browser_pool, engine_slot=scheduler.engine_slot, cache=serp_cache,
+            on_page=page_listener(task_id, feed, request),
+            early_stop=request.early_stop, known_domains=request.known_domains,
+        )
+        links, cancelled = await until_cancelled(
+            job, parser.parse(request.keyword, request.depth, request.mode, max_age=request.max_age)
+        )
+        if cancelled:
+            links = set(feed.links)
         
-        output_file = request.output_file or f"results_{task_id}.txt"
-        save_links(links, output_file)
+        with timed("result_save"):
+            await result_store.flush()
+            if request.output_file:
+                await asyncio.to_thread(save_links, links, request.output_file)
         
         results_storage[task_id] = {
-            "status": "completed",
+            "status": cancelled or "completed",
             "links_count": len(links),
-            "links": list(links),
+            "links": feed.ordered(links),
             "keyword": request.keyword,
             "depth": request.depth,
             "mode": request.mode,
-            "output_file": output_file
+            "output_file": request.output_file,
+            "lease_wait_seconds": round(parser.last_lease_wait, 3),
+            "queue_wait_seconds": round(job.wait_seconds, 3),
+            "parked_seconds": round(job.parked_seconds, 3),
+            "cache_hits": parser.cache_hits,
+            "cache_resumed": parser.cache_resumed,
+            "engine_stats": parser.engine_stats,
+            "pages_saved": parser.pages_saved,
+            "early_stops": parser.early_stops,
+            **({"cancel_reason": job.cancel_reason} if cancelled else {}),
         }
-        logger.info(f"Parse task completed: task_id={task_id}, links_count={len(links)}")
+        logger.info(f"Parse task {cancelled or 'completed'}: task_id={task_id}, links_count={len(links)}")
     except Exception as e:
         import logging
         import traceback
@@ -89,14 +360,22 @@ async def parse_task(task_id: str, request: ParseRequest):
         error_msg = str(e)
         error_traceback = traceback.format_exc()
         logger.error(f"Parse task failed: task_id={task_id}, error={error_msg}\n{traceback.format_exc()}")
+        FAILURES.labels(engine=request.mode, stage="task").inc()
         
         results_storage[task_id] = {
             "status": "failed",
             "error": error_msg,
-            "error_traceback": error_traceback
+            "error_traceback": error_traceback,
+            "queue_wait_seconds": round(job.wait_seconds, 3)
         }
     finally:
-        # Clean up parser connection
+        feed = live_feeds.pop(task_id, None)
+        await finish_followers(task_id, feed)
+        if feed is not None:
+            await feed.close(results_storage[task_id]["status"])
+        TASKS.labels(mode=request.mode, status=results_storage[task_id]["status"]).inc()
+        notify_finished(task_id, request)
+        # Shared pool stays connected; close() only releases parser-owned resources
         if parser:
             try:
                 await parser.close()
@@ -110,7 +389,8 @@ async def start_parse(request: ParseRequest):
     """
     Запуск парсинга
     
-    Возвращает task_id сразу, парсинг запускается в фоне через threading.
+    Возвращает task_id сразу, задача ставится в очередь scheduler и выполняется
+    на общем подключении к браузеру.
     
     Пример:
         POST /parse
@@ -131,43 +411,43 @@ async def start_parse(request: ParseRequest):
         
         task_id = f"{request.keyword}_{datetime.now().timestamp()}"
         
-        # Mark as running immediately
-        results_storage[task_id] = {"status": "running"}
-        
         logger.info(f"[PARSE] Created task_id={task_id}")
         
-        # RADICAL FIX: Use threading instead of asyncio to avoid event loop issues
-        import threading
+        # Тот же ключ и режим уже парсятся не мельче - ждём их результат вместо
+        # второй сессии браузера (max_age=0 просит свежую выдачу, а задачи с
+        # deadline_seconds могут закончиться раньше - такие не объединяем;
+        # early_stop - только с теми же known_domains, см. coalesce_variant)
+        coalesce = request.max_age != 0 and request.deadline_seconds is None
+        leader_id = None
+        if coalesce:
+            leader_id = join_leader(task_id, request)
+        if leader_id is not None:
+            DEDUPLICATED.labels(mode=request.mode).inc()
+            # Модератор присоединился к фоновой задаче - она тоже становится интерактивной
+            scheduler.promote(leader_id, request.priority)
+            logger.info(f"[PARSE] task_id={task_id} joined in-flight task {leader_id}")
+            return ParseResponse(
+                task_id=task_id,
+                message=f"Такой же парсинг уже выполняется, результат будет общим с {leader_id}",
+                started_at=datetime.now(),
+                **queue_estimate(leader_id),
+            )
         
-        def run_parse_task():
-            """Wrapper function to run parse_task in a new event loop"""
-            try:
-                logger.info(f"[PARSE] Thread started for task_id={task_id}")
-                # Create new event loop for this thread
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                loop.run_until_complete(parse_task(task_id, request))
-                loop.close()
-                logger.info(f"[PARSE] Thread completed for task_id={task_id}")
-            except Exception as e:
-                logger.error(f"[PARSE] Thread error in parse_task: {e}", exc_info=True)
-                results_storage[task_id] = {
-                    "status": "failed",
-                    "error": f"Thread execution error: {str(e)}"
-                }
-        
-        thread = threading.Thread(target=run_parse_task, daemon=True)
-        thread.start()
-        logger.info(f"[PARSE] Started parse task thread for task_id={task_id}")
+        position = queue_parse(task_id, request, lead=coalesce)
+        logger.info(f"[PARSE] Queued task_id={task_id} priority={request.priority} at position {position}")
         
         response = ParseResponse(
             task_id=task_id,
-            message="Парсинг запущен в фоновом режиме",
-            started_at=datetime.now()
+            message="Парсинг поставлен в очередь",
+            started_at=datetime.now(),
+            **queue_estimate(task_id),
         )
         logger.info(f"[PARSE] Returning response for task_id={task_id}")
         return response
         
+    except QueueFullError as e:
+        logger.warning(f"[PARSE] Queue full, rejecting keyword={request.keyword}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"[PARSE] CRITICAL ERROR in start_parse endpoint: {e}", exc_info=True)
         error_details = traceback.format_exc()
@@ -182,32 +462,328 @@ async def start_parse(request: ParseRequest):
             }
         )
 
+async def batch_parse_task(batch_id: str, request: BatchParseRequest, keywords: list[str], job: ParseJob):
+    """Фоновая задача пакетного парсинга: все ключи в одной сессии браузера"""
+    import logging
+    import traceback
+    logger = logging.getLogger(__name__)
+    batch = results_storage[batch_id]
+    batch["status"] = "running"
+    batch["queue_wait_seconds"] = round(job.wait_seconds, 3)
+    results_storage[batch_id] = batch
+    
+    async def on_keyword(keyword: str, links: set, error: Optional[str]):
+        entry = batch["keywords"][keyword]
+        if error:
+            entry.update({"status": "failed", "error": error})
+        else:
+            entry.update({"status": "completed", "links_count": len(links), "links": sorted(links)})
+        batch["completed_keywords"] += 1
+        results_storage[batch_id] = batch
+        logger.info(f"[BATCH] {batch_id}: {batch['completed_keywords']}/{len(keywords)} keyword='{keyword}' status={entry['status']}")
+    
+    feed = live_feeds.setdefault(batch_id, TaskFeed())
+    parser = SearchParser(
+        pool=browser_pool, engine_slot=scheduler.engine_slot, cache=serp_cache,
+        on_page=page_listener(batch_id, feed, request),
+        early_stop=request.early_stop, known_domains=request.known_domains,
+    )
+    try:
+        results, cancelled = await until_cancelled(job, parser.parse_batch(
+            keywords, request.depth, request.mode, on_keyword=on_keyword, max_age=request.max_age
+        ))
+        if cancelled:
+            links = set(feed.links)
+            # Незавершённые ключи - со ссылками, собранными до отмены
+            for keyword, entry in batch["keywords"].items():
+                if entry["status"] not in FINAL_STATUSES:
+                    keyword_links = feed_links(feed, keyword=keyword)
+                    entry.update({"status": cancelled, "links_count": len(keyword_links), "links": keyword_links})
+        else:
+            links = set().union(*results.values())
+        
+        with timed("result_save"):
+            await result_store.flush()
+            if request.output_file:
+                await asyncio.to_thread(save_links, links, request.output_file)
+        
+        failed = [k for k, v in batch["keywords"].items() if v["status"] == "failed"]
+        batch.update({
+            "status": cancelled or ("failed" if len(failed) == len(keywords) else "completed"),
+            "links_count": len(links),
+            "links": feed.ordered(links),
+            "failed_keywords": failed,
+            "output_file": request.output_file,
+            "lease_wait_seconds": round(parser.last_lease_wait, 3),
+            "cache_hits": len(parser.cache_hits),
+            "cache_resumed": len(parser.cache_resumed),
+            "parked_seconds": round(job.parked_seconds, 3),
+            "engine_stats": parser.engine_stats,
+            "pages_saved": parser.pages_saved,
+            "early_stops": parser.early_stops,
+        })
+        if batch["status"] == "failed":
+            batch["error"] = batch["keywords"][failed[0]].get("error")
+        if cancelled:
+            batch["cancel_reason"] = job.cancel_reason
+        logger.info(f"Batch task {batch['status']}: batch_id={batch_id}, links_count={len(links)}, failed={len(failed)}")
+    except Exception as e:
+        logger.error(f"Batch task failed: batch_id={batch_id}, error={e}\n{traceback.format_exc()}")
+        FAILURES.labels(engine=request.mode, stage="task").inc()
+        batch.update({
+            "status": "failed",
+            "error": str(e),
+            "error_traceback": traceback.format_exc(),
+        })
+    finally:
+        results_storage[batch_id] = batch
+        live_feeds.pop(batch_id, None)
+        await feed.close(batch["status"])
+        TASKS.labels(mode=request.mode, status=batch["status"]).inc()
+        notify_finished(batch_id, request)
+        await parser.close()
+
+@app.post("/parse/batch", response_model=BatchParseResponse)
+async def start_batch_parse(request: BatchParseRequest):
+    """
+    Пакетный запуск парсинга
+    
+    Все ключи выполняются одной задачей scheduler в одной сессии браузера.
+    Прогресс и результаты по каждому ключу - в GET /results/{task_id}.
+    
+    Пример:
+        POST /parse/batch
+        {
+            "keywords": ["кирпич", "арматура"],
+            "depth": 3,
+            "mode": "both"
+        }
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    # Порядок сохраняем, пустые и повторы убираем
+    keywords = list(dict.fromkeys(k.strip() for k in request.keywords if k.strip()))
+    if not keywords:
+        raise HTTPException(status_code=422, detail="keywords must contain at least one non-empty keyword")
+    
+    batch_id = f"batch_{datetime.now().timestamp()}"
+    results_storage[batch_id] = {
+        "status": "queued",
+        "batch": True,
+        "depth": request.depth,
+        "mode": request.mode,
+        "total_keywords": len(keywords),
+        "completed_keywords": 0,
+        "keywords": {k: {"status": "queued"} for k in keywords},
+    }
+    try:
+        position = scheduler.submit(ParseJob(
+            task_id=batch_id,
+            run=lambda job: batch_parse_task(batch_id, request, keywords, job),
+            priority=request.priority,
+            deadline_seconds=request.deadline_seconds,
+        ))
+    except QueueFullError as e:
+        results_storage.pop(batch_id, None)
+        raise HTTPException(status_code=503, detail=str(e))
+    live_feeds[batch_id] = TaskFeed()
+    
+    logger.info(f"[BATCH] Queued batch_id={batch_id} keywords={len(keywords)} priority={request.priority} at position {position}")
+    
+    return BatchParseResponse(
+        task_id=batch_id,
+        message="Пакетный парсинг поставлен в очередь",
+        started_at=datetime.now(),
+        keywords_count=len(keywords),
+        **queue_estimate(batch_id),
+    )
+
+@app.delete("/tasks/{task_id}", status_code=202)
+async def cancel_task(task_id: str):
+    """
+    Отмена задачи (в очереди или выполняющейся)
+    
+    Задача останавливается кооперативно: вкладки закрываются, собранные ссылки
+    сохраняются со статусом cancelled (GET /results/{task_id}, callback).
+    Запрос, объединённый с идущей задачей, отцепляется от неё, не останавливая её.
+    """
+    result = results_storage.get(task_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    if result["status"] in FINAL_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Задача уже завершена: {result['status']}")
+    
+    follower = inflight.leave(task_id)
+    if follower is not None:
+        leader_id, request = follower
+        feed = live_feeds.pop(task_id, None)
+        if feed is not None and leader_id in live_feeds:
+            live_feeds[leader_id].detach(feed)
+        # Лента объединённого запроса - уже только страницы до request.depth
+        links = list(feed.links) if feed is not None else []
+        results_storage[task_id] = {
+            "status": "cancelled",
+            "cancel_reason": "cancelled",
+            "deduplicated_from": leader_id,
+            "links_count": len(links),
+            "links": links,
+            "keyword": request.keyword,
+            "depth": request.depth,
+            "mode": request.mode,
+        }
+        if feed is not None:
+            await feed.close("cancelled")
+        notify_finished(task_id, request)
+        return {"task_id": task_id, "status": "cancelled"}
+    
+    if scheduler.cancel(task_id) is None:
+        raise HTTPException(status_code=409, detail="Задача уже завершается")
+    return {"task_id": task_id, "status": "cancelling"}
+
 @app.get("/results/{task_id}")
-async def get_results(task_id: str):
-    """Получение результатов парсинга"""
+async def get_results(
+    task_id: str,
+    offset: Optional[int] = Query(None, ge=0, description="Вернуть только ссылки начиная с этого смещения"),
+):
+    """Получение результатов парсинга
+    
+    С ?offset=N отдаются только ссылки, найденные после первых N (в том числе
+    пока задача выполняется), и next_offset для следующего запроса.
+    """
     if task_id not in results_storage:
         raise HTTPException(status_code=404, detail="Задача не найдена")
     
     result = results_storage[task_id]
+    # Объединённый запрос: позиция в очереди - у задачи-лидера
+    job_id = result.get("deduplicated_from", task_id)
+    
+    if offset is not None:
+        feed = live_feeds.get(task_id)
+        links = feed.links if feed is not None else result.get("links") or []
+        new_links = links[offset:]
+        return {
+            "status": result["status"],
+            "offset": offset,
+            "next_offset": offset + len(new_links),
+            "links": new_links,
+            **({"error": result["error"]} if "error" in result else {}),
+            **scheduler.job_info(job_id),
+        }
+    
+    if result.get("batch") and result["status"] in ("queued", "running"):
+        # Для пакета отдаём прогресс по ключам уже во время выполнения
+        return {**result, **scheduler.job_info(job_id)}
+    
+    if result["status"] == "queued":
+        return {"status": "queued", "message": "Задача в очереди...", **scheduler.job_info(job_id)}
     
     if result["status"] == "running":
-        return {"status": "running", "message": "Парсинг в процессе..."}
+        return {"status": "running", "message": "Парсинг в процессе...", **scheduler.job_info(job_id)}
     
     return result
 
+@app.get("/results/{task_id}/records")
+async def get_result_records(task_id: str):
+    """
+    Ссылки задачи из ResultStore в формате NDJSON
+    
+    Строка на ссылку: {"task_id", "keyword", "engine", "page", "rank", "link", "ts"},
+    в порядке сбора (в том числе для задач, вытесненных из results_storage).
+    """
+    await result_store.flush()
+    result = results_storage.get(task_id) or {}
+    leader_id = result.get("deduplicated_from")
+    records = await asyncio.to_thread(result_store.read, leader_id or task_id)
+    if leader_id is not None and result.get("depth") is not None:
+        # Записи лидера в пределах глубины объединённого запроса
+        records = [r for r in records if r["page"] <= result["depth"]]
+    if not records and task_id not in results_storage:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    return StreamingResponse(
+        (json.dumps(record, ensure_ascii=False) + "\n" for record in records),
+        media_type="application/x-ndjson",
+    )
+
+@app.get("/results/{task_id}/stream")
+async def stream_results(task_id: str, offset: int = Query(0, ge=0)):
+    """
+    Поток ссылок задачи в формате NDJSON
+    
+    Строки {"type": "links", "offset", "engine", "page", "keyword", "links"} по мере
+    сбора страниц, {"type": "heartbeat"} пока новых ссылок нет и финальная
+    {"type": "status", "status", "links_count"}. ?offset= продолжает прерванный поток.
+    """
+    if task_id not in results_storage:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    
+    async def events():
+        position = offset
+        feed = live_feeds.get(task_id)
+        while feed is not None:
+            has_news = await feed.wait(position, timeout=settings.stream_heartbeat_seconds)
+            chunks = feed.chunks(position)
+            for chunk in chunks:
+                yield json.dumps({"type": "links", **chunk}, ensure_ascii=False) + "\n"
+                position += len(chunk["links"])
+            if not chunks:
+                if feed.done:
+                    break
+                if not has_news:
+                    yield json.dumps({"type": "heartbeat"}) + "\n"
+        
+        # Завершённая задача (или поток подключился после завершения)
+        result = results_storage.get(task_id) or {}
+        links = result.get("links") or []
+        if len(links) > position:
+            yield json.dumps({"type": "links", "offset": position, "links": links[position:]}, ensure_ascii=False) + "\n"
+            position = len(links)
+        final = {"type": "status", "status": result.get("status"), "links_count": position}
+        if "error" in result:
+            final["error"] = result["error"]
+        yield json.dumps(final, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.get("/health")
 async def health():
     """Проверка работоспособности"""
     # Simplified health check - just return OK
     # CDP availability will be checked when parsing starts
     # This avoids blocking issues with async subprocess on Windows
+    route_profile = RouteProfile.from_settings()
     return {
         "status": "ok",
         "cdp_endpoint": settings.cdp_endpoint,
+        "cdp_endpoints": settings.cdp_endpoint_list,
         "cdp_available": None,  # Don't check here - let parse_task handle it
-        "cdp_error": None
+        "cdp_error": None,
+        "browser_pool": browser_pool.stats(),
+        "scheduler": scheduler.stats(),
+        "serp_cache": serp_cache.stats(),
+        "task_store": results_storage.stats(),
+        "result_store": result_store.stats(),
+        "callbacks": callbacks.stats(),
+        "inflight": inflight.stats(),
+        "rate_governors": governors.stats(),
+        "route_profile": route_profile.stats() if route_profile else None,
+        "http_engine": serp_http.stats()
     }
 
+@app.get("/tabs")
+async def tabs():
+    """Вкладки пула по CDP endpoint (открытые, тёплые, переиспользованные, закрытые потерянные) и память Chrome
+
+    Память - JS heap вкладок пула (Performance.getMetrics) и число процессов-рендереров.
+    """
+    return {"endpoints": await browser_pool.tab_stats()}
+
+@app.get("/metrics")
+async def metrics():
+    """Метрики Prometheus: время этапов (очередь, CDP, загрузка, поведение, извлечение, капча, сохранение), ссылки, капчи, ошибки"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 @app.post("/parse-simple")
 async def parse_simple():
     """Minimal test endpoint"""
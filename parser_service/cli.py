@@ -1,7 +1,15 @@
 import asyncio
+import json
+import sys
+import time
 import typer
 from typing_extensions import Annotated
 from src.parser import SearchParser
+from src.browser_cluster import BrowserCluster
+from src.checkpoint import BatchCheckpoint
+from src.scheduler import ParseScheduler
+from src.http_engine import serp_http
+from src.benchmark import run_benchmark
 from src.utils import save_links, setup_logging
 from src.config import settings
 
@@ -11,13 +19,16 @@ app = typer.Typer(help="Search Parser - Парсер поисковиков Ян
 def parse(
     keyword: Annotated[str, typer.Argument(help="Ключевое слово для поиска")],
     depth: Annotated[int, typer.Argument(help="Количество страниц")] = 1,
-    mode: Annotated[str, typer.Argument(help="Режим: yandex, google, both")] = "yandex",
-    output: Annotated[str, typer.Option("--output", "-o", help="Файл результатов")] = "results.txt"
+    mode: Annotated[str, typer.Argument(help="Режим: yandex, google, both, http (без браузера)")] = "yandex",
+    output: Annotated[str, typer.Option("--output", "-o", help="Файл результатов")] = "results.txt",
+    record: Annotated[str, typer.Option("--record", help="Каталог для записи страниц выдачи (для benchmark)")] = None
 ):
     setup_logging(settings.log_file)
+    if record:
+        settings.serp_record_dir = record
     
-    if mode not in ["yandex", "google", "both"]:
-        typer.echo("❌ Режим должен быть: yandex, google или both")
+    if mode not in ["yandex", "google", "both", "http"]:
+        typer.echo("❌ Режим должен быть: yandex, google, both или http")
         raise typer.Exit(code=1)
     
     typer.echo(f"🔍 Запуск парсера...")
@@ -34,11 +45,141 @@ def parse(
         finally:
             # Правильное завершение соединения
             await parser.close()
+            await serp_http.close()
     
     links = asyncio.run(run())
     
     typer.echo(f"\n✅ Найдено {len(links)} уникальных ссылок")
     typer.echo(f"💾 Результаты сохранены в {output}")
 
+def read_keywords(source: str) -> list[str]:
+    """Ключи по строке из файла или stdin ("-"): пустые строки и # комментарии пропускаются, повторы убираются"""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        lines = [line.strip() for line in stream]
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return list(dict.fromkeys(line for line in lines if line and not line.startswith("#")))
+
+@app.command("parse-batch")
+def parse_batch(
+    source: Annotated[str, typer.Argument(help="Файл с ключами (по одному в строке) или - для stdin")],
+    depth: Annotated[int, typer.Option("--depth", "-d", help="Количество страниц")] = 1,
+    mode: Annotated[str, typer.Option("--mode", "-m", help="Режим: yandex, google, both, http")] = "yandex",
+    concurrency: Annotated[int, typer.Option("--concurrency", "-c", help="Ключей одновременно")] = 2,
+    output: Annotated[str, typer.Option("--output", "-o", help="NDJSON с результатами по ключам (дописывается)")] = "batch_results.ndjson",
+    checkpoint: Annotated[str, typer.Option("--checkpoint", help="Файл прогресса (по умолчанию <output>.checkpoint.json)")] = None
+):
+    """Пакетный парсинг ключей в одном подключении к браузеру; прерванный прогон продолжается по checkpoint"""
+    setup_logging(settings.log_file)
+    
+    if mode not in ["yandex", "google", "both", "http"]:
+        typer.echo("❌ Режим должен быть: yandex, google, both или http")
+        raise typer.Exit(code=1)
+    if concurrency < 1:
+        typer.echo("❌ --concurrency должен быть >= 1")
+        raise typer.Exit(code=1)
+    
+    keywords = read_keywords(source)
+    progress = BatchCheckpoint(checkpoint or f"{output}.checkpoint.json")
+    pending = progress.pending(keywords)
+    
+    typer.echo(f"🔍 Ключей: {len(keywords)}, уже готово: {len(keywords) - len(pending)}, осталось: {len(pending)}")
+    typer.echo(f"📊 Глубина: {depth}, 🌐 режим: {mode}, параллельно: {concurrency}")
+    if not pending:
+        typer.echo(f"✅ Всё готово, результаты в {output}")
+        return
+    
+    async def run():
+        # Подключения к Chrome (все cdp_endpoints) на весь прогон, лимиты поисковиков - как в api.py
+        pool = BrowserCluster(size=concurrency)
+        parser = SearchParser(pool=pool, engine_slot=ParseScheduler().engine_slot)
+        queue = list(reversed(pending))
+        done = 0
+        
+        async def worker():
+            nonlocal done
+            while queue:
+                keyword = queue.pop()
+                started = time.monotonic()
+                error = None
+                try:
+                    links = await parser.parse(keyword, depth, mode)
+                except Exception as e:
+                    links, error = set(), str(e)
+                record = {
+                    "keyword": keyword,
+                    "status": "failed" if error else "completed",
+                    "links_count": len(links),
+                    "links": sorted(links),
+                    "error": error,
+                    "seconds": round(time.monotonic() - started, 1),
+                }
+                # Сначала результат, потом checkpoint: при обрыве между ними ключ просто повторится
+                with open(output, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                progress.mark(keyword, error)
+                done += 1
+                status = f"❌ {error}" if error else f"✅ {len(links)} ссылок"
+                typer.echo(f"[{done}/{len(pending)}] {keyword}: {status}")
+        
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(concurrency, len(pending)))))
+        finally:
+            await parser.close()
+            await pool.stop()
+            await serp_http.close()
+    
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        typer.echo(f"\n⏸  Прервано: готово {len(progress.done)}/{len(keywords)}, повторный запуск продолжит с checkpoint")
+        raise typer.Exit(code=130)
+    
+    typer.echo(f"\n✅ Готово {len(progress.done)}/{len(keywords)}, с ошибкой: {len(progress.failed)}")
+    typer.echo(f"💾 Результаты в {output}")
+
+@app.command()
+def benchmark(
+    archive: Annotated[str, typer.Argument(help="Каталог записанной выдачи (parse --record)")],
+    engines: Annotated[str, typer.Option("--engines", "-e", help="Поисковики через запятую")] = "yandex,google",
+    repeat: Annotated[int, typer.Option("--repeat", "-r", help="Повторов прогона")] = 3,
+    http: Annotated[bool, typer.Option("--http", help="Прогнать и режим http (lxml) на тех же страницах")] = False,
+    browser: Annotated[bool, typer.Option("--browser/--no-browser", help="Прогон движков во вкладке браузера")] = True,
+    cdp: Annotated[bool, typer.Option("--cdp", help="Chrome по cdp_endpoint вместо локального headless Chromium")] = False,
+    output: Annotated[str, typer.Option("--output", "-o", help="JSON-отчёт")] = None
+):
+    """Прогон движков по записанной выдаче без сети и пауз: страниц/сек, CDP-вызовов на страницу, время извлечения"""
+    setup_logging(settings.log_file)
+    
+    names = [name.strip() for name in engines.split(",") if name.strip()]
+    if not names or any(name not in ["yandex", "google"] for name in names):
+        typer.echo("❌ Поисковики: yandex, google")
+        raise typer.Exit(code=1)
+    
+    try:
+        report = asyncio.run(run_benchmark(
+            archive, names, repeat=repeat, http=http, browser=browser,
+            cdp_endpoint=settings.cdp_endpoint if cdp else None,
+        ))
+    except FileNotFoundError as e:
+        typer.echo(f"❌ {e}")
+        raise typer.Exit(code=1)
+    
+    for name, stats in report["engines"].items():
+        ms = stats["extraction_ms"]
+        typer.echo(
+            f"📊 {name}: {stats['pages']} стр. за {stats['seconds']}с, {stats['pages_per_sec']} стр/с, "
+            f"CDP/стр: {stats['cdp_calls_per_page']}, извлечение p50/p90/p99: {ms['p50']}/{ms['p90']}/{ms['p99']} мс, "
+            f"ошибок: {stats['failed']}"
+        )
+    replay = report["replay"]
+    typer.echo(f"🗂  Replay: {replay['hits']} попаданий, {replay['misses']} промахов")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        typer.echo(f"💾 Отчёт сохранён в {output}")
+
 if __name__ == "__main__":
     app()
@@ -4,10 +4,11 @@
 # Справка
 Write-Host "
 📚 Использование:" -ForegroundColor Cyan
-Write-Host "   python cli.py <ключевое_слово> <глубина> <режим>" -ForegroundColor White
+Write-Host "   python cli.py parse <ключевое_слово> <глубина> <режим>" -ForegroundColor White
 Write-Host ""
 Write-Host "Примеры:" -ForegroundColor Yellow
-Write-Host "   python cli.py кирпич 3 yandex" -ForegroundColor White
-Write-Host "   python cli.py 'керамический кирпич' 5 google" -ForegroundColor White
-Write-Host "   python cli.py плитка 2 both" -ForegroundColor White
+Write-Host "   python cli.py parse кирпич 3 yandex" -ForegroundColor White
+Write-Host "   python cli.py parse 'керамический кирпич' 5 google" -ForegroundColor White
+Write-Host "   python cli.py parse плитка 2 both" -ForegroundColor White
+Write-Host "   python cli.py parse-batch keywords.txt --depth 3 --mode yandex --concurrency 2" -ForegroundColor White
 Write-Host ""
@@ -0,0 +1,188 @@
+import logging
+import os
+import time
+from typing import Optional
+
+from playwright.async_api import Page, async_playwright
+
+from .config import settings
+from .engines import GoogleEngine, SearchEngine, YandexEngine
+from .http_engine import HttpSearchEngine, HttpSerpClient, SerpBlockedError
+from .rate_governor import RateGovernor
+from .serp_replay import ReplayRouter, SerpArchive, replay_transport
+
+logger = logging.getLogger(__name__)
+
+ENGINES = {"yandex": YandexEngine, "google": GoogleEngine}
+
+
+def percentiles(values: list[float]) -> dict:
+    """p50/p90/p99/max в миллисекундах (nearest rank)"""
+    if not values:
+        return {"p50": None, "p90": None, "p99": None, "max": None}
+    ordered = sorted(values)
+
+    def rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+    return {"p50": rank(0.5), "p90": rank(0.9), "p99": rank(0.99), "max": round(ordered[-1] * 1000, 2)}
+
+
+def _protocol_calls(page: Page) -> Optional[int]:
+    """Счётчик сообщений клиента Playwright к драйверу (каждое - round trip до браузера)
+
+    Публичного API у Playwright для этого нет - читаем внутренний id последнего
+    сообщения; после смены внутренностей Playwright вернётся None ("n/a" в отчёте).
+    """
+    connection = getattr(getattr(page, "_impl_obj", None), "_connection", None)
+    last_id = getattr(connection, "_last_id", None)
+    return last_id if isinstance(last_id, int) else None
+
+
+def _unpaced(engine: SearchEngine) -> SearchEngine:
+    engine.governor = RateGovernor(engine.name.lower(), "replay", interval=1e-6, burst=1000)
+    return engine
+
+
+class _Totals:
+    def __init__(self):
+        self.runs = 0
+        self.pages = 0
+        self.links = 0
+        self.seconds = 0.0
+        self.calls = 0
+        # Счётчик протокола недоступен (см. _protocol_calls)
+        self.calls_unknown = False
+        self.failed = 0
+        self.extraction_times: list[float] = []
+
+    def add(self, engine: SearchEngine, links: int, seconds: float, calls: Optional[int] = 0):
+        self.runs += 1
+        self.pages += len(engine.page_metrics)
+        self.links += links
+        self.seconds += seconds
+        if calls is None:
+            self.calls_unknown = True
+        else:
+            self.calls += calls
+        self.extraction_times.extend(engine.extraction_times)
+
+    def report(self, browser: bool) -> dict:
+        calls_per_page = None
+        if browser and self.pages:
+            calls_per_page = "n/a" if self.calls_unknown else round(self.calls / self.pages, 1)
+        return {
+            "runs": self.runs,
+            "failed": self.failed,
+            "pages": self.pages,
+            "links": self.links,
+            "seconds": round(self.seconds, 3),
+            "pages_per_sec": round(self.pages / self.seconds, 2) if self.seconds else None,
+            "cdp_calls_per_page": calls_per_page,
+            "extraction_ms": percentiles(self.extraction_times),
+        }
+
+
+async def _bench_browser(page: Page, router: ReplayRouter, engine_name: str, queries: dict[str, int], repeat: int) -> dict:
+    totals = _Totals()
+    for _ in range(repeat):
+        for query, depth in queries.items():
+            engine = _unpaced(ENGINES[engine_name]())
+            engine.recorder = None
+            links: set[str] = set()
+            calls, routed = _protocol_calls(page), router.routed
+            started = time.perf_counter()
+            try:
+                await engine.parse(page, query, depth, links)
+            except Exception as e:
+                totals.failed += 1
+                logger.warning(f"Benchmark {engine_name} '{query}': {e}")
+                continue
+            seconds = time.perf_counter() - started
+            # fulfill/abort перехвата - цена replay, а не движка
+            calls_after = _protocol_calls(page)
+            if calls is not None and calls_after is not None:
+                calls = calls_after - calls - (router.routed - routed)
+            else:
+                calls = None
+            totals.add(engine, len(links), seconds, calls)
+    return totals.report(browser=True)
+
+
+async def _bench_http(archive: SerpArchive, engine_name: str, queries: dict[str, int], repeat: int) -> dict:
+    totals = _Totals()
+    client = HttpSerpClient(os.path.join(archive.directory, "replay_cookies.json"), transport=replay_transport(archive))
+    try:
+        for _ in range(repeat):
+            for query, depth in queries.items():
+                engine = HttpSearchEngine(ENGINES[engine_name](), client=client)
+                _unpaced(engine)
+                engine.recorder = None
+                links: set[str] = set()
+                started = time.perf_counter()
+                try:
+                    await engine.parse(None, query, depth, links)
+                except SerpBlockedError as e:
+                    totals.failed += 1
+                    logger.warning(f"Benchmark http {engine_name} '{query}': {e}")
+                    continue
+                totals.add(engine, len(links), time.perf_counter() - started)
+    finally:
+        await client.close()
+    return totals.report(browser=False)
+
+
+async def _bench_browsers(archive: SerpArchive, engines: list[str], repeat: int, cdp_endpoint: Optional[str], report: dict):
+    """Локальный headless Chromium, либо Chrome по cdp_endpoint (в отдельном контексте, вкладки профиля не трогаются)"""
+    async with async_playwright() as p:
+        if cdp_endpoint:
+            browser = await p.chromium.connect_over_cdp(cdp_endpoint)
+        else:
+            browser = await p.chromium.launch(headless=True)
+        context = await browser.new_context()
+        try:
+            for name in engines:
+                queries = archive.queries(name)
+                if not queries:
+                    logger.warning(f"Benchmark: нет записанной выдачи {name}")
+                    continue
+                page = await context.new_page()
+                router = ReplayRouter(archive)
+                await router.attach(page)
+                report["engines"][name] = await _bench_browser(page, router, name, queries, repeat)
+                await page.close()
+        finally:
+            await context.close()
+            if not cdp_endpoint:
+                await browser.close()
+
+
+async def run_benchmark(
+    archive_dir: str,
+    engines: list[str],
+    repeat: int = 1,
+    http: bool = False,
+    browser: bool = True,
+    cdp_endpoint: Optional[str] = None,
+) -> dict:
+    """Прогон движков по записанной выдаче без пауз; отчёт по каждому движку
+
+    browser - YandexEngine/GoogleEngine во вкладке, http - HttpSearchEngine
+    на тех же записях.
+    """
+    archive = SerpArchive(archive_dir)
+    human_pauses = settings.human_pauses
+    settings.human_pauses = False
+    report: dict = {"archive": archive_dir, "recorded_pages": len(archive.entries), "engines": {}}
+    try:
+        if browser:
+            await _bench_browsers(archive, engines, repeat, cdp_endpoint, report)
+        if http:
+            for name in engines:
+                queries = archive.queries(name)
+                if queries:
+                    report["engines"][f"http-{name}"] = await _bench_http(archive, name, queries, repeat)
+    finally:
+        settings.human_pauses = human_pauses
+    report["replay"] = {"hits": archive.hits, "misses": archive.misses}
+    return report
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Iterable, Optional
+
+from .browser_pool import BrowserLease, BrowserPool, probe_cdp
+from .config import settings
+from .rate_governor import governors
+
+logger = logging.getLogger(__name__)
+
+
+class NoHealthyEndpointsError(Exception):
+    """Все CDP endpoints выведены из работы"""
+
+
+class _Endpoint:
+    def __init__(self, pool: BrowserPool):
+        self.pool = pool
+        self.healthy = True
+        self.error: Optional[str] = None
+        self.ejected_at: Optional[float] = None
+        self.ejections = 0
+        # Задачи, выбравшие endpoint, но ещё не получившие lease
+        self.reserved = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def load(self) -> float:
+        return (self.pool.active_leases + self.reserved) / self.pool.size
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.pool.active_leases + self.reserved < self.pool.size
+
+
+class BrowserCluster:
+    """Пул подключений к нескольким Chrome (CDP endpoints) с тем же lease(), что у BrowserPool
+
+    Задача получает endpoint с наименьшей загрузкой, умноженной на "давление"
+    капч (во сколько раз губернаторы endpoint замедлили темп). Endpoint, к
+    которому не удалось подключиться, выводится из работы; фоновая проверка
+    раз в cdp_probe_interval возвращает его, когда CDP снова отвечает.
+    """
+
+    def __init__(self, endpoints: Iterable[str] = None, size: int = None, probe_interval: float = None):
+        endpoints = list(endpoints or settings.cdp_endpoint_list)
+        self.endpoints = {url: _Endpoint(BrowserPool(url, size)) for url in endpoints}
+        for ep in self.endpoints.values():
+            # Слот освободился (в том числе на парковке задачи) - разбудить ждущих в _reserve
+            ep.pool.on_release = self._release
+        self.probe_interval = probe_interval or settings.cdp_probe_interval
+        self._changed = asyncio.Condition()
+        self._prober: Optional[asyncio.Task] = None
+        self.started_at = time.monotonic()
+
+    @property
+    def cdp_endpoint(self) -> str:
+        """Первый endpoint - для совместимости с кодом, ожидающим BrowserPool"""
+        return next(iter(self.endpoints))
+
+    @property
+    def size(self) -> int:
+        return sum(ep.pool.size for ep in self.endpoints.values())
+
+    async def start(self):
+        """Подключение ко всем endpoint; недоступные сразу выводятся из работы"""
+        results = await asyncio.gather(
+            *(ep.pool.start() for ep in self.endpoints.values()), return_exceptions=True
+        )
+        for ep, result in zip(self.endpoints.values(), results):
+            if isinstance(result, Exception):
+                self._eject(ep, result)
+        if self._prober is None:
+            self._prober = asyncio.create_task(self._probe_loop())
+        if not any(ep.healthy for ep in self.endpoints.values()):
+            raise NoHealthyEndpointsError(f"Ни один CDP endpoint не доступен: {list(self.endpoints)}")
+
+    async def stop(self):
+        if self._prober is not None:
+            self._prober.cancel()
+            await asyncio.gather(self._prober, return_exceptions=True)
+            self._prober = None
+        await asyncio.gather(*(ep.pool.stop() for ep in self.endpoints.values()), return_exceptions=True)
+
+    def _eject(self, ep: _Endpoint, error: Exception):
+        if ep.healthy:
+            ep.ejections += 1
+            ep.ejected_at = time.time()
+            logger.warning(f"CDP endpoint {ep.pool.cdp_endpoint} выведен из работы: {error}")
+        ep.healthy = False
+        ep.error = str(error)
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            await self._probe_unhealthy()
+
+    async def _probe_unhealthy(self):
+        """Вернуть в работу выведенные endpoint, которые снова отвечают по CDP"""
+        for ep in [ep for ep in self.endpoints.values() if not ep.healthy]:
+            try:
+                await asyncio.to_thread(probe_cdp, ep.pool.cdp_endpoint)
+            except Exception as e:
+                ep.error = str(e)
+                continue
+            logger.info(f"CDP endpoint {ep.pool.cdp_endpoint} снова доступен")
+            ep.healthy = True
+            ep.error = None
+            async with self._changed:
+                self._changed.notify_all()
+
+    def _pick(self) -> Optional[_Endpoint]:
+        candidates = [ep for ep in self.endpoints.values() if ep.healthy and ep.has_capacity]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda ep: (ep.load + 1 / ep.pool.size) * governors.pressure(ep.pool.cdp_endpoint))
+
+    async def _reserve(self) -> _Endpoint:
+        async with self._changed:
+            while True:
+                if not any(ep.healthy for ep in self.endpoints.values()):
+                    errors = {url: ep.error for url, ep in self.endpoints.items()}
+                    raise NoHealthyEndpointsError(f"Ни один CDP endpoint не доступен: {errors}")
+                ep = self._pick()
+                if ep is not None:
+                    ep.reserved += 1
+                    return ep
+                await self._changed.wait()
+
+    async def _release(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[BrowserLease]:
+        """Lease на наименее загруженном исправном endpoint; при ошибке подключения - на следующем"""
+        started = time.monotonic()
+        for _ in range(len(self.endpoints) + 1):
+            if not any(ep.healthy for ep in self.endpoints.values()):
+                # Не ждём фоновую проверку: Chrome мог подняться после старта сервиса
+                await self._probe_unhealthy()
+            ep = await self._reserve()
+            stack = AsyncExitStack()
+            lease = None
+            try:
+                lease = await stack.enter_async_context(ep.pool.lease())
+            except Exception as e:
+                self._eject(ep, e)
+                last_error = e
+            finally:
+                ep.reserved -= 1
+            if lease is not None:
+                break
+            # Резерв снят: ждущие в _reserve выбирают заново (или узнают, что исправных не осталось)
+            await self._release()
+        else:
+            raise NoHealthyEndpointsError(f"Не удалось подключиться ни к одному CDP endpoint: {last_error}")
+        lease.wait_seconds = time.monotonic() - started
+        leased_at = time.monotonic()
+        try:
+            async with stack:
+                yield lease
+        finally:
+            ep.busy_seconds += time.monotonic() - leased_at
+
+    async def tab_stats(self) -> list[dict]:
+        return list(await asyncio.gather(*(ep.pool.tab_stats() for ep in self.endpoints.values())))
+
+    def stats(self) -> dict:
+        uptime = max(time.monotonic() - self.started_at, 1e-9)
+        endpoints = []
+        for url, ep in self.endpoints.items():
+            endpoints.append({
+                **ep.pool.stats(),
+                "healthy": ep.healthy,
+                "error": ep.error,
+                "ejected_at": ep.ejected_at,
+                "ejections": ep.ejections,
+                "utilization": round(ep.pool.active_leases / ep.pool.size, 3),
+                # Доля времени, когда слоты endpoint были заняты, с запуска
+                "avg_utilization": round(ep.busy_seconds / (uptime * ep.pool.size), 3),
+                "captcha_pressure": round(governors.pressure(url), 2),
+            })
+        return {
+            "size": self.size,
+            "healthy_endpoints": sum(ep.healthy for ep in self.endpoints.values()),
+            "active_leases": sum(ep.pool.active_leases for ep in self.endpoints.values()),
+            "endpoints": endpoints,
+        }
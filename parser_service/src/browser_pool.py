@@ -0,0 +1,247 @@
+import asyncio
+import json
+import logging
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from playwright.async_api import (
+    async_playwright,
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+)
+
+from .config import settings
+from .metrics import timed
+from .scheduler import parkable
+from .tab_pool import TabPool
+
+logger = logging.getLogger(__name__)
+
+
+def probe_cdp(cdp_endpoint: str) -> dict:
+    """Проверка доступности CDP endpoint (блокирующий вызов, запускать через to_thread)"""
+    # Chrome CDP blocks Python HTTP libraries, so use subprocess to call curl
+    result = subprocess.run(
+        ["curl", "-s", "-m", "5", f"{cdp_endpoint}/json/version"],
+        capture_output=True,
+        text=True,
+        timeout=6
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise Exception(f"curl returned code {result.returncode}: {result.stderr}")
+    try:
+        data = json.loads(result.stdout)
+    except json.JSONDecodeError:
+        raise Exception("CDP response is not valid JSON")
+    if "Browser" not in data:
+        raise Exception("CDP response missing Browser field")
+    return data
+
+
+@dataclass
+class BrowserLease:
+    """Аренда контекста браузера: страницы, открытые через lease, при возврате
+    уходят в пул тёплых вкладок (tabs) или закрываются"""
+    context: BrowserContext
+    wait_seconds: float
+    pages: list[Page] = field(default_factory=list)
+    cdp_endpoint: str = ""
+    tabs: Optional[TabPool] = None
+    # Вкладки в неизвестном состоянии (ошибка задачи) - закрыть, а не вернуть в пул
+    retired: set = field(default_factory=set)
+
+    async def new_page(self, tab_name: str = None) -> Page:
+        """Вкладка поисковика tab_name ("Yandex", "Google#1") - из пула; без имени - новая"""
+        if tab_name is not None and self.tabs is not None:
+            page = await self.tabs.acquire(tab_name)
+        else:
+            page = await self.context.new_page()
+        self.pages.append(page)
+        return page
+
+    def retire(self, pages: list[Page] = None):
+        self.retired.update(self.pages if pages is None else pages)
+
+    async def release(self):
+        for page in self.pages:
+            try:
+                if self.tabs is not None:
+                    await self.tabs.release(page, reusable=page not in self.retired)
+                elif not page.is_closed():
+                    await page.close()
+            except Exception as e:
+                logger.debug(f"Ошибка при закрытии страницы: {e}")
+        self.pages.clear()
+        self.retired.clear()
+        if self.tabs is not None:
+            await self.tabs.sweep()
+
+
+class BrowserPool:
+    """Долгоживущее подключение к Chrome через CDP, общее для всех задач процесса"""
+
+    def __init__(self, cdp_endpoint: str = None, size: int = None):
+        self.cdp_endpoint = cdp_endpoint or settings.cdp_endpoint
+        self.size = size or settings.browser_pool_size
+        self.playwright: Optional[Playwright] = None
+        self.browser: Optional[Browser] = None
+        self._context: Optional[BrowserContext] = None
+        self._connect_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(self.size)
+        self.active_leases = 0
+        self.total_leases = 0
+        self.reconnects = 0
+        self.last_lease_wait = 0.0
+        self.max_lease_wait = 0.0
+        # Вызывается, когда слот аренды освободился (конец аренды или парковка задачи на капче)
+        self.on_release: Optional[Callable[[], Awaitable[None]]] = None
+        # Тёплые вкладки поисковиков между задачами (None - вкладка на задачу)
+        self.tabs: Optional[TabPool] = TabPool() if settings.tab_pool else None
+
+    @property
+    def connected(self) -> bool:
+        return self.browser is not None and self.browser.is_connected()
+
+    async def start(self):
+        """Запуск playwright и подключение к Chrome (вызывается из lifespan)"""
+        await self._ensure_connected()
+
+    async def stop(self):
+        """Отключение от Chrome без закрытия самого браузера"""
+        async with self._connect_lock:
+            try:
+                if self.tabs is not None and self.connected:
+                    # Отключение CDP вкладки не закрывает - иначе остались бы в Chrome
+                    await self.tabs.close_all()
+                if self.browser:
+                    await self.browser.close()
+                if self.playwright:
+                    await self.playwright.stop()
+            except Exception as e:
+                logger.debug(f"Ошибка при закрытии пула: {e}")
+            finally:
+                self.browser = None
+                self._context = None
+                self.playwright = None
+
+    async def _ensure_connected(self):
+        if self.connected:
+            return
+        async with self._connect_lock:
+            if self.connected:
+                return
+            if self.browser is not None:
+                self.reconnects += 1
+                logger.warning(f"CDP соединение потеряно, переподключение к {self.cdp_endpoint}")
+            self.browser = None
+            self._context = None
+
+            with timed("cdp_connect"):
+                try:
+                    await asyncio.to_thread(probe_cdp, self.cdp_endpoint)
+                    logger.info(f"CDP endpoint is available: {self.cdp_endpoint}")
+                except Exception as cdp_check_err:
+                    error_msg = f"Chrome CDP is not available at {self.cdp_endpoint}. Please start Chrome with --remote-debugging-port=9222. Error: {cdp_check_err}"
+                    logger.error(error_msg)
+                    raise Exception(error_msg) from cdp_check_err
+
+                if self.playwright is None:
+                    self.playwright = await async_playwright().start()
+
+                browser = await self.playwright.chromium.connect_over_cdp(self.cdp_endpoint)
+                browser.on("disconnected", self._on_disconnected)
+                self.browser = browser
+                self._context = await self._prepare_context(browser)
+                if self.tabs is not None:
+                    self.tabs.bind(self._context)
+            logger.info(f"Подключено к браузеру через {self.cdp_endpoint}")
+
+    def _on_disconnected(self, browser: Browser):
+        if browser is self.browser:
+            logger.warning(f"Браузер отключился: {self.cdp_endpoint}")
+            self._context = None
+
+    async def _prepare_context(self, browser: Browser) -> BrowserContext:
+        contexts = browser.contexts
+        if len(contexts) == 0:
+            logger.warning("Нет доступных контекстов браузера, создаем новый контекст")
+            # Create a new browser context with small window size (not fullscreen)
+            # Window will be maximized only when captcha is detected
+            context = await browser.new_context(
+                viewport={"width": 800, "height": 600},
+                no_viewport=False
+            )
+            logger.info("Создан новый контекст браузера (размер окна: 800x600)")
+        else:
+            context = contexts[0]
+            logger.info(f"Используем существующий контекст с {len(context.pages)} открытыми страницами")
+
+            # Ensure existing pages have small viewport if not set
+            for page in context.pages:
+                try:
+                    current_viewport = page.viewport_size
+                    if current_viewport is None or current_viewport.get("width", 0) > 1200:
+                        await page.set_viewport_size({"width": 800, "height": 600})
+                except:
+                    pass
+
+        # HTTP заголовки
+        await context.set_extra_http_headers({
+            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        })
+        return context
+
+    async def _leases_changed(self, delta: int):
+        self.active_leases += delta
+        if delta < 0 and self.on_release is not None:
+            await self.on_release()
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[BrowserLease]:
+        """Выдача контекста браузера задаче; ждёт свободный слот и переподключается при обрыве
+
+        Слот аренды - на всю задачу: на время капчи (парковка в scheduler) он
+        отпускается, вкладки задачи при этом остаются за ней.
+        """
+        started = time.monotonic()
+        async with parkable(self._slots, self._leases_changed, shared=True):
+            await self._ensure_connected()
+            wait_seconds = time.monotonic() - started
+            self.last_lease_wait = wait_seconds
+            self.max_lease_wait = max(self.max_lease_wait, wait_seconds)
+            self.total_leases += 1
+            logger.info(f"Lease выдан за {wait_seconds:.3f}с (активных: {self.active_leases}/{self.size})")
+
+            lease = BrowserLease(
+                context=self._context, wait_seconds=wait_seconds, cdp_endpoint=self.cdp_endpoint, tabs=self.tabs
+            )
+            try:
+                yield lease
+            finally:
+                await lease.release()
+
+    def stats(self) -> dict:
+        return {
+            "cdp_endpoint": self.cdp_endpoint,
+            "connected": self.connected,
+            "size": self.size,
+            "active_leases": self.active_leases,
+            "total_leases": self.total_leases,
+            "reconnects": self.reconnects,
+            "last_lease_wait_seconds": round(self.last_lease_wait, 3),
+            "max_lease_wait_seconds": round(self.max_lease_wait, 3),
+            "tabs": self.tabs.stats() if self.tabs is not None else None,
+        }
+
+    async def tab_stats(self) -> dict:
+        """Вкладки пула и память Chrome для GET /tabs (обращается к Chrome по CDP)"""
+        if self.tabs is None:
+            return {"cdp_endpoint": self.cdp_endpoint, "tab_pool": False}
+        memory = await self.tabs.memory() if self.connected else {}
+        return {"cdp_endpoint": self.cdp_endpoint, "tab_pool": True, **self.tabs.stats(), **memory}
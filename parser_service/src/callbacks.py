@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+import httpx
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Backend может ещё не успеть записать run (404) или быть перегружен - такие ответы повторяем,
+# 409 (задача чужого run) и прочие 4xx - окончательный отказ
+RETRY_STATUSES = {404, 408, 425, 429}
+
+
+class CallbackSender:
+    """Фоновая отправка событий задач на callback_url с повторами"""
+
+    def __init__(self):
+        self._pending: set[asyncio.Task] = set()
+        self.delivered = 0
+        self.failed = 0
+
+    def send(self, url: str, payload: dict, attempts: int = None) -> asyncio.Task:
+        task = asyncio.create_task(self._post(url, payload, attempts or settings.callback_attempts))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        return task
+
+    async def _post(self, url: str, payload: dict, attempts: int) -> bool:
+        delay = settings.callback_retry_delay
+        async with httpx.AsyncClient(timeout=settings.callback_timeout) as client:
+            for attempt in range(1, attempts + 1):
+                try:
+                    response = await client.post(url, json=payload)
+                    if response.status_code < 400:
+                        self.delivered += 1
+                        return True
+                    if response.status_code < 500 and response.status_code not in RETRY_STATUSES:
+                        logger.error(f"Callback rejected: {url} -> {response.status_code} {response.text[:200]}")
+                        break
+                    logger.warning(f"Callback attempt {attempt}/{attempts}: {url} -> {response.status_code}")
+                except httpx.HTTPError as e:
+                    logger.warning(f"Callback attempt {attempt}/{attempts}: {url} -> {e}")
+                if attempt < attempts:
+                    await asyncio.sleep(delay)
+                    delay *= 2
+        self.failed += 1
+        return False
+
+    async def close(self, timeout: float = 10.0):
+        """Дать незавершённым отправкам шанс уйти при остановке сервиса"""
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "delivered": self.delivered, "failed": self.failed}
@@ -0,0 +1,51 @@
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BatchCheckpoint:
+    """Прогресс пакетного прогона cli.py parse-batch: готовые ключи и ошибки
+
+    Файл перезаписывается атомарно (os.replace) после каждого ключа, поэтому
+    прерванный прогон продолжается с первого незавершённого ключа. Ключи с
+    ошибкой при продолжении повторяются.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: set[str] = set()
+        self.failed: dict[str, str] = {}
+        self.started_at = time.time()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.done = set(data.get("done", []))
+            self.failed = dict(data.get("failed", {}))
+            self.started_at = data.get("started_at", self.started_at)
+            logger.info(f"Checkpoint {path}: готово {len(self.done)}, с ошибкой {len(self.failed)}")
+
+    def pending(self, keywords: list[str]) -> list[str]:
+        return [k for k in keywords if k not in self.done]
+
+    def mark(self, keyword: str, error: Optional[str] = None):
+        if error:
+            self.failed[keyword] = error
+        else:
+            self.done.add(keyword)
+            self.failed.pop(keyword, None)
+        self._save()
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "started_at": self.started_at,
+                "updated_at": time.time(),
+                "done": sorted(self.done),
+                "failed": self.failed,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
@@ -1,12 +1,83 @@
 from pydantic_settings import BaseSettings
-from typing import Literal
+from typing import Literal, Optional
 
 class Settings(BaseSettings):
     cdp_endpoint: str = "http://127.0.0.1:9222"
+    # Несколько Chrome (профили/машины): JSON-список, например CDP_ENDPOINTS='["http://127.0.0.1:9222", "http://10.0.0.5:9222"]'
+    cdp_endpoints: list[str] = []
+    cdp_probe_interval: float = 30.0  # Перепроверка выведенных из работы endpoint, сек
     log_file: str = "parser.log"
     results_file: str = "results.txt"
     default_pause_min: float = 1.5
     default_pause_max: float = 4.5
+    human_pauses: bool = True  # False - без пауз human_behavior (benchmark на записанной выдаче)
+    browser_pool_size: int = 4  # Сколько задач одновременно держат контекст браузера (на каждый endpoint)
+    tab_pool: bool = True  # Переиспользовать вкладки поисковиков между задачами (False - новая вкладка на задачу)
+    warm_tabs_per_engine: int = 1  # Сколько вкладок на домене поисковика держать открытыми заранее
+    tab_max_uses: int = 30  # После стольких задач вкладка закрывается и создаётся заново
+    tab_idle_seconds: float = 600.0  # Простаивающая дольше вкладка закрывается
+    parse_workers: int = 4  # Воркеры очереди задач в api.py (на каждый endpoint)
+    parse_queue_max: int = 1000
+    # Старение приоритета: за каждые N секунд ожидания задача поднимается на класс выше
+    parse_priority_aging_seconds: float = 120.0
+    yandex_max_concurrency: int = 1  # Одновременные сессии Яндекса на endpoint (капча!)
+    google_max_concurrency: int = 2  # На endpoint
+    google_parallel_tabs: int = 1  # >1: страницы Google грузятся по start= в N вкладках, у каждой свой темп
+    # Темп переходов по выдаче (RateGovernor): стартовая средняя пауза, сек
+    yandex_pace_seconds: float = 11.0
+    google_pace_seconds: float = 3.5
+    default_pace_seconds: float = 5.0
+    pace_min_factor: float = 0.4  # Нижняя граница паузы после серии без капч (x стартовая)
+    pace_max_factor: float = 6.0  # Верхняя граница после капч
+    pace_relax_after: int = 20  # Чистых переходов до ослабления
+    pace_burst: int = 1
+    pace_jitter: float = 0.3  # Случайная добавка к паузе, доля интервала
+    # Перехват запросов вкладок выдачи (RouteProfile): "serp" - блокировать лишнее, "off" - грузить всё
+    route_profile: Literal["serp", "off"] = "serp"
+    route_block_types: list[str] = ["image", "media", "font"]
+    route_block_hosts: list[str] = [
+        "mc.yandex.ru",
+        "an.yandex.ru",
+        "yandexadexchange.net",
+        "adfox.ru",
+        "google-analytics.com",
+        "googletagmanager.com",
+        "doubleclick.net",
+        "googlesyndication.com",
+        "googleadservices.com",
+        "top-fwz1.mail.ru",
+    ]
+    results_wait_timeout: float = 15.0  # Ожидание контейнера выдачи после DOM-ready, сек
+    # Ранняя остановка листания (EarlyStop): доля новых доменов на странице ниже порога N страниц подряд
+    early_stop: bool = False  # По умолчанию для запросов без early_stop
+    early_stop_min_new_share: float = 0.2
+    early_stop_pages: int = 2
+    # Режим mode="http" (HttpSearchEngine): выдача без браузера
+    http_cookie_path: str = "http_cookies.json"
+    http_timeout: float = 20.0
+    http_max_connections: int = 20
+    serp_record_dir: Optional[str] = None  # Каталог записи страниц выдачи (SerpRecorder) для replay/benchmark
+    serp_cache_path: str = "serp_cache.sqlite3"
+    serp_cache_ttl: float = 24 * 3600  # Секунды; ParseRequest.max_age переопределяет
+    task_store_path: str = "tasks.sqlite3"
+    # Ссылки задач (ResultStore): сжатые NDJSON-сегменты + индекс по task_id
+    result_store_dir: str = "results"
+    result_segment_bytes: int = 64 * 1024 * 1024
+    result_segment_seconds: float = 24 * 3600  # Сегмент закрывается и по возрасту - иначе retention до него не дойдёт
+    result_purge_interval: float = 3600.0  # Не чаще раза в столько секунд запись проверяет retention
+    result_retention: float = 30 * 24 * 3600  # Секунды с последней записи в сегмент
+    result_store_max_bytes: int = 2 * 1024 ** 3
+    task_store_max_memory: int = 200  # Задач в памяти, остальные читаются с диска
+    task_store_ttl: float = 7 * 24 * 3600
+    stream_heartbeat_seconds: float = 15.0  # /results/{task_id}/stream
+    callback_attempts: int = 6  # Повторы POST на callback_url (пауза удваивается)
+    callback_retry_delay: float = 1.0
+    callback_timeout: float = 30.0
+    
+    @property
+    def cdp_endpoint_list(self) -> list[str]:
+        """CDP endpoints для BrowserCluster: cdp_endpoints или единственный cdp_endpoint"""
+        return self.cdp_endpoints or [self.cdp_endpoint]
     
     class Config:
         env_file = ".env"
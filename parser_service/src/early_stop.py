@@ -0,0 +1,60 @@
+from typing import Iterable
+from urllib.parse import urlparse
+
+from .config import settings
+
+
+def link_domain(link: str) -> str:
+    """"https://www.a.ru/x" -> "a.ru" (домены блеклиста backend хранятся без www.)"""
+    host = (urlparse(link).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def known_domain_set(domains: Iterable[str]) -> frozenset[str]:
+    return frozenset(d.strip().lower().removeprefix("www.") for d in domains if d and d.strip())
+
+
+class EarlyStop:
+    """Ранняя остановка листания выдачи одного поисковика по ключу
+
+    Новый домен - не из known (блеклист и решения модератора в backend) и не
+    встречался на предыдущих страницах. Если доля новых доменов страницы ниже
+    min_new_share patience страниц подряд, дальше не листаем. Страницы подаются
+    по порядку (observe), next_page - следующая ожидаемая.
+    """
+
+    def __init__(
+        self,
+        known: frozenset[str] = frozenset(),
+        min_new_share: float = None,
+        patience: int = None,
+        start_page: int = 1,
+    ):
+        self.known = known
+        self.min_new_share = settings.early_stop_min_new_share if min_new_share is None else min_new_share
+        self.patience = max(1, patience or settings.early_stop_pages)
+        self.next_page = start_page
+        self.seen: set[str] = set()
+        self.low_pages = 0
+        # Доля новых доменов по страницам
+        self.shares: dict[int, float] = {}
+
+    def is_known(self, domain: str) -> bool:
+        """Домен или любой его родитель (shop.a.ru -> a.ru) в known"""
+        parts = domain.split(".")
+        return any(".".join(parts[i:]) in self.known for i in range(len(parts) - 1))
+
+    def observe(self, links: list[str]) -> bool:
+        """Очередная страница выдачи; True - пора остановиться"""
+        domains = {link_domain(link) for link in links} - {""}
+        new = [d for d in domains if d not in self.seen and not self.is_known(d)]
+        self.seen |= domains
+        share = len(new) / len(domains) if domains else 0.0
+        self.shares[self.next_page] = round(share, 3)
+        self.next_page += 1
+        self.low_pages = self.low_pages + 1 if share < self.min_new_share else 0
+        return self.triggered
+
+    @property
+    def triggered(self) -> bool:
+        return self.low_pages >= self.patience
@@ -1,28 +1,250 @@
+import asyncio
 import logging
-from typing import Set
+from collections import deque
+from typing import Awaitable, Callable, Optional, Sequence, Set
 import time
-from playwright.async_api import Page
+from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+from .config import settings
+from .early_stop import EarlyStop
 from .human_behavior import (
     human_pause,
     very_human_behavior,
     light_human_behavior,
+    is_captcha_url,
     wait_for_captcha,
 )
+from .metrics import CAPTCHAS, LINKS_COLLECTED, observe, timed
+from .rate_governor import RateGovernor, governors
+from .route_profile import take_traffic
+from .serp_replay import SerpRecorder
 
 logger = logging.getLogger(__name__)
 
+# Извлечение выдачи за один вызов page.evaluate вместо CDP-запроса на каждый <a>.
+# Если контейнеры органической выдачи не найдены (сменилась вёрстка),
+# берём ссылки по fallback-селектору со всей страницы.
+EXTRACT_RESULTS_JS = """
+({containers, links, titles, fallback}) => {
+    const out = [];
+    const seen = new Set();
+    const push = (a, rank, title) => {
+        const href = a.getAttribute('href');
+        if (!href || seen.has(href)) return;
+        seen.add(href);
+        out.push({href, title, rank});
+    };
+    const blocks = containers ? Array.from(document.querySelectorAll(containers)) : [];
+    if (blocks.length) {
+        blocks.forEach((block, i) => {
+            const t = titles ? block.querySelector(titles) : null;
+            const title = t ? t.textContent.trim() : null;
+            block.querySelectorAll(links).forEach(a => push(a, i + 1, title));
+        });
+    } else {
+        document.querySelectorAll(fallback).forEach((a, i) => {
+            push(a, i + 1, (a.textContent || '').trim() || null);
+        });
+    }
+    return out;
+}
+"""
+
 class SearchEngine:
+    # Селекторы органической выдачи для EXTRACT_RESULTS_JS
+    result_container_selector: str = ""
+    result_link_selector: str = "a"
+    result_title_selector: str = "h2, h3"
+    fallback_link_selector: str = "a"
+    # Ссылка на следующую страницу выдачи (нет - выдача закончилась)
+    next_page_selector: str = ""
+    
     def __init__(self, name: str):
         self.name = name
+        # Значение label engine в /metrics
+        self.metrics_label = name.lower()
+        self.extraction_times: list[float] = []
+        # Нормализованные ссылки по номерам страниц (для SerpCache)
+        self.page_links: dict[int, list[str]] = {}
+        # Страница, на которой выдача закончилась (нет кнопки "дальше")
+        self.last_page: Optional[int] = None
+        # С какой страницы собирать: предыдущие SearchParser берёт из SerpCache
+        self.start_page = 1
+        # Политика ранней остановки (None - листаем до depth) и страница, на которой остановились
+        self.early_stop: Optional[EarlyStop] = None
+        self.stopped_at: Optional[int] = None
+        # Колбэк по каждой собранной странице: on_page(engine, page_number, links, ranks)
+        self.on_page: Optional[Callable[[str, int, list[str], list[int]], Awaitable[None]]] = None
+        # Сколько вкладок поисковику нужно на ключ (extra_pages в parse = tabs_wanted - 1)
+        self.tabs_wanted = 1
+        # Метрики вкладок параллельного режима: [{tab, pages, seconds, captcha}]
+        self.tab_stats: list[dict] = []
+        # Темп переходов по выдаче; SearchParser подставляет губернатор своего CDP endpoint
+        self.governor: RateGovernor = governors.get(name.lower())
+        # Сколько секунд заняла каждая капча (ручное решение)
+        self.captcha_waits: list[float] = []
+        # По страницам: время загрузки до контейнера выдачи и трафик вкладки (RouteProfile)
+        self.page_metrics: list[dict] = []
+        self._load_started: dict[int, float] = {}
+        self._load_seconds: dict[int, float] = {}
+        # Запись страниц выдачи для replay/benchmark (settings.serp_record_dir)
+        self.recorder: Optional[SerpRecorder] = SerpRecorder.from_settings()
+    
+    async def parse(
+        self, page: Page, query: str, depth: int, collected_links: Set[str], extra_pages: Sequence[Page] = ()
+    ):
+        raise NotImplementedError
+    
+    def normalize_link(self, href: str) -> Optional[str]:
+        """Фильтрация и нормализация ссылки из выдачи; None - ссылку пропускаем"""
+        raise NotImplementedError
+    
+    def stop_early(self) -> bool:
+        """Страницы, собранные подряд, - в политику early_stop; True - дальше не листаем"""
+        policy = self.early_stop
+        if policy is None:
+            return False
+        while self.stopped_at is None and policy.next_page in self.page_links:
+            n = policy.next_page
+            if policy.observe(self.page_links[n]):
+                self.stopped_at = n
+                logger.info(
+                    f"{self.name}: новых доменов меньше {policy.min_new_share:.0%} "
+                    f"{policy.patience} стр. подряд - останавливаемся на странице {n}"
+                )
+        return self.stopped_at is not None
     
-    async def parse(self, page: Page, query: str, depth: int, collected_links: Set[str]):
+    @staticmethod
+    def search_url(query: str, page_number: int = 1) -> str:
+        """Прямой URL страницы выдачи page_number"""
         raise NotImplementedError
+    
+    async def wait_captcha(self, page: Page) -> float:
+        """wait_for_captcha с учётом времени на капчах"""
+        waited = await wait_for_captcha(page, self.name)
+        if waited:
+            self.captcha_waits.append(round(waited, 1))
+            CAPTCHAS.labels(engine=self.metrics_label).inc()
+            observe("captcha_wait", waited, self.metrics_label, "solved")
+        return waited
+    
+    async def navigated(self, page: Page) -> bool:
+        """После перехода по выдаче: ожидание капчи и отчёт губернатору; True - была капча"""
+        captcha = await self.wait_captcha(page) > 0
+        self.governor.record(captcha)
+        if captcha:
+            # Время на капче в загрузку страницы не входит
+            self._load_started[id(page)] = time.perf_counter()
+        return captcha
+    
+    def mark_navigation(self, page: Page):
+        """Начало загрузки страницы выдачи во вкладке (для page_metrics)"""
+        self._load_started[id(page)] = time.perf_counter()
+        take_traffic(page)
+    
+    async def wait_results(self, page: Page):
+        """DOM-ready уже дождались при переходе; ждём контейнер выдачи, а не networkidle"""
+        selector = self.result_container_selector or self.fallback_link_selector
+        status = "ok"
+        try:
+            await page.wait_for_selector(selector, timeout=settings.results_wait_timeout * 1000)
+        except PlaywrightTimeoutError:
+            # Пустая выдача или сменилась вёрстка - извлечение уйдёт в fallback
+            logger.warning(f"{self.name}: не дождались '{selector}' за {settings.results_wait_timeout:.0f}с")
+            status = "no_results"
+        started = self._load_started.get(id(page))
+        if started is not None:
+            self._load_seconds[id(page)] = time.perf_counter() - started
+            observe("navigation", self._load_seconds[id(page)], self.metrics_label, status)
+    
+    async def loaded(self, page: Page) -> bool:
+        """После перехода: капча, затем контейнер выдачи"""
+        captcha = await self.navigated(page)
+        await self.wait_results(page)
+        return captcha
+    
+    async def click_next(self, page: Page, next_btn):
+        """Клик по "дальше" с ожиданием DOM-ready новой страницы"""
+        self.mark_navigation(page)
+        try:
+            async with page.expect_navigation(wait_until="domcontentloaded", timeout=settings.results_wait_timeout * 1000):
+                await next_btn.click()
+        except PlaywrightTimeoutError:
+            logger.warning(f"{self.name}: переход по кнопке 'дальше' не завершился")
+        await self.loaded(page)
+    
+    async def behave(self, page: Page):
+        """Поведение на странице: полное, пока губернатор осторожничает после капч"""
+        with timed("behaviour", self.metrics_label):
+            if self.governor.cautious:
+                await very_human_behavior(page)
+            else:
+                await light_human_behavior(page)
+    
+    async def extract_results(self, page: Page) -> list[dict]:
+        """Ссылки текущей страницы выдачи: [{href, title, rank}] за один round trip"""
+        started = time.perf_counter()
+        with timed("extraction", self.metrics_label):
+            results = await page.evaluate(EXTRACT_RESULTS_JS, {
+                "containers": self.result_container_selector,
+                "links": self.result_link_selector,
+                "titles": self.result_title_selector,
+                "fallback": self.fallback_link_selector,
+            })
+        elapsed = time.perf_counter() - started
+        self.extraction_times.append(elapsed)
+        logger.info(f"{self.name}: извлечено {len(results)} ссылок за {elapsed * 1000:.0f} мс")
+        return results
+    
+    async def collect_page(self, page: Page, page_number: int, collected_links: Set[str]) -> list[dict]:
+        """Извлечение и добавление ссылок страницы в collected_links"""
+        results = await self.extract_results(page)
+        if self.recorder is not None:
+            self.recorder.record(self.name.lower(), page.url, await page.content(), page_number)
+        metrics = {"page": page_number, "load_seconds": round(self._load_seconds.pop(id(page), 0.0), 3)}
+        metrics.update(take_traffic(page) or {})
+        await self.store_page(page_number, results, collected_links, metrics)
+        return results
+    
+    async def store_page(self, page_number: int, results: list[dict], collected_links: Set[str], metrics: dict):
+        """Нормализация ссылок страницы, page_links/page_metrics и on_page"""
+        # Ссылка -> позиция в выдаче (первое вхождение после нормализации)
+        ranks: dict[str, int] = {}
+        for item in results:
+            link = self.normalize_link(item["href"])
+            if link:
+                ranks.setdefault(link, item["rank"])
+                collected_links.add(link)
+        self.page_links[page_number] = list(ranks)
+        self.page_metrics.append(metrics)
+        LINKS_COLLECTED.labels(engine=self.metrics_label).inc(len(self.page_links[page_number]))
+        if self.on_page:
+            await self.on_page(self.name.lower(), page_number, self.page_links[page_number], list(ranks.values()))
 
 class YandexEngine(SearchEngine):
+    result_container_selector = "#search-result li.serp-item"
+    result_link_selector = "a.Link"
+    result_title_selector = ".OrganicTitle-LinkText, h2"
+    fallback_link_selector = "a.Link"
+    next_page_selector = "a[aria-label='Следующая страница']"
+    
     def __init__(self):
         super().__init__("YANDEX")
     
-    async def parse(self, page: Page, query: str, depth: int, collected_links: Set[str]):
+    def normalize_link(self, href: str) -> Optional[str]:
+        if href and href.startswith("http") and ".ru" in href:
+            return href.split("?")[0]
+        return None
+    
+    @staticmethod
+    def search_url(query: str, page_number: int = 1) -> str:
+        url = f"https://yandex.ru/search/?text={query.replace(' ', '+')}"
+        if page_number > 1:
+            url += f"&p={page_number - 1}"
+        return url
+    
+    async def parse(
+        self, page: Page, query: str, depth: int, collected_links: Set[str], extra_pages: Sequence[Page] = ()
+    ):
         start_time = time.time()
         logger.info(f"{self.name}: Начало парсинга '{query}'")
         print(f"\n[*] {self.name}: Старт парсинга...")
@@ -41,42 +263,34 @@ class YandexEngine(SearchEngine):
             'upgrade-insecure-requests': '1',
         })
         
-        await human_pause(2, 4)
+        await self.governor.acquire()
         
+        self.mark_navigation(page)
         await page.goto(
-            f"https://yandex.ru/search/?text={query.replace(' ', '+')}",
-            wait_until="networkidle"  # Ждём полной загрузки
+            self.search_url(query, self.start_page),
+            wait_until="domcontentloaded"  # Дальше ждём только контейнер выдачи
         )
-        await wait_for_captcha(page, self.name)
+        await self.loaded(page)
         
-        for n in range(1, depth + 1):
+        for n in range(self.start_page, depth + 1):
             print(f"[PAGE] {self.name}: страница {n}/{depth}")
             
-            await very_human_behavior(page)
-            await human_pause(2, 4)
-            await wait_for_captcha(page, self.name)
+            await self.behave(page)
+            await self.wait_captcha(page)
             
-            elems = page.locator("a.Link")
-            count = await elems.count()
-            
-            for i in range(count):
-                try:
-                    href = await elems.nth(i).get_attribute("href")
-                    if href and href.startswith("http") and ".ru" in href:
-                        collected_links.add(href.split("?")[0])
-                except:
-                    pass
+            await self.collect_page(page, n, collected_links)
             
             if n < depth:
-                next_btn = page.locator("a[aria-label='Следующая страница']")
+                next_btn = page.locator(self.next_page_selector)
                 if await next_btn.count() == 0:
+                    self.last_page = n
+                    break
+                if self.stop_early():
                     break
                 
-                # УВЕЛИЧЕННАЯ пауза между страницами
-                await human_pause(7, 15)  # Было 5-12
-                await next_btn.click()
-                await human_pause(3, 5)
-                await wait_for_captcha(page, self.name)
+                # Пауза между страницами задаёт губернатор (стартовая ~ прежние 7-15 сек)
+                await self.governor.acquire()
+                await self.click_next(page, next_btn)
         
         elapsed = time.time() - start_time
         new_links = len(collected_links) - initial_count
@@ -84,51 +298,170 @@ class YandexEngine(SearchEngine):
         logger.info(f"{self.name}: Завершено за {elapsed:.1f}с, собрано {new_links} ссылок")
 
 class GoogleEngine(SearchEngine):
-    def __init__(self):
+    result_container_selector = "#rso div.g"
+    result_link_selector = "a[href]"
+    result_title_selector = "h3"
+    fallback_link_selector = "a"
+    next_page_selector = "a#pnnext"
+    
+    def __init__(self, parallel_tabs: int = None):
         super().__init__("GOOGLE")
+        self.tabs_wanted = max(1, parallel_tabs or settings.google_parallel_tabs)
+        # Параллельный режим сорвался на капче/ошибке и страницы дособраны последовательно
+        self.parallel_fallback = False
     
-    async def parse(self, page: Page, query: str, depth: int, collected_links: Set[str]):
+    def normalize_link(self, href: str) -> Optional[str]:
+        if (href and href.startswith("http") and
+            ".ru" in href and "google" not in href):
+            return href.split("&")[0]
+        return None
+    
+    @staticmethod
+    def search_url(query: str, page_number: int = 1) -> str:
+        url = f"https://www.google.com/search?q={query.replace(' ', '+')}&hl=ru"
+        if page_number > 1:
+            url += f"&start={(page_number - 1) * 10}"
+        return url
+    
+    async def parse(
+        self, page: Page, query: str, depth: int, collected_links: Set[str], extra_pages: Sequence[Page] = ()
+    ):
         start_time = time.time()
         logger.info(f"{self.name}: Начало парсинга '{query}'")
         print(f"\n[*] {self.name}: Старт парсинга...")
         
         initial_count = len(collected_links)
         
+        await self.governor.acquire()
+        self.mark_navigation(page)
         await page.goto(
-            f"https://www.google.com/search?q={query.replace(' ', '+')}&hl=ru",
+            self.search_url(query, self.start_page),
             timeout=60000,
             wait_until="domcontentloaded"
         )
-        await wait_for_captcha(page, self.name)
+        await self.loaded(page)
         
-        for n in range(1, depth + 1):
+        if extra_pages and depth > self.start_page:
+            await self._parse_parallel([page, *extra_pages], query, depth, collected_links)
+        else:
+            await self._parse_sequential(page, depth, collected_links)
+        
+        elapsed = time.time() - start_time
+        new_links = len(collected_links) - initial_count
+        print(f"[OK] {self.name}: Собрано {new_links} ссылок за {elapsed:.1f} сек ({elapsed/60:.1f} мин)\n")
+        logger.info(f"{self.name}: Завершено за {elapsed:.1f}с, собрано {new_links} ссылок")
+    
+    async def _parse_sequential(self, page: Page, depth: int, collected_links: Set[str]):
+        """Постранично по кнопке "Следующая" (открыта страница start_page)"""
+        for n in range(self.start_page, depth + 1):
             print(f"[PAGE] {self.name}: страница {n}/{depth}")
             
-            await light_human_behavior(page)
-            await wait_for_captcha(page, self.name)
-            
-            elems = page.locator("a")
-            count = await elems.count()
+            await self.behave(page)
+            await self.wait_captcha(page)
             
-            for i in range(count):
-                try:
-                    href = await elems.nth(i).get_attribute("href")
-                    if (href and href.startswith("http") and 
-                        ".ru" in href and "google" not in href):
-                        collected_links.add(href.split("&")[0])
-                except:
-                    pass
+            await self.collect_page(page, n, collected_links)
             
             if n < depth:
-                next_btn = page.locator("a#pnnext")
+                next_btn = page.locator(self.next_page_selector)
                 if await next_btn.count() == 0:
+                    self.last_page = n
+                    break
+                if self.stop_early():
                     break
                 
-                await human_pause(2, 5)
-                await next_btn.click()
-                await wait_for_captcha(page, self.name)
+                await self.governor.acquire()
+                await self.click_next(page, next_btn)
+    
+    async def _collect_direct(self, page: Page, n: int, collected_links: Set[str]):
+        """Страница n уже открыта по start=: сбор и проверка конца выдачи"""
+        await self.wait_results(page)
+        await self.behave(page)
+        await self.collect_page(page, n, collected_links)
+        if await page.locator(self.next_page_selector).count() == 0:
+            self.last_page = n if self.last_page is None else min(self.last_page, n)
+    
+    async def _parse_parallel(self, pages: list[Page], query: str, depth: int, collected_links: Set[str]):
+        """Страница start_page в основной вкладке, следующие до depth - напрямую по start= во всех вкладках
         
-        elapsed = time.time() - start_time
-        new_links = len(collected_links) - initial_count
-        print(f"[OK] {self.name}: Собрано {new_links} ссылок за {elapsed:.1f} сек ({elapsed/60:.1f} мин)\n")
-        logger.info(f"{self.name}: Завершено за {elapsed:.1f}с, собрано {new_links} ссылок")
+        Вкладки разнесены по старту, у каждой свой темп (PaceLane губернатора):
+        N вкладок дают до N переходов за интервал, а капча в любой из них замедляет
+        все. Капча или ошибка в любой вкладке останавливает параллельный сбор,
+        недостающие страницы дособираются последовательно в основной вкладке
+        (с ручным решением капчи).
+        """
+        first = self.start_page
+        print(f"[PAGE] {self.name}: страница {first}/{depth} (параллельно, вкладок: {len(pages)})")
+        await self.behave(pages[0])
+        await self.wait_captcha(pages[0])
+        await self.collect_page(pages[0], first, collected_links)
+        if await pages[0].locator(self.next_page_selector).count() == 0:
+            self.last_page = first
+            return
+        if self.stop_early():
+            return
+        
+        pending = deque(range(first + 1, depth + 1))
+        stop = asyncio.Event()
+        
+        async def tab_worker(tab_no: int, tab: Page):
+            stats = {"tab": tab_no, "pages": 0, "seconds": 0.0, "captcha": False}
+            self.tab_stats.append(stats)
+            pace = self.governor.lane()
+            started = time.perf_counter()
+            # Разносим старт вкладок, чтобы запросы не уходили пачкой
+            await human_pause(tab_no * 0.5, tab_no * 1.5)
+            while pending and not stop.is_set():
+                n = pending.popleft()
+                if self.last_page is not None and n > self.last_page:
+                    continue
+                await pace.acquire()
+                if stop.is_set():
+                    pending.appendleft(n)
+                    break
+                print(f"[PAGE] {self.name}: страница {n}/{depth} (вкладка {tab_no})")
+                try:
+                    self.mark_navigation(tab)
+                    await tab.goto(self.search_url(query, n), timeout=60000, wait_until="domcontentloaded")
+                    captcha = is_captcha_url(tab.url)
+                    pace.record(captcha)
+                    if captcha:
+                        stats["captcha"] = True
+                        CAPTCHAS.labels(engine=self.metrics_label).inc()
+                        logger.warning(f"{self.name}: капча во вкладке {tab_no} на странице {n}")
+                        pending.appendleft(n)
+                        stop.set()
+                        break
+                    await self._collect_direct(tab, n, collected_links)
+                    stats["pages"] += 1
+                    if self.stop_early():
+                        # Уже открытые в других вкладках страницы дособерутся, новые не берём
+                        pending.clear()
+                except Exception as e:
+                    logger.warning(f"{self.name}: вкладка {tab_no}, страница {n}: {e}")
+                    pending.appendleft(n)
+                    stop.set()
+                    break
+            stats["seconds"] = round(time.perf_counter() - started, 3)
+        
+        await asyncio.gather(*(tab_worker(i, tab) for i, tab in enumerate(pages)))
+        
+        if self.last_page is not None:
+            # Вкладки могли успеть открыть страницы за концом выдачи
+            for n in [n for n in self.page_links if n > self.last_page]:
+                del self.page_links[n]
+        remaining = sorted(n for n in pending if self.last_page is None or n <= self.last_page)
+        if not remaining:
+            return
+        
+        self.parallel_fallback = True
+        logger.warning(f"{self.name}: параллельный режим остановлен, последовательно дособираем страницы {remaining}")
+        page = pages[0]
+        for n in remaining:
+            if (self.last_page is not None and n > self.last_page) or self.stop_early():
+                break
+            print(f"[PAGE] {self.name}: страница {n}/{depth}")
+            await self.governor.acquire()
+            self.mark_navigation(page)
+            await page.goto(self.search_url(query, n), timeout=60000, wait_until="domcontentloaded")
+            await self.navigated(page)
+            await self._collect_direct(page, n, collected_links)
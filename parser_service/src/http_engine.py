@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import time
+from typing import Optional, Sequence, Set
+from urllib.parse import parse_qs, urlparse
+
+import httpx
+import lxml.html
+
+from .config import settings
+from .engines import SearchEngine
+from .human_behavior import is_captcha_url
+from .metrics import CAPTCHAS, observe, timed
+from .rate_governor import governors
+
+logger = logging.getLogger(__name__)
+
+# Признаки страницы блокировки в HTML, когда URL не выдаёт капчу
+BLOCK_MARKERS = ("showcaptcha", "g-recaptcha", "captcha-page", "unusual traffic", "/sorry/index")
+
+HTTP_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/143.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+    "Upgrade-Insecure-Requests": "1",
+}
+
+
+class SerpBlockedError(Exception):
+    """Поисковик ответил капчей/блокировкой или недоступен по HTTP - нужен браузерный движок"""
+
+    def __init__(self, engine: str, page_number: int, reason: str):
+        super().__init__(f"{engine}: page {page_number} blocked ({reason})")
+        self.engine = engine
+        self.page_number = page_number
+        self.reason = reason
+
+
+class HttpSerpClient:
+    """Общий httpx-клиент режима http: пул соединений и cookies, сохраняемые на диск"""
+
+    def __init__(self, cookie_path: str = None, transport: httpx.AsyncBaseTransport = None):
+        self.cookie_path = cookie_path or settings.http_cookie_path
+        # Свой транспорт - например, replay записанной выдачи (serp_replay.replay_transport)
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self.requests = 0
+        self.blocked = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Клиент создаётся лениво: нужен работающий event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=HTTP_HEADERS,
+                timeout=settings.http_timeout,
+                follow_redirects=True,
+                transport=self.transport,
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_connections,
+                ),
+            )
+            self._load_cookies()
+        return self._client
+
+    def _load_cookies(self):
+        if not os.path.exists(self.cookie_path):
+            return
+        try:
+            with open(self.cookie_path, encoding="utf-8") as f:
+                for c in json.load(f):
+                    self._client.cookies.set(c["name"], c["value"], domain=c["domain"], path=c["path"])
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать cookies {self.cookie_path}: {e}")
+
+    def save_cookies(self):
+        if self._client is None:
+            return
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in self._client.cookies.jar
+            if c.expires is None or c.expires > time.time()
+        ]
+        with open(self.cookie_path, "w", encoding="utf-8") as f:
+            json.dump(cookies, f, ensure_ascii=False)
+
+    async def get(self, url: str) -> httpx.Response:
+        self.requests += 1
+        return await self.client.get(url)
+
+    async def close(self):
+        if self._client is not None:
+            self.save_cookies()
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "blocked": self.blocked,
+            "cookies": len(self._client.cookies.jar) if self._client else 0,
+        }
+
+
+serp_http = HttpSerpClient()
+
+
+def extract_html(doc, containers: str, links: str, titles: str, fallback: str) -> list[dict]:
+    """То же, что EXTRACT_RESULTS_JS, но по разобранному lxml документу"""
+    out: list[dict] = []
+    seen: set[str] = set()
+
+    def push(a, rank: int, title: Optional[str]):
+        href = a.get("href")
+        if not href or href in seen:
+            return
+        seen.add(href)
+        out.append({"href": href, "title": title, "rank": rank})
+
+    blocks = doc.cssselect(containers) if containers else []
+    if blocks:
+        for i, block in enumerate(blocks, 1):
+            t = block.cssselect(titles) if titles else []
+            title = t[0].text_content().strip() if t else None
+            for a in block.cssselect(links):
+                push(a, i, title)
+    else:
+        for i, a in enumerate(doc.cssselect(fallback), 1):
+            push(a, i, a.text_content().strip() or None)
+    return out
+
+
+def unwrap_redirect(href: str) -> str:
+    """Ссылки HTML-выдачи Google без JS ведут через /url?q=<target>"""
+    if href.startswith("/url?"):
+        target = parse_qs(urlparse(href).query).get("q")
+        if target:
+            return target[0]
+    return href
+
+
+class HttpSearchEngine(SearchEngine):
+    """Поисковик без браузера: GET страниц выдачи по прямым URL, разбор lxml
+
+    Селекторы и нормализация ссылок - от браузерного движка (browser_engine),
+    на капче/блокировке бросает SerpBlockedError, и SearchParser доводит ключ
+    браузерным движком.
+    """
+
+    browserless = True
+
+    def __init__(self, browser_engine: SearchEngine, client: HttpSerpClient = None):
+        super().__init__(browser_engine.name)
+        self.browser_engine = browser_engine
+        self.client = client or serp_http
+        self.result_container_selector = browser_engine.result_container_selector
+        self.result_link_selector = browser_engine.result_link_selector
+        self.result_title_selector = browser_engine.result_title_selector
+        self.fallback_link_selector = browser_engine.fallback_link_selector
+        self.next_page_selector = browser_engine.next_page_selector
+        # Свой темп: запросы идут с IP сервиса, а не из Chrome пользователя
+        self.governor = governors.get(self.name.lower(), "http")
+        self.metrics_label = f"http-{self.name.lower()}"
+
+    def normalize_link(self, href: str) -> Optional[str]:
+        return self.browser_engine.normalize_link(unwrap_redirect(href))
+
+    def search_url(self, query: str, page_number: int = 1) -> str:
+        return self.browser_engine.search_url(query, page_number)
+
+    def _check_blocked(self, response: httpx.Response, page_number: int):
+        reason = None
+        if response.status_code in (403, 429, 503):
+            reason = f"HTTP {response.status_code}"
+        elif is_captcha_url(str(response.url)):
+            reason = "captcha redirect"
+        else:
+            text = response.text[:200000].lower()
+            marker = next((m for m in BLOCK_MARKERS if m in text), None)
+            if marker:
+                reason = f"marker '{marker}'"
+        self.governor.record(reason is not None)
+        if reason:
+            self.client.blocked += 1
+            CAPTCHAS.labels(engine=self.metrics_label).inc()
+            raise SerpBlockedError(self.name, page_number, reason)
+
+    async def parse(self, page, query: str, depth: int, collected_links: Set[str], extra_pages: Sequence = ()):
+        """page не используется: вкладка режиму http не нужна"""
+        start_time = time.time()
+        logger.info(f"{self.name} (http): Начало парсинга '{query}'")
+        initial_count = len(collected_links)
+
+        for n in range(self.start_page, depth + 1):
+            await self.governor.acquire()
+            started = time.perf_counter()
+            url = self.search_url(query, n)
+            try:
+                response = await self.client.get(url)
+                self._check_blocked(response, n)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                observe("navigation", time.perf_counter() - started, self.metrics_label, "error")
+                raise SerpBlockedError(self.name, n, f"{type(e).__name__}: {e}") from e
+            except SerpBlockedError:
+                observe("navigation", time.perf_counter() - started, self.metrics_label, "blocked")
+                raise
+            load_seconds = time.perf_counter() - started
+            observe("navigation", load_seconds, self.metrics_label)
+            if self.recorder is not None:
+                self.recorder.record(self.name.lower(), url, response.text, n)
+
+            started = time.perf_counter()
+            with timed("extraction", self.metrics_label):
+                doc = lxml.html.fromstring(response.text)
+                results = extract_html(
+                    doc,
+                    self.result_container_selector,
+                    self.result_link_selector,
+                    self.result_title_selector,
+                    self.fallback_link_selector,
+                )
+            self.extraction_times.append(time.perf_counter() - started)
+            await self.store_page(n, results, collected_links, {
+                "page": n,
+                "load_seconds": round(load_seconds, 3),
+                "requests": 1,
+                "blocked": 0,
+                "bytes": len(response.content),
+            })
+
+            if self.next_page_selector and not doc.cssselect(self.next_page_selector):
+                self.last_page = n
+                break
+            if n < depth and self.stop_early():
+                break
+
+        elapsed = time.time() - start_time
+        logger.info(f"{self.name} (http): Завершено за {elapsed:.1f}с, собрано {len(collected_links) - initial_count} ссылок")
@@ -2,11 +2,16 @@ import asyncio
 import random
 import logging
 import os
+import time
 from playwright.async_api import Page
+from .config import settings
+from .scheduler import parked
 
 logger = logging.getLogger(__name__)
 
 async def human_pause(a: float = 1.5, b: float = 4.5):
+    if not settings.human_pauses:
+        return
     await asyncio.sleep(random.uniform(a, b))
 
 async def human_scroll(page: Page):
@@ -48,64 +53,95 @@ async def human_type_text(page: Page, selector: str, text: str):
         await asyncio.sleep(random.uniform(0.05, 0.12))
     await human_pause(0.3, 0.8)
 
-async def wait_for_captcha(page: Page, engine_name: str):
-    """Ожидание капчи с принудительной активацией и разворачиванием окна"""
-    captcha_detected = False
+def is_captcha_url(url: str) -> bool:
+    """Страница капчи: showcaptcha у Яндекса, /sorry/ у Google"""
+    url = url.lower()
+    return "captcha" in url or "google.com/sorry/" in url
+
+# Разворачивание/сворачивание окна Chrome для ручного решения капчи (только Windows)
+_PS_MAXIMIZE = '''
+$w = Get-Process chrome | Where {$_.MainWindowTitle -ne ""} | Select -First 1;
+if ($w) {
+    $sig = '[DllImport("user32.dll")] public static extern bool SetForegroundWindow(IntPtr h); [DllImport("user32.dll")] public static extern bool ShowWindow(IntPtr h, int c);';
+    $t = Add-Type -MemberDefinition $sig -Name Win32 -Namespace Native -PassThru;
+    $t::ShowWindow($w.MainWindowHandle, 3); # SW_MAXIMIZE
+    $t::SetForegroundWindow($w.MainWindowHandle);
+}
+'''
+_PS_MINIMIZE = '''
+$w = Get-Process chrome | Where {$_.MainWindowTitle -ne ""} | Select -First 1;
+if ($w) {
+    $sig = '[DllImport("user32.dll")] public static extern bool ShowWindow(IntPtr h, int c);';
+    $t = Add-Type -MemberDefinition $sig -Name Win32 -Namespace Native -PassThru;
+    $t::ShowWindow($w.MainWindowHandle, 6); # SW_MINIMIZE
+}
+'''
+
+async def _powershell(script: str):
+    """Запуск PowerShell без блокировки event loop"""
+    if os.name != "nt":
+        return
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "powershell", "-WindowStyle", "Hidden", "-Command", script,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await asyncio.wait_for(proc.wait(), 10)
+    except Exception as e:
+        logger.debug(f"PowerShell: {e}")
+
+async def wait_for_captcha(page: Page, engine_name: str) -> float:
+    """Ожидание ручного решения капчи; возвращает время на капче, сек (0.0 - капчи не было)
+
+    Решение отслеживается по событию framenavigated основной вкладки, пока капча
+    на экране, задача припаркована и её воркер очереди занят другими задачами.
+    """
+    if not is_captcha_url(page.url):
+        return 0.0
     
-    while True:
-        url = page.url.lower()
-        if "captcha" in url or "showcaptcha" in url:
-            if not captcha_detected:
-                # Maximize browser window when captcha is detected
-                try:
-                    # Set viewport to fullscreen for captcha
-                    await page.set_viewport_size({"width": 1920, "height": 1080})
-                    await page.bring_to_front()
-                    await page.evaluate("() => { window.focus(); }")
-                except:
-                    pass
-                
-                # ПРИНУДИТЕЛЬНАЯ активация и разворачивание через PowerShell
-                try:
-                    import os
-                    ps_cmd = '''
-                    $w = Get-Process chrome | Where {$_.MainWindowTitle -ne ""} | Select -First 1;
-                    if ($w) {
-                        $sig = '[DllImport("user32.dll")] public static extern bool SetForegroundWindow(IntPtr h); [DllImport("user32.dll")] public static extern bool ShowWindow(IntPtr h, int c);';
-                        $t = Add-Type -MemberDefinition $sig -Name Win32 -Namespace Native -PassThru;
-                        $t::ShowWindow($w.MainWindowHandle, 3); # SW_MAXIMIZE
-                        $t::SetForegroundWindow($w.MainWindowHandle);
-                    }
-                    '''
-                    os.system(f'powershell -WindowStyle Hidden -Command "{ps_cmd}"')
-                except:
-                    pass
-                
-                captcha_detected = True
-                logging.warning(f"{engine_name}: Капча!")
-                print(f"\n{'='*60}")
-                print(f"🔔🔔🔔 {engine_name}: КАПЧА ОБНАРУЖЕНА!")
-                print(f"{'='*60}\n")
-                print("\a" * 3)  # 3 звуковых сигнала
-            
-            await asyncio.sleep(2)
-        else:
-            if captcha_detected:
-                # Restore small window size after captcha is solved
+    started = time.monotonic()
+    cleared = asyncio.Event()
+    
+    def on_navigated(frame):
+        if frame == page.main_frame and not is_captcha_url(frame.url):
+            cleared.set()
+    
+    page.on("framenavigated", on_navigated)
+    try:
+        # Maximize browser window when captcha is detected
+        try:
+            await page.set_viewport_size({"width": 1920, "height": 1080})
+            await page.bring_to_front()
+            await page.evaluate("() => { window.focus(); }")
+        except Exception:
+            pass
+        await _powershell(_PS_MAXIMIZE)
+        
+        logger.warning(f"{engine_name}: Капча!")
+        print(f"\n{'='*60}")
+        print(f"🔔🔔🔔 {engine_name}: КАПЧА ОБНАРУЖЕНА!")
+        print(f"{'='*60}\n")
+        print("\a" * 3)  # 3 звуковых сигнала
+        
+        async with parked():
+            # Событие - основной сигнал; редкая проверка URL страхует от пропущенной навигации
+            while is_captcha_url(page.url) and not page.is_closed():
                 try:
-                    await page.set_viewport_size({"width": 800, "height": 600})
-                    # Minimize window again
-                    import os
-                    ps_cmd = '''
-                    $w = Get-Process chrome | Where {$_.MainWindowTitle -ne ""} | Select -First 1;
-                    if ($w) {
-                        $sig = '[DllImport("user32.dll")] public static extern bool ShowWindow(IntPtr h, int c);';
-                        $t = Add-Type -MemberDefinition $sig -Name Win32 -Namespace Native -PassThru;
-                        $t::ShowWindow($w.MainWindowHandle, 6); # SW_MINIMIZE
-                    }
-                    '''
-                    os.system(f'powershell -WindowStyle Hidden -Command "{ps_cmd}"')
-                except:
+                    await asyncio.wait_for(cleared.wait(), 10)
+                except asyncio.TimeoutError:
                     pass
-                print(f"\n[OK] {engine_name}: Капча решена! Продолжаем...\n")
-            break
+    finally:
+        page.remove_listener("framenavigated", on_navigated)
+    
+    # Restore small window size after captcha is solved
+    try:
+        await page.set_viewport_size({"width": 800, "height": 600})
+    except Exception:
+        pass
+    await _powershell(_PS_MINIMIZE)
+    
+    elapsed = time.monotonic() - started
+    logger.info(f"{engine_name}: капча решена за {elapsed:.1f}с")
+    print(f"\n[OK] {engine_name}: Капча решена за {elapsed:.0f} сек! Продолжаем...\n")
+    return elapsed
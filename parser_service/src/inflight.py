@@ -0,0 +1,83 @@
+import time
+from dataclasses import dataclass, field
+from typing import Any, Hashable, Optional
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Ключ для сравнения запросов: регистр, ё/е и лишние пробелы не различаются"""
+    return " ".join(keyword.casefold().replace("ё", "е").split())
+
+
+@dataclass
+class InflightTask:
+    task_id: str
+    key: tuple[str, str, Hashable]
+    depth: int
+    started_at: float = field(default_factory=time.monotonic)
+    # Объединённые с задачей запросы: (task_id, параметры запроса)
+    followers: list[tuple[str, Any]] = field(default_factory=list)
+
+
+class InflightTasks:
+    """Выполняющиеся задачи /parse для объединения одинаковых запросов (singleflight)
+
+    Запрос с тем же ключом (после нормализации) и режимом и глубиной не больше,
+    чем у идущей задачи, браузер не запускает: получает свой task_id, а результат
+    ему копируется из задачи-лидера при её завершении. variant - прочие параметры,
+    меняющие результат (политика ранней остановки): объединяются только равные.
+    """
+
+    def __init__(self):
+        self._tasks: dict[str, InflightTask] = {}
+        # Самая глубокая идущая задача по (ключ, режим, variant)
+        self._by_key: dict[tuple[str, str, Hashable], str] = {}
+        self.deduplicated = 0
+
+    def join(
+        self, keyword: str, mode: str, depth: int, follower_id: str, request: Any, variant: Hashable = None
+    ) -> Optional[str]:
+        """Присоединить запрос к идущей задаче; возвращает task_id лидера или None"""
+        leader_id = self._by_key.get((normalize_keyword(keyword), mode, variant))
+        task = self._tasks.get(leader_id)
+        if task is None or task.depth < depth:
+            return None
+        task.followers.append((follower_id, request))
+        self.deduplicated += 1
+        return task.task_id
+
+    def lead(self, task_id: str, keyword: str, mode: str, depth: int, variant: Hashable = None):
+        """Зарегистрировать новую задачу как лидера для последующих одинаковых запросов"""
+        key = (normalize_keyword(keyword), mode, variant)
+        self._tasks[task_id] = InflightTask(task_id=task_id, key=key, depth=depth)
+        current = self._tasks.get(self._by_key.get(key))
+        if current is None or current.task_id == task_id or current.depth <= depth:
+            self._by_key[key] = task_id
+
+    def followers(self, task_id: str) -> list[tuple[str, Any]]:
+        task = self._tasks.get(task_id)
+        return list(task.followers) if task is not None else []
+
+    def leave(self, follower_id: str) -> Optional[tuple[str, Any]]:
+        """Отцепить объединённый запрос от лидера; возвращает (task_id лидера, параметры запроса)"""
+        for task in self._tasks.values():
+            for i, (task_id, request) in enumerate(task.followers):
+                if task_id == follower_id:
+                    del task.followers[i]
+                    return task.task_id, request
+        return None
+
+    def finish(self, task_id: str) -> list[tuple[str, Any]]:
+        """Снять задачу с учёта; возвращает присоединённые к ней запросы"""
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return []
+        if self._by_key.get(task.key) == task_id:
+            del self._by_key[task.key]
+        return task.followers
+
+    def stats(self) -> dict:
+        return {
+            "inflight": len(self._tasks),
+            "followers": sum(len(t.followers) for t in self._tasks.values()),
+            "deduplicated": self.deduplicated,
+        }
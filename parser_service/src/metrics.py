@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Histogram
+
+# От миллисекунд (извлечение) до минут (очередь, ручная капча)
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_STAGES = {
+    "queue_wait": "Ожидание задачи в очереди scheduler",
+    "cdp_connect": "Подключение к Chrome по CDP",
+    "navigation": "Загрузка страницы выдачи до контейнера результатов",
+    "behaviour": "Имитация поведения пользователя на странице",
+    "extraction": "Извлечение ссылок со страницы выдачи",
+    "captcha_wait": "Ожидание ручного решения капчи",
+    "result_save": "Сохранение результатов задачи",
+}
+
+STAGE_SECONDS = {
+    stage: Histogram(f"parser_{stage}_seconds", doc, ["engine", "status"], buckets=_BUCKETS)
+    for stage, doc in _STAGES.items()
+}
+
+LINKS_COLLECTED = Counter("parser_links_collected_total", "Ссылки со страниц выдачи после нормализации", ["engine"])
+CAPTCHAS = Counter("parser_captchas_total", "Капчи и блокировки поисковиков", ["engine"])
+FAILURES = Counter("parser_failures_total", "Ошибки парсинга", ["engine", "stage"])
+TASKS = Counter("parser_tasks_total", "Завершённые задачи", ["mode", "status"])
+DEDUPLICATED = Counter("parser_deduplicated_requests_total", "Запросы /parse, объединённые с идущей задачей", ["mode"])
+EARLY_STOP_PAGES_SAVED = Counter("parser_early_stop_pages_saved_total", "Страницы выдачи, не открытые из-за ранней остановки", ["engine"])
+
+
+def observe(stage: str, seconds: float, engine: str = "", status: str = "ok"):
+    """Время этапа; engine пустой у этапов, не привязанных к поисковику"""
+    STAGE_SECONDS[stage].labels(engine=engine, status=status).observe(seconds)
+
+
+@contextmanager
+def timed(stage: str, engine: str = ""):
+    """Замер этапа: status="error", если блок завершился исключением"""
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started, engine, status)
@@ -1,60 +1,116 @@
 import asyncio
 import logging
-from typing import Set, Literal
-from playwright.async_api import async_playwright, Browser, Playwright
-from .engines import YandexEngine, GoogleEngine
+from contextlib import AsyncExitStack, nullcontext
+from typing import AsyncContextManager, Awaitable, Callable, Iterable, Literal, Optional, Set, Union
+from playwright.async_api import Page
+from .browser_cluster import BrowserCluster
+from .browser_pool import BrowserLease, BrowserPool
+from .early_stop import EarlyStop, known_domain_set
+from .engines import SearchEngine, YandexEngine, GoogleEngine
+from .http_engine import HttpSearchEngine, SerpBlockedError
+from .metrics import EARLY_STOP_PAGES_SAVED, FAILURES
+from .rate_governor import governors
+from .route_profile import RouteProfile
+from .serp_cache import SerpCache
 from .config import settings
 
 logger = logging.getLogger(__name__)
 
+# "http" - оба поисковика без браузера (HttpSearchEngine), с переходом в браузер на капче
+ParseMode = Literal["yandex", "google", "both", "http"]
+
+class _BrowserSession:
+    """Ленивая аренда браузера на время задачи: пул занимается только при первой нужной вкладке"""
+    
+    def __init__(self, parser: "SearchParser"):
+        self._parser = parser
+        self._stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+        self.lease: Optional[BrowserLease] = None
+        # Вкладка на поисковик, переиспользуется между ключами одного пакета
+        self.pages: dict[str, Page] = {}
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, *exc):
+        if exc_type is not None and self.lease is not None:
+            # Ошибка или отмена посреди навигации - вкладки в пул не возвращаем
+            self.lease.retire()
+        await self._stack.aclose()
+
+    def reset_pages(self):
+        """Вкладки могли остаться в неизвестном состоянии: закрыть при возврате, следующие - заново"""
+        if self.lease is not None:
+            self.lease.retire(list(self.pages.values()))
+        self.pages.clear()
+    
+    async def page(self, engine_name: str) -> Page:
+        async with self._lock:
+            if self.lease is None:
+                if self._parser.pool is None:
+                    await self._parser.connect()
+                self.lease = await self._stack.enter_async_context(self._parser.pool.lease())
+                self._parser.last_lease_wait = self.lease.wait_seconds
+            page = self.pages.get(engine_name)
+            if page is None or page.is_closed():
+                page = self.pages[engine_name] = await self.lease.new_page(engine_name)
+                if self._parser.route_profile is not None:
+                    await self._parser.route_profile.attach(page)
+            return page
+    
+    async def tabs(self, engine_name: str, count: int) -> list[Page]:
+        """Основная вкладка поисковика + count-1 дополнительных (тоже переиспользуются)"""
+        pages = [await self.page(engine_name)]
+        for i in range(1, count):
+            pages.append(await self.page(f"{engine_name}#{i}"))
+        return pages
+
 class SearchParser:
     """Основной класс парсера"""
     
-    def __init__(self, cdp_endpoint: str = None):
+    def __init__(
+        self,
+        cdp_endpoint: str = None,
+        pool: Union[BrowserPool, BrowserCluster] = None,
+        engine_slot: Callable[[str], AsyncContextManager] = None,
+        cache: SerpCache = None,
+        on_page: Callable[[str, int, list[str], str, Optional[list[int]]], Awaitable[None]] = None,
+        route_profile: Optional[RouteProfile] = None,
+        early_stop: bool = None,
+        known_domains: Iterable[str] = (),
+    ):
         self.cdp_endpoint = cdp_endpoint or settings.cdp_endpoint
-        self.browser: Browser = None
-        self.playwright: Playwright = None
-        self._playwright_started = False
+        # Общий пул (api.py) переживает задачу; собственный пул (cli.py) закрывается в close()
+        self.pool = pool
+        self._owns_pool = pool is None
+        # Лимит параллельных сессий на поисковик (ParseScheduler.engine_slot)
+        self.engine_slot = engine_slot
+        # Кэш страниц выдачи: при попадании поисковик не открывается вовсе
+        self.cache = cache
+        self.cache_hits: list[str] = []
+        # Поисковики, дособравшие ключ после страниц из кэша (start_page - в engine_stats)
+        self.cache_resumed: list[str] = []
+        # Метрики поисковиков по ключам: вкладки, капчи, загрузка и трафик страниц
+        self.engine_stats: list[dict] = []
+        # Ссылки по мере сбора: on_page(engine, page_number, links, keyword, ranks); ranks None - страница из кэша
+        self.on_page = on_page
+        self.last_lease_wait: float = 0.0
+        # Перехват запросов вкладок выдачи (картинки, шрифты, трекеры); None - из настроек
+        self.route_profile = route_profile if route_profile is not None else RouteProfile.from_settings()
+        # Ранняя остановка листания; known_domains (блеклист и решения из backend) новыми не считаются
+        self.early_stop = settings.early_stop if early_stop is None else early_stop
+        self.known_domains = known_domain_set(known_domains)
+        # Остановленные раньше depth поисковики по ключам: страница остановки и сэкономленные страницы
+        self.early_stops: list[dict] = []
         
     async def connect(self):
         """Подключение к существующему браузеру через CDP"""
         try:
-            # Check if CDP endpoint is available before connecting
-            import httpx
-            try:
-                # Chrome CDP blocks Python HTTP libraries, so use subprocess to call curl
-                import subprocess
-                import json
-                result = subprocess.run(
-                    ["curl", "-s", "-m", "5", f"{self.cdp_endpoint}/json/version"],
-                    capture_output=True,
-                    text=True,
-                    timeout=6
-                )
-                if result.returncode == 0 and result.stdout:
-                    try:
-                        data = json.loads(result.stdout)
-                        if "Browser" not in data:
-                            raise Exception("CDP response missing Browser field")
-                        logger.info(f"CDP endpoint is available: {self.cdp_endpoint}")
-                    except json.JSONDecodeError:
-                        raise Exception("CDP response is not valid JSON")
-                else:
-                    raise Exception(f"curl returned code {result.returncode}: {result.stderr}")
-            except Exception as cdp_check_err:
-                error_msg = f"Chrome CDP is not available at {self.cdp_endpoint}. Please start Chrome with --remote-debugging-port=9222. Error: {cdp_check_err}"
-                logger.error(error_msg)
-                raise Exception(error_msg) from cdp_check_err
-            
-            # Start playwright only if not already started
-            if not self._playwright_started:
-                self.playwright = await async_playwright().start()
-                self._playwright_started = True
-            
-            # Connect to existing Chrome via CDP
-            self.browser = await self.playwright.chromium.connect_over_cdp(self.cdp_endpoint)
-            logger.info(f"Подключено к браузеру через {self.cdp_endpoint}")
-            return self.browser
+            if self.pool is None:
+                self.pool = BrowserPool(self.cdp_endpoint)
+            await self.pool.start()
+            return self.pool.browser
         except Exception as e:
             logger.error(f"Ошибка подключения к CDP: {e}")
             raise
@@ -62,11 +118,9 @@ class SearchParser:
     async def close(self):
         """Правильное закрытие соединения"""
         try:
-            if self.browser:
+            if self._owns_pool and self.pool:
                 # НЕ закрываем браузер, только отключаемся
-                await self.browser.close()
-            if self.playwright:
-                await self.playwright.stop()
+                await self.pool.stop()
         except Exception as e:
             logger.debug(f"Ошибка при закрытии: {e}")
     
@@ -74,60 +128,202 @@ class SearchParser:
         self,
         keyword: str,
         depth: int,
-        mode: Literal["yandex", "google", "both"]
+        mode: ParseMode,
+        max_age: float = None,
+    ) -> Set[str]:
+        """Основной метод парсинга (max_age - допустимый возраст кэша, сек; 0 - без кэша)"""
+        async with _BrowserSession(self) as session:
+            return await self._parse_keyword(session, keyword, depth, mode, max_age)
+    
+    async def parse_batch(
+        self,
+        keywords: list[str],
+        depth: int,
+        mode: ParseMode,
+        on_keyword: Callable[[str, Set[str], Optional[str]], Awaitable[None]] = None,
+        max_age: float = None,
+    ) -> dict[str, Set[str]]:
+        """Парсинг списка ключей в одной сессии браузера (одна аренда, одна вкладка на поисковик)
+        
+        Ошибка по одному ключу не прерывает пакет: on_keyword получает текст ошибки.
+        """
+        results: dict[str, Set[str]] = {}
+        async with _BrowserSession(self) as session:
+            for i, keyword in enumerate(keywords, 1):
+                logger.info(f"Пакет: ключ {i}/{len(keywords)} '{keyword}'")
+                error = None
+                try:
+                    results[keyword] = await self._parse_keyword(session, keyword, depth, mode, max_age)
+                except Exception as e:
+                    logger.error(f"Пакет: ошибка по ключу '{keyword}': {e}", exc_info=True)
+                    results[keyword] = set()
+                    error = str(e)
+                    # Вкладки могли остаться в неизвестном состоянии - откроем заново
+                    session.reset_pages()
+                if on_keyword:
+                    await on_keyword(keyword, results[keyword], error)
+        return results
+    
+    async def _parse_keyword(
+        self,
+        session: _BrowserSession,
+        keyword: str,
+        depth: int,
+        mode: ParseMode,
+        max_age: float = None,
     ) -> Set[str]:
-        """Основной метод парсинга"""
         query = f"{keyword} купить"
         collected_links: Set[str] = set()
         
         logger.info(f"Начало парсинга: query='{query}', depth={depth}, mode={mode}")
         
-        if not self.browser:
-            await self.connect()
-        
-        contexts = self.browser.contexts
-        if len(contexts) == 0:
-            logger.warning("Нет доступных контекстов браузера, создаем новый контекст")
-            # Create a new browser context with small window size (not fullscreen)
-            # Window will be maximized only when captcha is detected
-            context = await self.browser.new_context(
-                viewport={"width": 800, "height": 600},
-                no_viewport=False
-            )
-            logger.info("Создан новый контекст браузера (размер окна: 800x600)")
-        else:
-            context = contexts[0]
-            logger.info(f"Используем существующий контекст с {len(context.pages)} открытыми страницами")
-            
-            # Ensure existing pages have small viewport if not set
-            for page in context.pages:
-                try:
-                    current_viewport = await page.viewport_size()
-                    if current_viewport is None or current_viewport.get("width", 0) > 1200:
-                        await page.set_viewport_size({"width": 800, "height": 600})
-                except:
-                    pass
-        
-        # HTTP заголовки
-        await context.set_extra_http_headers({
-            'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-        })
-        
         tasks = []
         
         if mode in ["yandex", "both"]:
-            yandex_page = await context.new_page()
-            yandex_engine = YandexEngine()
-            tasks.append(yandex_engine.parse(yandex_page, query, depth, collected_links))
+            tasks.append(self._run_engine(session, YandexEngine(), keyword, query, depth, collected_links, max_age))
         
         if mode in ["google", "both"]:
-            google_page = await context.new_page()
-            google_engine = GoogleEngine()
-            tasks.append(google_engine.parse(google_page, query, depth, collected_links))
+            tasks.append(self._run_engine(session, GoogleEngine(), keyword, query, depth, collected_links, max_age))
+        
+        if mode == "http":
+            for engine in (YandexEngine(), GoogleEngine()):
+                tasks.append(self._run_engine(
+                    session, HttpSearchEngine(engine), keyword, query, depth, collected_links, max_age
+                ))
         
         await asyncio.gather(*tasks)
         
         logger.info(f"Парсинг завершен. Найдено {len(collected_links)} уникальных ссылок")
         
         return collected_links
+
+    async def _run_engine(
+        self,
+        session: _BrowserSession,
+        engine: SearchEngine,
+        keyword: str,
+        query: str,
+        depth: int,
+        collected_links: Set[str],
+        max_age: float = None,
+    ):
+        engine_key = engine.name.lower()
+        cached: dict[int, list[str]] = {}
+        if self.cache is not None:
+            cached, reached_last = self.cache.get_prefix(engine_key, query, depth, max_age)
+            for n, links in cached.items():
+                collected_links.update(links)
+                if self.on_page is not None:
+                    await self.on_page(engine_key, n, links, keyword, None)
+            if reached_last or len(cached) == depth:
+                self.cache_hits.append(engine_key)
+                logger.info(f"{engine.name}: '{query}' из кэша ({len(cached)} стр.)")
+                return
+            if cached:
+                # Ключ собирали на меньшую глубину: браузер открывает сразу следующую страницу
+                self.cache_resumed.append(engine_key)
+                logger.info(f"{engine.name}: '{query}' стр. 1-{len(cached)} из кэша, дособираем с {len(cached) + 1}")
+        
+        engine.start_page = len(cached) + 1
+        engine.early_stop = self._early_stop_policy(cached)
+        if engine.early_stop is not None and engine.early_stop.triggered:
+            # Страницы из кэша уже не дают новых доменов - поисковик не открываем
+            self._record_early_stop(engine, keyword, depth, engine.early_stop.next_page - 1, len(cached))
+            return
+        if isinstance(engine, HttpSearchEngine):
+            engine.browser_engine.start_page = engine.start_page
+            try:
+                await self._fetch_engine(session, engine, keyword, query, depth, collected_links)
+            except SerpBlockedError as e:
+                logger.warning(f"{e} - ключ '{keyword}' дособираем браузером")
+                self._record_engine_stats(engine, keyword, blocked=e.reason)
+                http_engine, engine = engine, engine.browser_engine
+                # Страницы до блокировки уже собраны по http: браузер продолжает со страницы блокировки
+                engine.page_links.update(http_engine.page_links)
+                engine.last_page = http_engine.last_page
+                engine.start_page = e.page_number
+                engine.early_stop = self._early_stop_policy({**cached, **http_engine.page_links})
+                await self._fetch_engine(session, engine, keyword, query, depth, collected_links)
+        else:
+            await self._fetch_engine(session, engine, keyword, query, depth, collected_links)
+        
+        if engine.stopped_at is not None:
+            self._record_early_stop(engine, keyword, depth, engine.stopped_at, max(engine.page_links))
+        if self.cache is not None:
+            self.cache.put_pages(engine_key, query, engine.page_links, engine.last_page)
+    
+    def _early_stop_policy(self, cached: dict[int, list[str]]) -> Optional[EarlyStop]:
+        """Политика ранней остановки для поисковика (None - выключена) с учётом страниц из кэша"""
+        if not self.early_stop:
+            return None
+        policy = EarlyStop(self.known_domains)
+        for n in sorted(cached):
+            if policy.observe(cached[n]):
+                break
+        return policy
+    
+    def _record_early_stop(self, engine: SearchEngine, keyword: str, depth: int, stopped_at: int, last_opened: int):
+        """last_opened - последняя собранная страница (в параллельном режиме может быть дальше stopped_at)
+
+        Сэкономлены только страницы, которые существуют: выдача могла кончиться раньше depth.
+        """
+        pages_saved = max(0, min(depth, engine.last_page or depth) - last_opened)
+        self.early_stops.append({
+            "engine": engine.name.lower(),
+            "keyword": keyword,
+            "stopped_at": stopped_at,
+            "pages_saved": pages_saved,
+            "new_domain_shares": engine.early_stop.shares,
+        })
+        EARLY_STOP_PAGES_SAVED.labels(engine=engine.metrics_label).inc(pages_saved)
+    
+    @property
+    def pages_saved(self) -> int:
+        return sum(s["pages_saved"] for s in self.early_stops)
+    
+    async def _fetch_engine(
+        self,
+        session: _BrowserSession,
+        engine: SearchEngine,
+        keyword: str,
+        query: str,
+        depth: int,
+        collected_links: Set[str],
+    ):
+        """Живой сбор выдачи движком (браузерным - в слоте поисковика и вкладках аренды)"""
+        engine_key = engine.name.lower()
+        if self.on_page is not None:
+            engine.on_page = lambda name, n, links, ranks: self.on_page(name, n, links, keyword, ranks)
+        try:
+            if isinstance(engine, HttpSearchEngine):
+                await engine.parse(None, query, depth, collected_links)
+            else:
+                slot = self.engine_slot(engine_key) if self.engine_slot else nullcontext()
+                async with slot:
+                    page, *extra_pages = await session.tabs(engine.name, engine.tabs_wanted if depth > engine.start_page else 1)
+                    # Темп и статистика капч - на связку поисковик + Chrome, выданный задаче
+                    engine.governor = governors.get(engine_key, session.lease.cdp_endpoint)
+                    await engine.parse(page, query, depth, collected_links, extra_pages)
+        except SerpBlockedError:
+            raise
+        except Exception:
+            FAILURES.labels(engine=engine.metrics_label, stage="engine").inc()
+            raise
+        self._record_engine_stats(engine, keyword)
+    
+    def _record_engine_stats(self, engine: SearchEngine, keyword: str, blocked: str = None):
+        loads = [m["load_seconds"] for m in engine.page_metrics]
+        self.engine_stats.append({
+            "engine": engine.name.lower(),
+            "cdp_endpoint": None if isinstance(engine, HttpSearchEngine) else engine.governor.endpoint,
+            "keyword": keyword,
+            "transport": "http" if isinstance(engine, HttpSearchEngine) else "browser",
+            "start_page": engine.start_page,
+            "blocked": blocked,
+            "tabs": engine.tab_stats,
+            "fallback": getattr(engine, "parallel_fallback", False),
+            "captcha_waits": engine.captcha_waits,
+            "pages": engine.page_metrics,
+            "avg_load_seconds": round(sum(loads) / len(loads), 3) if loads else 0.0,
+            "bytes": sum(m.get("bytes", 0) for m in engine.page_metrics),
+        })
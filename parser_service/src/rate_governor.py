@@ -0,0 +1,152 @@
+import asyncio
+import random
+import time
+from typing import Optional
+
+from .config import settings
+
+
+class _Bucket:
+    """Token bucket: burst переходов сразу, затем по одному в interval"""
+
+    def __init__(self, burst: int):
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def reserve(self, interval: float, burst: int) -> float:
+        """Занять переход; возвращает, сколько ждать до него"""
+        now = time.monotonic()
+        self.tokens = min(burst, self.tokens + (now - self.updated) / interval)
+        self.updated = now
+        self.tokens -= 1
+        # Отрицательный остаток - очередь уже зарезервированных переходов
+        return max(0.0, -self.tokens * interval)
+
+
+class RateGovernor:
+    """Token bucket на переходы по выдаче одного поисковика через один CDP endpoint
+
+    interval - средняя пауза между запросами (сек). Капча удваивает её (до max),
+    серия из relax_after чистых переходов уменьшает (до min), так что темп
+    держится у максимума, который поисковик терпит.
+    """
+
+    def __init__(
+        self,
+        engine: str,
+        endpoint: str,
+        interval: float,
+        min_interval: float = None,
+        max_interval: float = None,
+        burst: int = None,
+        relax_after: int = None,
+    ):
+        self.engine = engine
+        self.endpoint = endpoint
+        self.base_interval = interval
+        self.interval = interval
+        self.min_interval = min_interval if min_interval is not None else interval * settings.pace_min_factor
+        self.max_interval = max_interval if max_interval is not None else interval * settings.pace_max_factor
+        self.burst = burst or settings.pace_burst
+        self.relax_after = relax_after or settings.pace_relax_after
+        self._bucket = _Bucket(self.burst)
+        self.requests = 0
+        self.captchas = 0
+        self.clean_streak = 0
+        self.last_captcha_at: Optional[float] = None
+
+    @property
+    def cautious(self) -> bool:
+        """После капч темп снижен - стоит вести себя "человечнее" на странице"""
+        return self.interval > self.base_interval
+
+    @property
+    def captcha_ratio(self) -> float:
+        return self.captchas / self.requests if self.requests else 0.0
+
+    async def _pace(self, bucket: _Bucket) -> float:
+        wait = bucket.reserve(self.interval, self.burst)
+        wait += random.uniform(0, settings.pace_jitter * self.interval)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    async def acquire(self) -> float:
+        """Дождаться права на следующий переход; возвращает время ожидания"""
+        return await self._pace(self._bucket)
+
+    def lane(self) -> "PaceLane":
+        """Отдельный темп для вкладки параллельного режима"""
+        return PaceLane(self)
+
+    def record(self, captcha: bool):
+        """Итог перехода: была ли капча"""
+        self.requests += 1
+        if captcha:
+            self.captchas += 1
+            self.clean_streak = 0
+            self.last_captcha_at = time.time()
+            self.interval = min(self.max_interval, self.interval * 2)
+            return
+        self.clean_streak += 1
+        if self.clean_streak >= self.relax_after:
+            self.clean_streak = 0
+            self.interval = max(self.min_interval, self.interval * 0.85)
+
+    def stats(self) -> dict:
+        return {
+            "engine": self.engine,
+            "endpoint": self.endpoint,
+            "interval_seconds": round(self.interval, 3),
+            "rate_per_minute": round(60 / self.interval, 2),
+            "requests": self.requests,
+            "captchas": self.captchas,
+            "captcha_ratio": round(self.captcha_ratio, 4),
+            "clean_streak": self.clean_streak,
+            "last_captcha_at": self.last_captcha_at,
+        }
+
+
+class PaceLane:
+    """Темп одной вкладки: свой token bucket с интервалом губернатора
+
+    Капчи учитываются в губернаторе, так что капча в любой вкладке замедляет
+    все вкладки поисковика на этом endpoint.
+    """
+
+    def __init__(self, governor: RateGovernor):
+        self.governor = governor
+        self._bucket = _Bucket(governor.burst)
+
+    async def acquire(self) -> float:
+        return await self.governor._pace(self._bucket)
+
+    def record(self, captcha: bool):
+        self.governor.record(captcha)
+
+
+class GovernorRegistry:
+    """Губернаторы по (поисковик, CDP endpoint), общие для всех задач процесса"""
+
+    def __init__(self):
+        self._governors: dict[tuple[str, str], RateGovernor] = {}
+
+    def get(self, engine: str, endpoint: str = None) -> RateGovernor:
+        endpoint = endpoint or settings.cdp_endpoint
+        key = (engine, endpoint)
+        governor = self._governors.get(key)
+        if governor is None:
+            interval = getattr(settings, f"{engine}_pace_seconds", settings.default_pace_seconds)
+            governor = self._governors[key] = RateGovernor(engine, endpoint, interval)
+        return governor
+
+    def pressure(self, endpoint: str) -> float:
+        """Во сколько раз капчи замедлили темп на endpoint (худший поисковик); 1.0 - капч не было"""
+        factors = [g.interval / g.base_interval for (_, ep), g in self._governors.items() if ep == endpoint]
+        return max(factors, default=1.0)
+
+    def stats(self) -> list[dict]:
+        return [governor.stats() for governor in self._governors.values()]
+
+
+governors = GovernorRegistry()
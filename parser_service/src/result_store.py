@@ -0,0 +1,223 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """Ссылки задач: append-only сегменты сжатого NDJSON + индекс по task_id (SQLite)
+
+    Каждая собранная страница дописывается в текущий сегмент отдельным gzip-блоком
+    (строка на ссылку: task_id, keyword, engine, page, rank, link, ts), индекс
+    хранит смещение и длину блока - задачу читаем без распаковки всего сегмента.
+    Запись идёт в одном фоновом потоке (порядок сохраняется, event loop не ждёт диск).
+    Сегменты старше retention и сверх max_bytes удаляются целиком: проверка при
+    ротации и при записи, если с прошлой прошло purge_interval.
+    """
+
+    def __init__(
+        self,
+        directory: str = None,
+        segment_bytes: int = None,
+        retention: float = None,
+        max_bytes: int = None,
+        segment_seconds: float = None,
+        purge_interval: float = None,
+    ):
+        self.directory = directory or settings.result_store_dir
+        self.segment_bytes = segment_bytes or settings.result_segment_bytes
+        self.segment_seconds = settings.result_segment_seconds if segment_seconds is None else segment_seconds
+        self.purge_interval = settings.result_purge_interval if purge_interval is None else purge_interval
+        self.retention = settings.result_retention if retention is None else retention
+        self.max_bytes = settings.result_store_max_bytes if max_bytes is None else max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result-store")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS segments (
+                name TEXT PRIMARY KEY,
+                bytes INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blocks (
+                task_id TEXT NOT NULL,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                records INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_blocks_task_id ON blocks (task_id);
+            CREATE INDEX IF NOT EXISTS ix_blocks_segment ON blocks (segment);
+            """
+        )
+        self._conn.commit()
+        # Текущий сегмент открывает и пишет только поток записи
+        self._segment: Optional[str] = None
+        self._segment_opened = 0.0
+        self._file = None
+        self._purged_at = time.time()
+        self.appended = 0
+        self.write_errors = 0
+        self.purged_segments = 0
+
+    def append(
+        self,
+        task_id: str,
+        engine: str,
+        page: int,
+        links: list[str],
+        keyword: str = None,
+        ranks: Optional[list[int]] = None,
+    ):
+        """Поставить страницу в очередь записи (не блокирует event loop)
+
+        ranks - позиции ссылок в выдаче (rank из extract_results); None - неизвестны (страница из SerpCache).
+        """
+        if not links:
+            return
+        ts = time.time()
+        ranks = ranks or [None] * len(links)
+        records = [
+            {"task_id": task_id, "keyword": keyword, "engine": engine, "page": page, "rank": rank, "link": link, "ts": ts}
+            for rank, link in zip(ranks, links)
+        ]
+        self._executor.submit(self._write, task_id, records)
+
+    async def flush(self):
+        """Дождаться записи всего, что поставлено в очередь"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, lambda: None)
+
+    def _write(self, task_id: str, records: list[dict]):
+        try:
+            data = gzip.compress("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8"))
+            now = time.time()
+            if (
+                self._file is None
+                or self._file.tell() >= self.segment_bytes
+                or (self.segment_seconds and now - self._segment_opened >= self.segment_seconds)
+            ):
+                self._rotate()
+            elif self.purge_interval and now - self._purged_at >= self.purge_interval:
+                self._purge()
+            offset = self._file.tell()
+            self._file.write(data)
+            self._file.flush()
+            now = time.time()
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO blocks (task_id, segment, offset, length, records) VALUES (?, ?, ?, ?, ?)",
+                    (task_id, self._segment, offset, len(data), len(records)),
+                )
+                self._conn.execute(
+                    "UPDATE segments SET bytes = ?, updated_at = ? WHERE name = ?",
+                    (offset + len(data), now, self._segment),
+                )
+                self._conn.commit()
+            self.appended += len(records)
+        except Exception as e:
+            self.write_errors += 1
+            logger.error(f"ResultStore: не удалось записать {len(records)} ссылок задачи {task_id}: {e}")
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = self._segment = None
+            self._purge()
+        now = time.time()
+        self._segment = f"results-{int(now * 1000)}.ndjson.gz"
+        self._segment_opened = now
+        self._file = open(os.path.join(self.directory, self._segment), "ab")
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO segments (name, created_at, updated_at) VALUES (?, ?, ?)",
+                (self._segment, now, now),
+            )
+            self._conn.commit()
+
+    def read(self, task_id: str) -> list[dict]:
+        """Записи задачи в порядке сбора (блокирующий вызов, из event loop - через to_thread)"""
+        with self._lock:
+            blocks = self._conn.execute(
+                "SELECT segment, offset, length FROM blocks WHERE task_id = ? ORDER BY rowid",
+                (task_id,),
+            ).fetchall()
+        records = []
+        for segment, offset, length in blocks:
+            try:
+                with open(os.path.join(self.directory, segment), "rb") as f:
+                    f.seek(offset)
+                    data = gzip.decompress(f.read(length))
+            except (OSError, EOFError) as e:
+                logger.warning(f"ResultStore: блок {segment}@{offset} задачи {task_id} не прочитан: {e}")
+                continue
+            records.extend(json.loads(line) for line in data.decode("utf-8").splitlines())
+        return records
+
+    def purge_expired(self) -> int:
+        """Удаление сегментов по retention/max_bytes (в потоке записи); возвращает число удалённых"""
+        return self._executor.submit(self._purge).result()
+
+    def _purge(self) -> int:
+        self._purged_at = time.time()
+        with self._lock:
+            rows = self._conn.execute("SELECT name, bytes, updated_at FROM segments ORDER BY created_at").fetchall()
+        total = sum(size for _, size, _ in rows)
+        expired = []
+        for name, size, updated_at in rows:
+            if name == self._segment:
+                # В текущий сегмент ещё пишем
+                continue
+            if (self.retention and updated_at < time.time() - self.retention) or (self.max_bytes and total > self.max_bytes):
+                expired.append(name)
+                total -= size
+        for name in expired:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            with self._lock:
+                self._conn.execute("DELETE FROM blocks WHERE segment = ?", (name,))
+                self._conn.execute("DELETE FROM segments WHERE name = ?", (name,))
+                self._conn.commit()
+        if expired:
+            self.purged_segments += len(expired)
+            logger.info(f"ResultStore: удалено сегментов по retention: {len(expired)}")
+        return len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            segments, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM segments").fetchone()
+        return {
+            "directory": self.directory,
+            "segments": segments,
+            "bytes": size,
+            "appended_records": self.appended,
+            "write_errors": self.write_errors,
+            "purged_segments": self.purged_segments,
+        }
+
+    def close(self):
+        """Дописать очередь и закрыть сегмент"""
+        def _close():
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+                self._segment = None
+        self._executor.submit(_close).result()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,97 @@
+import logging
+import weakref
+from dataclasses import asdict, dataclass
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import Page, Request, Response, Route
+
+from .config import settings
+from .human_behavior import is_captcha_url
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PageTraffic:
+    """Трафик вкладки с последнего take_traffic(): запросы, заблокированные, байты (по Content-Length)"""
+    requests: int = 0
+    blocked: int = 0
+    bytes: int = 0
+
+
+_traffic: "weakref.WeakKeyDictionary[Page, PageTraffic]" = weakref.WeakKeyDictionary()
+
+
+def take_traffic(page: Page) -> Optional[dict]:
+    """Счётчики трафика вкладки с обнулением; None - профиль на вкладке не включён"""
+    traffic = _traffic.get(page)
+    if traffic is None:
+        return None
+    snapshot = asdict(traffic)
+    traffic.requests = traffic.blocked = traffic.bytes = 0
+    return snapshot
+
+
+class RouteProfile:
+    """Перехват запросов вкладок выдачи: картинки, медиа, шрифты и трекеры не грузим
+
+    Ставится на вкладки задачи (page.route), а не на контекст: контекст CDP -
+    это профиль пользователя в Chrome, его собственные вкладки не трогаем.
+    На странице капчи пропускается всё - картинку капчи нужно видеть.
+    """
+
+    def __init__(self, block_types: Iterable[str] = None, block_hosts: Iterable[str] = None):
+        self.block_types = set(block_types if block_types is not None else settings.route_block_types)
+        self.block_hosts = tuple(block_hosts if block_hosts is not None else settings.route_block_hosts)
+        self.blocked = 0
+        self.allowed = 0
+
+    _shared: Optional["RouteProfile"] = None
+
+    @classmethod
+    def from_settings(cls) -> Optional["RouteProfile"]:
+        """Общий для процесса профиль из настроек; None - перехват выключен"""
+        if settings.route_profile == "off":
+            return None
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _is_blocked(self, request: Request) -> bool:
+        if request.resource_type in self.block_types:
+            return True
+        host = urlparse(request.url).hostname or ""
+        return any(host == h or host.endswith("." + h) for h in self.block_hosts)
+
+    async def attach(self, page: Page):
+        if page in _traffic:
+            # Тёплая вкладка из пула - перехват уже стоит
+            return
+        traffic = _traffic[page] = PageTraffic()
+
+        async def handle(route: Route):
+            traffic.requests += 1
+            if not is_captcha_url(page.url) and self._is_blocked(route.request):
+                traffic.blocked += 1
+                self.blocked += 1
+                await route.abort()
+                return
+            self.allowed += 1
+            await route.continue_()
+
+        def on_response(response: Response):
+            length = response.headers.get("content-length")
+            if length and length.isdigit():
+                traffic.bytes += int(length)
+
+        await page.route("**/*", handle)
+        page.on("response", on_response)
+
+    def stats(self) -> dict:
+        return {
+            "block_types": sorted(self.block_types),
+            "block_hosts": len(self.block_hosts),
+            "blocked": self.blocked,
+            "allowed": self.allowed,
+        }
@@ -0,0 +1,407 @@
+import asyncio
+import contextvars
+import inspect
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional, Union
+
+from .config import settings
+from .metrics import observe
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Очередь задач переполнена"""
+
+
+# Классы приоритета: меньше - раньше. interactive - модератор ждёт у экрана,
+# bulk - фоновые прогоны заявок
+PRIORITIES = {"interactive": 0, "normal": 1, "bulk": 2}
+
+
+@dataclass
+class ParseJob:
+    task_id: str
+    run: Callable[["ParseJob"], Awaitable[None]]
+    priority: str = "normal"
+    enqueued_at: float = field(default_factory=time.monotonic)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Припаркованные ожидания (капча) - вложенность, начало и суммарное время
+    parks: int = 0
+    parked_at: Optional[float] = None
+    parked_seconds: float = 0.0
+    holds_slot: bool = False
+    # Ресурсы задачи целиком (аренда браузера), которые парковка отпускает вместе со слотом
+    holds: list["_Hold"] = field(default_factory=list)
+    # Бюджет времени задачи с постановки в очередь, сек (None - без ограничения)
+    deadline_seconds: Optional[float] = None
+    # Причина отмены: "cancelled" (DELETE /tasks) или "deadline"; None - не отменялась
+    cancel_reason: Optional[str] = None
+    # False - сбор закончен и результат сохраняется, отмена уже не применяется
+    cancellable: bool = True
+    task: Optional[asyncio.Task] = None
+    timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def wait_seconds(self) -> float:
+        end = self.started_at if self.started_at is not None else time.monotonic()
+        return end - self.enqueued_at
+
+    def rank(self, now: float, aging_seconds: float) -> float:
+        """Эффективный приоритет: класс минус старение (за каждые aging_seconds ожидания - класс выше)"""
+        aging = (now - self.enqueued_at) / aging_seconds if aging_seconds else 0.0
+        return PRIORITIES[self.priority] - aging
+
+
+# Задача scheduler, в контексте которой выполняется текущая корутина (для parked())
+_current_job: contextvars.ContextVar[Optional[tuple["ParseScheduler", ParseJob]]] = contextvars.ContextVar(
+    "parse_scheduler_job", default=None
+)
+
+
+# Ресурсы, занятые текущей корутиной (слот поисковика): парковка отпускает только их,
+# параллельный поисковик той же задачи свой слот сохраняет
+_held: contextvars.ContextVar[tuple["_Hold", ...]] = contextvars.ContextVar("parse_scheduler_held", default=())
+
+
+class _Hold:
+    """Занятый семафор, который парковка задачи отпускает и занимает снова"""
+
+    def __init__(self, semaphore: asyncio.Semaphore, changed: Callable[[int], Union[Awaitable[None], None]] = None):
+        self.semaphore = semaphore
+        self.changed = changed
+        self.held = False
+
+    async def _notify(self, delta: int):
+        if self.changed is not None:
+            result = self.changed(delta)
+            if inspect.isawaitable(result):
+                await result
+
+    async def acquire(self):
+        await self.semaphore.acquire()
+        self.held = True
+        await self._notify(1)
+
+    async def release(self):
+        if self.held:
+            self.held = False
+            self.semaphore.release()
+            await self._notify(-1)
+
+
+@asynccontextmanager
+async def parkable(
+    semaphore: asyncio.Semaphore,
+    changed: Callable[[int], Union[Awaitable[None], None]] = None,
+    shared: bool = False,
+):
+    """Семафор на время блока; парковка задачи scheduler отпускает его до конца ожидания
+
+    changed(+1/-1) вызывается при каждом занятии и освобождении (счётчики владельца).
+    shared - ресурс всей задачи (отпускается при парковке любого поисковика), иначе -
+    только корутины, которая его заняла. Вне scheduler - обычный семафор.
+    """
+    hold = _Hold(semaphore, changed)
+    await hold.acquire()
+    current = _current_job.get()
+    token = None
+    if current is not None:
+        if shared:
+            current[1].holds.append(hold)
+        else:
+            token = _held.set(_held.get() + (hold,))
+    try:
+        yield
+    finally:
+        if token is not None:
+            _held.reset(token)
+        elif current is not None:
+            current[1].holds.remove(hold)
+        await hold.release()
+
+
+@asynccontextmanager
+async def parked():
+    """Освободить слот воркера на время долгого ожидания (капча); вне scheduler - ничего не делает"""
+    current = _current_job.get()
+    if current is None:
+        yield
+        return
+    scheduler, job = current
+    async with scheduler.park(job):
+        yield
+
+
+class ParseScheduler:
+    """Очередь задач парсинга на основном event loop с ограниченным числом воркеров
+
+    Воркер - слот семафора: задача, ожидающая решения капчи, паркуется и отдаёт
+    слот следующей задаче очереди, а после капчи снова занимает свободный слот.
+    Вместе со слотом воркера парковка отпускает аренду браузера и слот поисковика,
+    на котором капча (parkable), - иначе при лимите 1 на поисковик следующий ключ
+    того же поисковика ждал бы решения капчи.
+    Освободившийся слот получает задача с наилучшим приоритетом (класс с учётом
+    старения, при равенстве - раньше поставленная), так что bulk не голодает.
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        engine_limits: dict[str, int] = None,
+        max_queue: int = None,
+        aging_seconds: float = None,
+    ):
+        # Воркеры и лимиты поисковиков заданы на один Chrome - масштабируем на число endpoint
+        endpoints = len(settings.cdp_endpoint_list)
+        self.workers = workers or settings.parse_workers * endpoints
+        self.max_queue = max_queue or settings.parse_queue_max
+        self.aging_seconds = settings.parse_priority_aging_seconds if aging_seconds is None else aging_seconds
+        limits = engine_limits or {
+            "yandex": settings.yandex_max_concurrency * endpoints,
+            "google": settings.google_max_concurrency * endpoints,
+        }
+        self._engine_limits = dict(limits)
+        self._engine_slots = {name: asyncio.Semaphore(n) for name, n in limits.items()}
+        self._engine_active = {name: 0 for name in limits}
+        self._has_pending = asyncio.Event()
+        self._pending: dict[str, ParseJob] = {}
+        self._running: dict[str, ParseJob] = {}
+        self._parked: dict[str, ParseJob] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._job_tasks: set[asyncio.Task] = set()
+        self._recent_waits: deque = deque(maxlen=100)
+        # Длительность последних задач (от старта до завершения) - для оценки времени старта
+        self._recent_runs: deque = deque(maxlen=100)
+        self.completed = 0
+
+    async def start(self):
+        if self._dispatcher is not None:
+            return
+        self._slots = asyncio.Semaphore(self.workers)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        logger.info(f"Scheduler started: workers={self.workers}, engine_limits={self._engine_limits}")
+
+    async def stop(self):
+        tasks = [self._dispatcher, *self._job_tasks] if self._dispatcher else list(self._job_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+        self._job_tasks.clear()
+
+    def submit(self, job: ParseJob) -> int:
+        """Постановка задачи в очередь; возвращает позицию с учётом приоритета (0 - следующая)"""
+        if job.priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority {job.priority!r}, expected one of {list(PRIORITIES)}")
+        if len(self._pending) >= self.max_queue:
+            raise QueueFullError(f"Parse queue is full ({self.max_queue} tasks)")
+        self._pending[job.task_id] = job
+        self._has_pending.set()
+        if job.deadline_seconds is not None:
+            job.timer = asyncio.get_running_loop().call_later(
+                job.deadline_seconds, self.cancel, job.task_id, "deadline"
+            )
+        return self.position(job.task_id)
+
+    def promote(self, task_id: str, priority: str):
+        """Поднять класс задачи в очереди (к ней присоединился запрос с более высоким приоритетом)"""
+        job = self._pending.get(task_id)
+        if job is not None and PRIORITIES[priority] < PRIORITIES[job.priority]:
+            job.priority = priority
+
+    def _ordered(self) -> list[ParseJob]:
+        now = time.monotonic()
+        return sorted(self._pending.values(), key=lambda job: (job.rank(now, self.aging_seconds), job.enqueued_at))
+
+    def position(self, task_id: str) -> Optional[int]:
+        for position, job in enumerate(self._ordered()):
+            if job.task_id == task_id:
+                return position
+        return None
+
+    def estimated_start_seconds(self, position: int) -> Optional[float]:
+        """Оценка ожидания задачи на позиции position: свободные слоты, затем "волны" по workers задач
+
+        None - ещё нет завершённых задач для оценки длительности. Задачи, которые
+        придут позже с более высоким приоритетом, оценка не учитывает.
+        """
+        free = self.workers - sum(job.holds_slot for job in self._running.values())
+        if position < free:
+            return 0.0
+        if not self._recent_runs:
+            return None
+        avg_run = sum(self._recent_runs) / len(self._recent_runs)
+        return math.ceil((position - free + 1) / self.workers) * avg_run
+
+    def cancel(self, task_id: str, reason: str = "cancelled") -> Optional[ParseJob]:
+        """Кооперативная отмена задачи: job.run получает CancelledError, job.cancel_reason = reason
+
+        Задача из очереди запускается сразу без слота воркера (job.run должен
+        проверить cancel_reason и не начинать парсинг). None - задачи нет или уже отменена.
+        """
+        job = self._pending.pop(task_id, None)
+        if job is not None:
+            job.cancel_reason = reason
+            self._start(job)
+            logger.info(f"Scheduler: task_id={task_id} cancelled in queue ({reason})")
+            return job
+        job = self._running.get(task_id)
+        if job is None or job.cancel_reason is not None or not job.cancellable:
+            return None
+        job.cancel_reason = reason
+        # Ещё не начавшаяся корутина увидит cancel_reason сама: отмена до старта
+        # пропустила бы finally в _run (слот и task_done)
+        if job.started_at is not None:
+            job.task.cancel()
+        logger.info(f"Scheduler: task_id={task_id} cancelled ({reason})")
+        return job
+
+    async def _dispatch(self):
+        while True:
+            # Сначала задача, потом слот: простаивающий диспетчер не держит слот,
+            # который ждёт задача, вернувшаяся с парковки. Задачу выбираем уже
+            # со слотом - за время ожидания могла прийти более приоритетная
+            await self._has_pending.wait()
+            await self._slots.acquire()
+            ordered = self._ordered()
+            if not ordered:
+                # Очередь опустела (отмена), пока ждали слот
+                self._slots.release()
+                continue
+            job = ordered[0]
+            job.holds_slot = True
+            self._start(job)
+
+    def _start(self, job: ParseJob):
+        self._pending.pop(job.task_id, None)
+        if not self._pending:
+            self._has_pending.clear()
+        self._running[job.task_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        self._job_tasks.add(job.task)
+        job.task.add_done_callback(self._job_tasks.discard)
+
+    async def _run(self, job: ParseJob):
+        _current_job.set((self, job))
+        job.started_at = time.monotonic()
+        self._recent_waits.append(job.wait_seconds)
+        observe("queue_wait", job.wait_seconds)
+        logger.info(f"Scheduler: task_id={job.task_id} started after {job.wait_seconds:.2f}s in queue")
+        try:
+            await job.run(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Scheduler: task_id={job.task_id} crashed: {e}", exc_info=True)
+        finally:
+            if job.timer is not None:
+                job.timer.cancel()
+            job.finished_at = time.monotonic()
+            if job.cancel_reason is None:
+                self._recent_runs.append(job.finished_at - job.started_at)
+            self._running.pop(job.task_id, None)
+            self.completed += 1
+            if job.holds_slot:
+                job.holds_slot = False
+                self._slots.release()
+
+    @asynccontextmanager
+    async def park(self, job: ParseJob):
+        """Задача ждёт (капча): слот воркера, аренда браузера и слот поисковика свободны,
+        по выходу задача занимает их снова (в том же порядке, что при старте)"""
+        own = _held.get()
+        for hold in reversed(own):
+            await hold.release()
+        job.parks += 1
+        if job.parks == 1:
+            job.parked_at = time.monotonic()
+            self._parked[job.task_id] = job
+            for hold in reversed(job.holds):
+                await hold.release()
+            if job.holds_slot:
+                job.holds_slot = False
+                self._slots.release()
+            logger.info(f"Scheduler: task_id={job.task_id} parked, worker slot released")
+        try:
+            yield
+        finally:
+            job.parks -= 1
+            if job.parks == 0:
+                self._parked.pop(job.task_id, None)
+                job.parked_seconds += time.monotonic() - job.parked_at
+                job.parked_at = None
+                # Отменённой задаче слоты больше не нужны - не ждём их
+                if job.cancel_reason is None:
+                    await self._slots.acquire()
+                    job.holds_slot = True
+                    for hold in job.holds:
+                        await hold.acquire()
+                    logger.info(f"Scheduler: task_id={job.task_id} resumed after {job.parked_seconds:.1f}s parked")
+            if job.cancel_reason is None:
+                for hold in own:
+                    await hold.acquire()
+
+    @asynccontextmanager
+    async def engine_slot(self, engine: str):
+        """Ограничение параллельных сессий одного поисковика"""
+        slots = self._engine_slots.get(engine)
+        if slots is None:
+            yield
+            return
+
+        def changed(delta: int):
+            self._engine_active[engine] += delta
+
+        async with parkable(slots, changed):
+            yield
+
+    def job_info(self, task_id: str) -> dict:
+        job = self._pending.get(task_id)
+        if job is not None:
+            position = self.position(task_id)
+            estimate = self.estimated_start_seconds(position)
+            return {
+                "queue_position": position,
+                "queue_depth": len(self._pending),
+                "queue_wait_seconds": round(job.wait_seconds, 3),
+                "priority": job.priority,
+                "estimated_start_seconds": round(estimate, 1) if estimate is not None else None,
+            }
+        job = self._running.get(task_id)
+        if job is not None:
+            return {
+                "queue_depth": len(self._pending),
+                "queue_wait_seconds": round(job.wait_seconds, 3),
+                "parked": job.parks > 0,
+                "parked_seconds": round(job.parked_seconds, 3),
+            }
+        return {}
+
+    def stats(self) -> dict:
+        waits = list(self._recent_waits)
+        by_priority = {name: 0 for name in PRIORITIES}
+        for job in self._pending.values():
+            by_priority[job.priority] += 1
+        return {
+            "workers": self.workers,
+            "queue_depth": len(self._pending),
+            "queue_by_priority": by_priority,
+            "aging_seconds": self.aging_seconds,
+            "running": len(self._running),
+            "parked": len(self._parked),
+            "completed": self.completed,
+            "avg_queue_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "max_queue_wait_seconds": round(max(waits), 3) if waits else 0.0,
+            "engines": {
+                name: {"limit": self._engine_limits[name], "active": self._engine_active[name]}
+                for name in self._engine_limits
+            },
+        }
@@ -0,0 +1,126 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class SerpCache:
+    """Дисковый кэш страниц выдачи (SQLite), ключ - (engine, query, page)"""
+
+    def __init__(self, path: str = None, ttl: float = None):
+        self.path = path or settings.serp_cache_path
+        self.ttl = settings.serp_cache_ttl if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS serp_pages (
+                engine TEXT NOT NULL,
+                query TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                links TEXT NOT NULL,
+                is_last INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (engine, query, page)
+            )
+            """
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        # Ключ был в кэше на меньшую глубину: браузер дособирает только новые страницы
+        self.partial_hits = 0
+
+    def get_prefix(
+        self, engine: str, query: str, depth: int, max_age: float = None
+    ) -> tuple[dict[int, list[str]], bool]:
+        """Страницы 1..k (k <= depth) подряд из кэша и признак, что k - последняя страница выдачи
+
+        Ключ, собранный раньше на меньшую глубину, дособирается со страницы k + 1.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        if max_age <= 0:
+            self.misses += 1
+            return {}, False
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page, links, is_last FROM serp_pages "
+                "WHERE engine = ? AND query = ? AND page <= ? AND created_at >= ? ORDER BY page",
+                (engine, normalize_query(query), depth, time.time() - max_age),
+            ).fetchall()
+
+        pages: dict[int, list[str]] = {}
+        reached_last = False
+        for n, (page, links, is_last) in enumerate(rows, 1):
+            if page != n:
+                break
+            pages[page] = json.loads(links)
+            if is_last:
+                reached_last = True
+                break
+        if reached_last or len(pages) == depth:
+            self.hits += 1
+        elif pages:
+            self.partial_hits += 1
+        else:
+            self.misses += 1
+        return pages, reached_last
+
+    def get_pages(
+        self, engine: str, query: str, depth: int, max_age: float = None
+    ) -> Optional[dict[int, list[str]]]:
+        """Все страницы 1..depth из кэша (или до последней страницы выдачи); None - промах"""
+        pages, reached_last = self.get_prefix(engine, query, depth, max_age)
+        return pages if reached_last or len(pages) == depth else None
+
+    def put_pages(self, engine: str, query: str, pages: dict[int, list[str]], last_page: int = None):
+        """Сохранение ссылок по страницам; last_page - на ней выдача закончилась"""
+        if not pages:
+            return
+        now = time.time()
+        rows = [
+            (engine, normalize_query(query), page, json.dumps(links), int(page == last_page), now)
+            for page, links in pages.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO serp_pages (engine, query, page, links, is_last, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM serp_pages WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (pages,) = self._conn.execute("SELECT COUNT(*) FROM serp_pages").fetchone()
+        return {
+            "path": self.path,
+            "ttl_seconds": self.ttl,
+            "pages": pages,
+            "hits": self.hits,
+            "misses": self.misses,
+            "partial_hits": self.partial_hits,
+        }
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import httpx
+from playwright.async_api import Page, Route
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Параметры URL выдачи, определяющие страницу: запрос и смещение
+_KEY_PARAMS = ("text", "q", "p", "start")
+
+
+def replay_key(url: str) -> str:
+    """Ключ страницы выдачи без служебных параметров (lr, sei, hl, ...)
+
+    Страница 1 у Яндекса без p, у Google без start - p=0/start=0 отбрасываем.
+    """
+    parsed = urlparse(url)
+    host = (parsed.hostname or "").removeprefix("www.")
+    params = parse_qs(parsed.query)
+    key_params = [
+        (name, params[name][0])
+        for name in _KEY_PARAMS
+        if name in params and not (name in ("p", "start") and params[name][0] == "0")
+    ]
+    return f"{host}{parsed.path.rstrip('/')}?{urlencode(key_params)}"
+
+
+def _query_of(url: str) -> Optional[str]:
+    params = parse_qs(urlparse(url).query)
+    for name in ("text", "q"):
+        if name in params:
+            return params[name][0]
+    return None
+
+
+class SerpRecorder:
+    """Запись посещённых страниц выдачи (HTML + URL) для replay и benchmark
+
+    Каталог: pages/<sha1 ключа>.html и index.jsonl (строка на запись,
+    повторная запись той же страницы перекрывает прежнюю).
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, "pages"), exist_ok=True)
+        self.recorded = 0
+
+    _shared: Optional["SerpRecorder"] = None
+
+    @classmethod
+    def from_settings(cls) -> Optional["SerpRecorder"]:
+        """Общий рекордер процесса; None - запись выключена (serp_record_dir не задан)"""
+        if not settings.serp_record_dir:
+            return None
+        if cls._shared is None or cls._shared.directory != settings.serp_record_dir:
+            cls._shared = cls(settings.serp_record_dir)
+        return cls._shared
+
+    def record(self, engine: str, url: str, html: str, page_number: int):
+        key = replay_key(url)
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".html"
+        with open(os.path.join(self.directory, "pages", name), "w", encoding="utf-8") as f:
+            f.write(html)
+        entry = {
+            "key": key,
+            "url": url,
+            "engine": engine,
+            "query": _query_of(url),
+            "page": page_number,
+            "file": name,
+            "recorded_at": time.time(),
+        }
+        with open(os.path.join(self.directory, "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.recorded += 1
+
+
+class SerpArchive:
+    """Записанные страницы выдачи: поиск HTML по URL и список запросов для прогона"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.entries: dict[str, dict] = {}
+        index_path = os.path.join(directory, "index.jsonl")
+        if not os.path.exists(index_path):
+            raise FileNotFoundError(f"Нет записанной выдачи: {index_path}")
+        with open(index_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.entries[entry["key"]] = entry
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, url: str) -> Optional[str]:
+        entry = self.entries.get(replay_key(url))
+        if entry is None:
+            self.misses += 1
+            logger.warning(f"Replay: нет записи для {url}")
+            return None
+        self.hits += 1
+        with open(os.path.join(self.directory, "pages", entry["file"]), encoding="utf-8") as f:
+            return f.read()
+
+    def queries(self, engine: str) -> dict[str, int]:
+        """Записанные запросы поисковика: query -> число подряд записанных страниц с первой"""
+        pages: dict[str, set[int]] = {}
+        for entry in self.entries.values():
+            if entry["engine"] == engine and entry.get("query"):
+                pages.setdefault(entry["query"], set()).add(entry["page"])
+        depths = {}
+        for query, numbers in pages.items():
+            depth = 0
+            while depth + 1 in numbers:
+                depth += 1
+            if depth:
+                depths[query] = depth
+        return depths
+
+
+class ReplayRouter:
+    """Отдаёт вкладке записанную выдачу вместо сети
+
+    Документы - из архива (нет записи - 404), всё остальное (скрипты, стили,
+    картинки) обрывается: сохранённый HTML уже отрисован, а прогон должен
+    быть офлайн и воспроизводимым. routed - вызовы fulfill/abort, их
+    benchmark вычитает из протокольных вызовов движка.
+    """
+
+    def __init__(self, archive: SerpArchive):
+        self.archive = archive
+        self.routed = 0
+
+    async def attach(self, page: Page):
+        async def handle(route: Route):
+            self.routed += 1
+            request = route.request
+            if request.resource_type != "document":
+                await route.abort()
+                return
+            html = self.archive.get(request.url)
+            if html is None:
+                await route.fulfill(status=404, content_type="text/html; charset=utf-8", body="<html></html>")
+                return
+            await route.fulfill(status=200, content_type="text/html; charset=utf-8", body=html)
+
+        await page.route("**/*", handle)
+
+
+def replay_transport(archive: SerpArchive) -> httpx.MockTransport:
+    """Транспорт httpx для HttpSearchEngine: те же записи без сети"""
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        html = archive.get(str(request.url))
+        if html is None:
+            return httpx.Response(404, text="<html></html>")
+        return httpx.Response(200, text=html, headers={"Content-Type": "text/html; charset=utf-8"})
+
+    return httpx.MockTransport(handle)
@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from playwright.async_api import BrowserContext, Page
+
+from .config import settings
+from .human_behavior import is_captcha_url
+
+logger = logging.getLogger(__name__)
+
+# Домашние страницы поисковиков: тёплая вкладка заранее получает их cookies
+HOME_URLS = {
+    "yandex": "https://ya.ru/",
+    "google": "https://www.google.com/?hl=ru",
+}
+
+
+def engine_of(tab_name: str) -> str:
+    """"Google#1" -> "google": дополнительные вкладки поисковика берутся из его же пула"""
+    return tab_name.split("#", 1)[0].lower()
+
+
+@dataclass
+class _Tab:
+    engine: str
+    created_at: float = field(default_factory=time.monotonic)
+    released_at: float = field(default_factory=time.monotonic)
+    uses: int = 0
+    # Выдана задаче или прогревается
+    busy: bool = True
+
+
+class TabPool:
+    """Тёплые вкладки поисковиков в контексте одного Chrome
+
+    Вкладка, возвращённая задачей, остаётся открытой на домене поисковика (cookies,
+    кэш) и выдаётся следующей задаче вместо new_page(). После max_uses задач,
+    простоя дольше idle_seconds, капчи или ошибки задачи вкладка закрывается.
+    Всплывающие окна, открытые вкладками пула, закрываются сразу. Пул трогает
+    только свои вкладки - вкладки пользователя в профиле Chrome не закрываются.
+    """
+
+    def __init__(
+        self,
+        warm_size: int = None,
+        max_uses: int = None,
+        idle_seconds: float = None,
+        max_idle: int = None,
+    ):
+        self.warm_size = settings.warm_tabs_per_engine if warm_size is None else warm_size
+        self.max_uses = max_uses or settings.tab_max_uses
+        self.idle_seconds = settings.tab_idle_seconds if idle_seconds is None else idle_seconds
+        # Больше, чем задач одновременно на endpoint, простаивающих вкладок не нужно
+        self.max_idle = max_idle or settings.browser_pool_size
+        self._context: Optional[BrowserContext] = None
+        self._tabs: dict[Page, _Tab] = {}
+        self._idle: dict[str, deque[Page]] = {}
+        self._warming: dict[str, int] = {}
+        self._background: set[asyncio.Task] = set()
+        self.created = 0
+        self.reused = 0
+        self.recycled = 0
+        self.leaked_closed = 0
+
+    def bind(self, context: BrowserContext):
+        """Контекст после (пере)подключения: вкладки прежнего контекста забываем"""
+        if context is self._context:
+            return
+        self._tabs.clear()
+        self._idle.clear()
+        self._context = context
+        context.on("page", self._on_page)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def _on_page(self, page: Page):
+        if page not in self._tabs:
+            self._spawn(self._close_popup(page))
+
+    async def _close_popup(self, page: Page):
+        """Окно, открытое вкладкой пула (target=_blank, реклама), закрываем - иначе копятся"""
+        try:
+            opener = await page.opener()
+        except Exception:
+            return
+        if opener is not None and opener in self._tabs:
+            self.leaked_closed += 1
+            logger.info(f"TabPool: закрыто всплывающее окно {page.url}")
+            await self._close(page)
+
+    async def _new_tab(self, engine: str) -> Page:
+        page = await self._context.new_page()
+        self._tabs[page] = _Tab(engine=engine)
+        self.created += 1
+        return page
+
+    async def _close(self, page: Page):
+        self._tabs.pop(page, None)
+        try:
+            if not page.is_closed():
+                await page.close()
+        except Exception as e:
+            logger.debug(f"TabPool: ошибка при закрытии вкладки: {e}")
+
+    async def acquire(self, tab_name: str) -> Page:
+        """Тёплая вкладка поисковика (последняя возвращённая) или новая"""
+        engine = engine_of(tab_name)
+        idle = self._idle.setdefault(engine, deque())
+        page = None
+        while idle and page is None:
+            candidate = idle.pop()
+            if candidate.is_closed():
+                self._tabs.pop(candidate, None)
+                continue
+            page = candidate
+            self.reused += 1
+        if page is None:
+            page = await self._new_tab(engine)
+        tab = self._tabs[page]
+        tab.busy = True
+        tab.uses += 1
+        self._replenish(engine)
+        return page
+
+    def _replenish(self, engine: str):
+        missing = self.warm_size - len(self._idle.get(engine, ())) - self._warming.get(engine, 0)
+        for _ in range(max(missing, 0)):
+            self._spawn(self._warm(engine))
+
+    async def _warm(self, engine: str):
+        """Новая вкладка на домашней странице поисковика - в пул простаивающих"""
+        self._warming[engine] = self._warming.get(engine, 0) + 1
+        page = None
+        try:
+            page = await self._new_tab(engine)
+            url = HOME_URLS.get(engine)
+            if url:
+                await page.goto(url, timeout=30000, wait_until="domcontentloaded")
+            if is_captcha_url(page.url):
+                # Капчу на прогреве решать некому
+                await self._close(page)
+                return
+            self._park(page)
+        except Exception as e:
+            logger.debug(f"TabPool: не удалось прогреть вкладку {engine}: {e}")
+            if page is not None:
+                await self._close(page)
+        finally:
+            self._warming[engine] -= 1
+
+    def _park(self, page: Page):
+        tab = self._tabs[page]
+        tab.busy = False
+        tab.released_at = time.monotonic()
+        self._idle.setdefault(tab.engine, deque()).append(page)
+
+    async def release(self, page: Page, reusable: bool = True):
+        """Возврат вкладки задачей: в пул или закрыть (ошибка, капча, исчерпан max_uses)"""
+        tab = self._tabs.get(page)
+        if tab is None:
+            await self._close(page)
+            return
+        if not reusable or page.is_closed() or page.context is not self._context or is_captcha_url(page.url):
+            await self._close(page)
+        elif tab.uses >= self.max_uses:
+            self.recycled += 1
+            await self._close(page)
+        elif len(self._idle.get(tab.engine, ())) >= self.max_idle:
+            await self._close(page)
+        else:
+            self._park(page)
+
+    async def sweep(self):
+        """Закрыть простаивающие дольше idle_seconds и потерянные вкладки пула"""
+        now = time.monotonic()
+        for idle in self._idle.values():
+            for page in list(idle):
+                tab = self._tabs.get(page)
+                if page.is_closed() or tab is None or (self.idle_seconds and now - tab.released_at > self.idle_seconds):
+                    idle.remove(page)
+                    await self._close(page)
+        parked = {page for idle in self._idle.values() for page in idle}
+        for page, tab in list(self._tabs.items()):
+            if page.is_closed():
+                self._tabs.pop(page, None)
+            elif not tab.busy and page not in parked:
+                self.leaked_closed += 1
+                await self._close(page)
+
+    async def close_all(self):
+        """Закрыть все вкладки пула (отключение от Chrome: сам браузер остаётся работать)"""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        for page in list(self._tabs):
+            await self._close(page)
+        self._idle.clear()
+
+    async def memory(self) -> dict:
+        """JS heap вкладок пула (CDP Performance.getMetrics) и число процессов-рендереров Chrome"""
+        heap_used = heap_total = measured = 0
+        for page in list(self._tabs):
+            if page.is_closed():
+                continue
+            try:
+                session = await page.context.new_cdp_session(page)
+                try:
+                    await session.send("Performance.enable")
+                    result = await session.send("Performance.getMetrics")
+                    await session.send("Performance.disable")
+                finally:
+                    await session.detach()
+            except Exception as e:
+                logger.debug(f"TabPool: метрики вкладки недоступны: {e}")
+                continue
+            metrics = {m["name"]: m["value"] for m in result["metrics"]}
+            heap_used += metrics.get("JSHeapUsedSize", 0)
+            heap_total += metrics.get("JSHeapTotalSize", 0)
+            measured += 1
+        renderers = None
+        if self._context is not None and self._context.browser is not None:
+            try:
+                session = await self._context.browser.new_browser_cdp_session()
+                try:
+                    info = await session.send("SystemInfo.getProcessInfo")
+                finally:
+                    await session.detach()
+                renderers = sum(1 for p in info["processInfo"] if p.get("type") == "renderer")
+            except Exception as e:
+                logger.debug(f"TabPool: SystemInfo.getProcessInfo недоступен: {e}")
+        return {
+            "measured_tabs": measured,
+            "js_heap_used_bytes": int(heap_used),
+            "js_heap_total_bytes": int(heap_total),
+            "renderer_processes": renderers,
+        }
+
+    def stats(self) -> dict:
+        engines = {}
+        for page, tab in self._tabs.items():
+            counts = engines.setdefault(tab.engine, {"busy": 0, "idle": 0})
+            counts["busy" if tab.busy else "idle"] += 1
+        return {
+            "open_tabs": len(self._tabs),
+            "context_pages": len(self._context.pages) if self._context is not None else 0,
+            "engines": engines,
+            "created": self.created,
+            "reused": self.reused,
+            "recycled": self.recycled,
+            "leaked_closed": self.leaked_closed,
+        }
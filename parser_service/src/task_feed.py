@@ -0,0 +1,92 @@
+import asyncio
+from typing import Optional
+
+
+class TaskFeed:
+    """Поток ссылок выполняющейся задачи в порядке обнаружения (без повторов)
+
+    Смещение (offset) - индекс в feed.links, по нему поллеры и стрим
+    забирают только новые ссылки.
+    """
+
+    def __init__(self):
+        self.links: list[str] = []
+        # Откуда пришла каждая ссылка: (engine, page, keyword)
+        self.origins: list[tuple[str, int, Optional[str]]] = []
+        self._seen: set[str] = set()
+        self._changed = asyncio.Condition()
+        self.status: Optional[str] = None
+        # Ленты объединённых запросов (singleflight): (лента, последняя страница)
+        self._mirrors: list[tuple["TaskFeed", int]] = []
+
+    @property
+    def done(self) -> bool:
+        return self.status is not None
+
+    async def publish(self, engine: str, page: int, links: list[str], keyword: str = None) -> int:
+        """Добавление ссылок страницы выдачи; возвращает число новых"""
+        added = sum(self._add(link, (engine, page, keyword)) for link in links)
+        if added:
+            async with self._changed:
+                self._changed.notify_all()
+        for view, max_page in self._mirrors:
+            if page <= max_page:
+                await view.publish(engine, page, links, keyword)
+        return added
+
+    def _add(self, link: str, origin: tuple[str, int, Optional[str]]) -> bool:
+        if link in self._seen:
+            return False
+        self._seen.add(link)
+        self.links.append(link)
+        self.origins.append(origin)
+        return True
+
+    def mirror(self, max_page: int, view: "TaskFeed" = None) -> "TaskFeed":
+        """Лента объединённого запроса: ссылки этой ленты со страниц не дальше max_page
+
+        Свои смещения: уже собранные ссылки копируются, новые приходят из publish.
+        """
+        view = view or TaskFeed()
+        for link, origin in zip(self.links, self.origins):
+            if origin[1] <= max_page:
+                view._add(link, origin)
+        self._mirrors.append((view, max_page))
+        return view
+
+    def detach(self, view: "TaskFeed"):
+        self._mirrors = [(v, p) for v, p in self._mirrors if v is not view]
+
+    async def close(self, status: str):
+        self.status = status
+        async with self._changed:
+            self._changed.notify_all()
+        for view, _ in self._mirrors:
+            await view.close(status)
+
+    async def wait(self, offset: int, timeout: float) -> bool:
+        """Ждёт ссылок после offset или завершения задачи; False - таймаут"""
+        async with self._changed:
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: len(self.links) > offset or self.done),
+                    timeout,
+                )
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+    def chunks(self, offset: int) -> list[dict]:
+        """Новые ссылки после offset, сгруппированные по (engine, page, keyword)"""
+        result = []
+        for i in range(offset, len(self.links)):
+            engine, page, keyword = self.origins[i]
+            if result and (result[-1]["engine"], result[-1]["page"], result[-1]["keyword"]) == (engine, page, keyword):
+                result[-1]["links"].append(self.links[i])
+                continue
+            result.append({"offset": i, "engine": engine, "page": page, "keyword": keyword, "links": [self.links[i]]})
+        return result
+
+    def ordered(self, links: set[str]) -> list[str]:
+        """Итоговый список: порядок обнаружения, остальное (если есть) в конце"""
+        return self.links + sorted(links - self._seen)
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStore:
+    """Хранилище задач и результатов: LRU в памяти поверх SQLite, записи живут ttl секунд
+
+    Ведёт себя как dict (task_id -> запись), каждая запись пишется на диск, поэтому
+    вытеснение из памяти ничего не теряет, а результаты переживают рестарт.
+    Изменённую на месте запись нужно присвоить заново: store[task_id] = record.
+    Запись идёт в одном фоновом потоке: присваивание лишь сериализует запись в очередь,
+    частые обновления одной задачи до записи схлопываются в последнее.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = None, max_memory: int = None, ttl: float = None):
+        self.path = path or settings.task_store_path
+        self.max_memory = max_memory or settings.task_store_max_memory
+        self.ttl = settings.task_store_ttl if ttl is None else ttl
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._pending: dict[str, tuple[str, str]] = {}
+        self.write_errors = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-store")
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                record TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_tasks_updated_at ON tasks (updated_at)")
+        self._conn.commit()
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+    def __getitem__(self, task_id: str) -> dict:
+        record = self.get(task_id)
+        if record is None:
+            raise KeyError(task_id)
+        return record
+
+    def __setitem__(self, task_id: str, record: dict):
+        self._remember(task_id, record)
+        payload = (record.get("status", ""), json.dumps(record, ensure_ascii=False, default=str))
+        with self._lock:
+            queued = task_id in self._pending
+            self._pending[task_id] = payload
+        if not queued:
+            self._executor.submit(self._write, task_id)
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._purge_soon()
+
+    def _write(self, task_id: str):
+        with self._lock:
+            payload = self._pending.pop(task_id, None)
+            if payload is None:
+                # Задачу успели удалить
+                return
+            status, raw = payload
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tasks (task_id, status, record, updated_at) VALUES (?, ?, ?, ?)",
+                    (task_id, status, raw, time.time()),
+                )
+                self._conn.commit()
+            except Exception as e:
+                self.write_errors += 1
+                logger.error(f"TaskStore: не удалось записать задачу {task_id}: {e}")
+
+    async def flush(self):
+        """Дождаться записи всего, что поставлено в очередь"""
+        await asyncio.get_running_loop().run_in_executor(self._executor, lambda: None)
+
+    def get(self, task_id: str, default: dict = None) -> Optional[dict]:
+        record = self._memory.get(task_id)
+        if record is not None:
+            self._memory.move_to_end(task_id)
+            return record
+        with self._lock:
+            payload = self._pending.get(task_id)
+            if payload is not None:
+                # Ещё не записана, но из памяти уже вытеснена
+                raw = payload[1]
+            else:
+                row = self._conn.execute(
+                    "SELECT record FROM tasks WHERE task_id = ? AND updated_at >= ?",
+                    (task_id, time.time() - self.ttl),
+                ).fetchone()
+                raw = row[0] if row else None
+        if raw is None:
+            return default
+        record = json.loads(raw)
+        self._remember(task_id, record)
+        return record
+
+    def pop(self, task_id: str, default: dict = None) -> Optional[dict]:
+        record = self.get(task_id, default)
+        self._memory.pop(task_id, None)
+        with self._lock:
+            self._pending.pop(task_id, None)
+        self._executor.submit(self._delete, task_id)
+        return record
+
+    def _delete(self, task_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+
+    def _remember(self, task_id: str, record: dict):
+        self._memory[task_id] = record
+        self._memory.move_to_end(task_id)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def mark_interrupted(self) -> int:
+        """После рестарта незавершённые задачи уже не выполнятся - помечаем их failed"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, record FROM tasks WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        for task_id, raw in rows:
+            record = json.loads(raw)
+            record.update({"status": "failed", "error": "Parser service restarted before the task finished"})
+            self[task_id] = record
+        if rows:
+            logger.warning(f"Marked {len(rows)} interrupted tasks as failed")
+        return len(rows)
+
+    def purge_expired(self) -> int:
+        """Удаление записей старше ttl (в потоке записи); возвращает число удалённых"""
+        expired = self._executor.submit(self._purge).result()
+        self._forget(expired)
+        return len(expired)
+
+    def _purge_soon(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.purge_expired()
+            return
+        # Память event loop трогает без блокировки - чистим её в колбэке на loop
+        loop.run_in_executor(self._executor, self._purge).add_done_callback(self._purged)
+
+    def _purged(self, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is None:
+            self._forget(future.result())
+
+    def _purge(self) -> list[str]:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                row[0]
+                for row in self._conn.execute("SELECT task_id FROM tasks WHERE updated_at < ?", (cutoff,))
+            ]
+            self._conn.execute("DELETE FROM tasks WHERE updated_at < ?", (cutoff,))
+            self._conn.commit()
+        return expired
+
+    def _forget(self, task_ids: list[str]):
+        for task_id in task_ids:
+            self._memory.pop(task_id, None)
+
+    def close(self):
+        """Дописать очередь и закрыть базу"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (total,) = self._conn.execute("SELECT COUNT(*) FROM tasks").fetchone()
+        return {
+            "path": self.path,
+            "ttl_seconds": self.ttl,
+            "in_memory": len(self._memory),
+            "max_memory": self.max_memory,
+            "stored": total,
+            "pending_writes": len(self._pending),
+            "write_errors": self.write_errors,
+        }
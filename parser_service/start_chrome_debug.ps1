@@ -17,4 +17,4 @@ Write-Host "⚠ НЕ ЗАКРЫВАЙТЕ это окно PowerShell!" -Foregrou
 Write-Host "📌 Для запуска парсера откройте НОВОЕ окно и выполните:" -ForegroundColor Cyan
 Write-Host "   cd D:\ProjectVC\search-parser" -ForegroundColor White
 Write-Host "   .\.venv\Scripts\Activate.ps1" -ForegroundColor White
-Write-Host "   python cli.py кирпич 3 yandex" -ForegroundColor White
+Write-Host "   python cli.py parse кирпич 3 yandex" -ForegroundColor White
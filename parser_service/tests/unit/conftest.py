@@ -0,0 +1,15 @@
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def api(tmp_path_factory):
+    """api.py без браузера: кэш, хранилища и лог создаются во временной папке"""
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("api"))
+    try:
+        import api
+    finally:
+        os.chdir(cwd)
+    return api
@@ -0,0 +1,63 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.inflight import InflightTasks
+from src.scheduler import ParseScheduler
+
+
+@pytest.fixture
+def service(api, monkeypatch):
+    """api без lifespan: задачи остаются в очереди незапущенного scheduler"""
+    monkeypatch.setattr(api, "scheduler", ParseScheduler(workers=1))
+    monkeypatch.setattr(api, "inflight", InflightTasks())
+    monkeypatch.setattr(api, "live_feeds", {})
+    return api
+
+
+async def _post_concurrently(api, *bodies: dict) -> list[dict]:
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://parser") as client:
+        responses = await asyncio.gather(*(client.post("/parse", json=body) for body in bodies))
+    assert [r.status_code for r in responses] == [200] * len(bodies)
+    return [r.json() for r in responses]
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_create_one_parser_task(service):
+    first, second = await _post_concurrently(
+        service,
+        {"keyword": "Кирпич  оптом", "depth": 3, "mode": "yandex"},
+        {"keyword": "кирпич оптом", "depth": 2, "mode": "yandex"},
+    )
+
+    assert service.scheduler.stats()["queue_depth"] == 1
+    assert service.results_storage[second["task_id"]]["deduplicated_from"] == first["task_id"]
+    assert service.inflight.stats()["followers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_early_stop_requests_coalesce_with_same_known_domains(service):
+    body = {"keyword": "кирпич", "mode": "yandex", "early_stop": True}
+    await _post_concurrently(
+        service,
+        {**body, "known_domains": ["a.ru", "www.b.ru"]},
+        {**body, "known_domains": ["b.ru", "A.ru"]},
+    )
+
+    assert service.scheduler.stats()["queue_depth"] == 1
+    assert service.inflight.stats()["followers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_different_stop_policies_are_not_coalesced(service):
+    await _post_concurrently(
+        service,
+        {"keyword": "кирпич", "mode": "yandex", "early_stop": True, "known_domains": ["a.ru"]},
+        {"keyword": "кирпич", "mode": "yandex", "early_stop": True, "known_domains": ["c.ru"]},
+        {"keyword": "кирпич", "mode": "yandex", "early_stop": False, "known_domains": ["a.ru"]},
+    )
+
+    assert service.scheduler.stats()["queue_depth"] == 3
+    assert service.inflight.stats()["followers"] == 0
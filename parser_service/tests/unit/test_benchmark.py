@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+from src.benchmark import _protocol_calls, _Totals
+
+
+def _engine(pages: int):
+    return SimpleNamespace(page_metrics=[{}] * pages, extraction_times=[0.001] * pages)
+
+
+def test_protocol_calls_reads_connection_counter():
+    page = SimpleNamespace(_impl_obj=SimpleNamespace(_connection=SimpleNamespace(_last_id=42)))
+    assert _protocol_calls(page) == 42
+
+
+def test_protocol_calls_unavailable_without_private_counter():
+    # Другая версия Playwright: внутренних атрибутов нет
+    assert _protocol_calls(SimpleNamespace()) is None
+    assert _protocol_calls(SimpleNamespace(_impl_obj=SimpleNamespace(_connection=object()))) is None
+
+
+def test_report_calls_per_page():
+    totals = _Totals()
+    totals.add(_engine(2), links=20, seconds=1.0, calls=30)
+    assert totals.report(browser=True)["cdp_calls_per_page"] == 15.0
+    assert totals.report(browser=False)["cdp_calls_per_page"] is None
+
+
+def test_report_na_when_counter_unavailable():
+    totals = _Totals()
+    totals.add(_engine(2), links=20, seconds=1.0, calls=30)
+    totals.add(_engine(1), links=10, seconds=1.0, calls=None)
+    assert totals.report(browser=True)["cdp_calls_per_page"] == "n/a"
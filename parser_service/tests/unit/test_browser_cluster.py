@@ -0,0 +1,153 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from src import browser_cluster
+from src.browser_cluster import BrowserCluster, NoHealthyEndpointsError
+from src.rate_governor import governors
+
+
+class _Pool:
+    """BrowserPool без Chrome: fail - ошибка подключения, gate - подключение ждёт события"""
+
+    def __init__(self, cdp_endpoint: str, size: int = None):
+        self.cdp_endpoint = cdp_endpoint
+        self.size = size or 2
+        self.active_leases = 0
+        self.fail = None
+        self.gate = None
+        self.on_release = None
+
+    async def start(self):
+        if self.fail:
+            raise self.fail
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"cdp_endpoint": self.cdp_endpoint, "size": self.size, "active_leases": self.active_leases}
+
+    @asynccontextmanager
+    async def lease(self):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise self.fail
+        self.active_leases += 1
+        try:
+            yield SimpleNamespace(cdp_endpoint=self.cdp_endpoint, wait_seconds=0.0)
+        finally:
+            self.active_leases -= 1
+            await self.on_release()
+
+
+@pytest.fixture
+def down(monkeypatch):
+    """Endpoints, не отвечающие на probe_cdp"""
+    down = set()
+
+    def probe(endpoint: str) -> dict:
+        if endpoint in down:
+            raise ConnectionError(f"{endpoint} недоступен")
+        return {"Browser": "Chrome/143"}
+
+    monkeypatch.setattr(browser_cluster, "BrowserPool", _Pool)
+    monkeypatch.setattr(browser_cluster, "probe_cdp", probe)
+    return down
+
+
+def _cluster(*urls: str, size: int = 2) -> BrowserCluster:
+    return BrowserCluster(urls, size=size, probe_interval=3600)
+
+
+@pytest.mark.asyncio
+async def test_lease_goes_to_least_loaded_endpoint(down):
+    cluster = _cluster("http://a:9222", "http://b:9222")
+
+    async with cluster.lease() as first:
+        async with cluster.lease() as second:
+            assert {first.cdp_endpoint, second.cdp_endpoint} == {"http://a:9222", "http://b:9222"}
+            assert cluster.stats()["active_leases"] == 2
+
+
+@pytest.mark.asyncio
+async def test_captcha_pressure_steers_leases_away(down):
+    cluster = _cluster("http://pressure-a:9222", "http://pressure-b:9222")
+    governor = governors.get("yandex", "http://pressure-a:9222")
+    governor.interval = governor.base_interval * 4
+
+    async with cluster.lease() as first:
+        # У b одна аренда из двух, но a под капчами вчетверо медленнее
+        async with cluster.lease() as second:
+            assert first.cdp_endpoint == second.cdp_endpoint == "http://pressure-b:9222"
+
+
+@pytest.mark.asyncio
+async def test_failed_endpoint_is_ejected_and_lease_fails_over(down):
+    cluster = _cluster("http://a:9222", "http://b:9222")
+    cluster.endpoints["http://a:9222"].pool.fail = ConnectionError("CDP отвалился")
+
+    async with cluster.lease() as lease:
+        assert lease.cdp_endpoint == "http://b:9222"
+
+    a = cluster.stats()["endpoints"][0]
+    assert not a["healthy"] and a["ejections"] == 1 and "CDP отвалился" in a["error"]
+    assert cluster.endpoints["http://a:9222"].reserved == 0
+
+
+@pytest.mark.asyncio
+async def test_probe_readmits_endpoint_that_answers_again(down):
+    cluster = _cluster("http://a:9222", "http://b:9222")
+    a = cluster.endpoints["http://a:9222"]
+    a.pool.fail = ConnectionError("CDP отвалился")
+    await cluster.start()
+    assert not a.healthy
+
+    down.add("http://a:9222")
+    await cluster._probe_unhealthy()
+    assert not a.healthy
+
+    down.clear()
+    a.pool.fail = None
+    await cluster._probe_unhealthy()
+    assert a.healthy and a.error is None
+    await cluster.stop()
+
+
+@pytest.mark.asyncio
+async def test_all_endpoints_down_raises(down):
+    cluster = _cluster("http://a:9222")
+    cluster.endpoints["http://a:9222"].pool.fail = ConnectionError("CDP отвалился")
+    down.add("http://a:9222")
+
+    with pytest.raises(NoHealthyEndpointsError):
+        async with cluster.lease():
+            pass
+
+
+@pytest.mark.asyncio
+async def test_failed_lease_wakes_waiters(down):
+    cluster = _cluster("http://a:9222", size=1)
+    pool = cluster.endpoints["http://a:9222"].pool
+    pool.gate = asyncio.Event()
+    down.add("http://a:9222")
+
+    async def lease():
+        async with cluster.lease():
+            pass
+
+    connecting = asyncio.create_task(lease())
+    await asyncio.sleep(0.01)
+    # Единственное место зарезервировано подключающейся задачей - вторая ждёт
+    waiting = asyncio.create_task(lease())
+    await asyncio.sleep(0.01)
+    assert not waiting.done()
+
+    pool.fail = ConnectionError("CDP отвалился")
+    pool.gate.set()
+    results = await asyncio.wait_for(asyncio.gather(connecting, waiting, return_exceptions=True), 1)
+
+    assert all(isinstance(r, NoHealthyEndpointsError) for r in results)
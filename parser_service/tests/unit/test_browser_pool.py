@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src import browser_pool
+from src.browser_pool import BrowserPool
+
+
+class _Context:
+    def __init__(self):
+        self.pages = []
+
+    async def set_extra_http_headers(self, headers):
+        pass
+
+
+class _Browser:
+    def __init__(self):
+        self.contexts = [_Context()]
+        self.alive = True
+        self.handlers = {}
+
+    def is_connected(self) -> bool:
+        return self.alive
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    def disconnect(self):
+        """Chrome закрыли или упало CDP соединение"""
+        self.alive = False
+        self.handlers["disconnected"](self)
+
+    async def close(self):
+        self.alive = False
+
+
+class _Playwright:
+    """async_playwright() с connect_over_cdp, который выдаёт новый _Browser на каждый вызов"""
+
+    def __init__(self):
+        self.starts = 0
+        self.browsers = []
+        self.chromium = SimpleNamespace(connect_over_cdp=self._connect)
+
+    async def _connect(self, endpoint):
+        self.browsers.append(_Browser())
+        return self.browsers[-1]
+
+    async def start(self):
+        self.starts += 1
+        return self
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def playwright(monkeypatch):
+    playwright = _Playwright()
+    monkeypatch.setattr(browser_pool, "async_playwright", lambda: playwright)
+    monkeypatch.setattr(browser_pool, "probe_cdp", lambda endpoint: {"Browser": "Chrome/120"})
+    monkeypatch.setattr("src.config.settings.tab_pool", False)
+    return playwright
+
+
+@pytest.mark.asyncio
+async def test_lease_waits_for_free_slot(playwright):
+    pool = BrowserPool("http://127.0.0.1:9222", size=1)
+    first_in, first_out = asyncio.Event(), asyncio.Event()
+    waits = []
+
+    async def hold():
+        async with pool.lease():
+            first_in.set()
+            await first_out.wait()
+
+    async def wait_for_slot():
+        async with pool.lease() as lease:
+            waits.append(lease.wait_seconds)
+            assert pool.active_leases == 1
+
+    holder = asyncio.create_task(hold())
+    await first_in.wait()
+    waiter = asyncio.create_task(wait_for_slot())
+    await asyncio.sleep(0.05)
+
+    # Единственный слот занят - вторая аренда ждёт
+    assert not waits and pool.active_leases == 1
+    first_out.set()
+    await asyncio.gather(holder, waiter)
+
+    stats = pool.stats()
+    assert waits[0] >= 0.04
+    assert stats["active_leases"] == 0 and stats["total_leases"] == 2
+    assert stats["last_lease_wait_seconds"] == stats["max_lease_wait_seconds"] == round(waits[0], 3)
+    # Одно подключение на все аренды
+    assert len(playwright.browsers) == 1
+
+
+@pytest.mark.asyncio
+async def test_lease_reconnects_after_disconnect(playwright):
+    pool = BrowserPool("http://127.0.0.1:9222", size=2)
+    await pool.start()
+    playwright.browsers[0].disconnect()
+    assert not pool.connected
+
+    async with pool.lease() as lease:
+        assert lease.context is playwright.browsers[1].contexts[0]
+
+    stats = pool.stats()
+    assert stats["connected"] and stats["reconnects"] == 1
+    # playwright запускается один раз, переподключается только браузер
+    assert playwright.starts == 1 and len(playwright.browsers) == 2
+
+
+@pytest.mark.asyncio
+async def test_unavailable_cdp_frees_the_slot(playwright, monkeypatch):
+    def refused(endpoint):
+        raise ConnectionError("connection refused")
+
+    monkeypatch.setattr(browser_pool, "probe_cdp", refused)
+    pool = BrowserPool("http://127.0.0.1:9222", size=1)
+
+    with pytest.raises(Exception, match="Chrome CDP is not available"):
+        async with pool.lease():
+            pass
+
+    assert pool.active_leases == 0 and pool.total_leases == 0
+    assert pool._slots._value == 1
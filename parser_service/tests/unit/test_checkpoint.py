@@ -0,0 +1,85 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+import cli
+from src.checkpoint import BatchCheckpoint
+
+
+class _Parser:
+    """parse() по заранее заданному сценарию: ключ -> исключение, остальные отдают одну ссылку"""
+
+    def __init__(self, fail: dict = None):
+        self.fail = fail or {}
+        self.calls = []
+
+    async def parse(self, keyword, depth, mode):
+        self.calls.append(keyword)
+        if keyword in self.fail:
+            raise self.fail[keyword]
+        return {f"https://{keyword}.ru/"}
+
+    async def close(self):
+        pass
+
+
+class _Cluster:
+    def __init__(self, size=None):
+        pass
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """Запуск cli parse-batch без браузера; возвращает парсер прогона"""
+    monkeypatch.setattr(cli, "setup_logging", lambda log_file: None)
+    monkeypatch.setattr(cli, "BrowserCluster", _Cluster)
+    source = tmp_path / "keywords.txt"
+    source.write_text("a\nb\nc\nd\n", encoding="utf-8")
+    output = tmp_path / "out.ndjson"
+
+    def run(parser: _Parser):
+        monkeypatch.setattr(cli, "SearchParser", lambda **kwargs: parser)
+        args = ["parse-batch", str(source), "--concurrency", "1", "--output", str(output)]
+        return CliRunner().invoke(cli.app, args)
+
+    run.output = output
+    return run
+
+
+def _records(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_resume_skips_finished_keywords(batch):
+    first = _Parser({"b": RuntimeError("captcha"), "c": KeyboardInterrupt()})
+    result = batch(first)
+
+    assert result.exit_code == 130
+    assert first.calls == ["a", "b", "c"]
+    progress = BatchCheckpoint(f"{batch.output}.checkpoint.json")
+    assert progress.done == {"a"} and progress.failed == {"b": "captcha"}
+
+    # Готовый ключ не повторяется, ключ с ошибкой и недошедшие - да
+    second = _Parser()
+    result = batch(second)
+
+    assert result.exit_code == 0
+    assert second.calls == ["b", "c", "d"]
+    assert [(r["keyword"], r["status"]) for r in _records(batch.output)] == [
+        ("a", "completed"),
+        ("b", "failed"),
+        ("b", "completed"),
+        ("c", "completed"),
+        ("d", "completed"),
+    ]
+    progress = BatchCheckpoint(f"{batch.output}.checkpoint.json")
+    assert progress.done == {"a", "b", "c", "d"} and not progress.failed
+
+    # Всё готово - парсер даже не создаётся
+    third = _Parser()
+    assert batch(third).exit_code == 0
+    assert third.calls == []
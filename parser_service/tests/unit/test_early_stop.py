@@ -0,0 +1,94 @@
+import pytest
+
+from src.early_stop import EarlyStop, known_domain_set
+from src.engines import YandexEngine
+from src.parser import SearchParser
+
+
+def _page(*domains: str) -> list[str]:
+    return [f"https://{d}/catalog" for d in domains]
+
+
+def test_stops_after_patience_pages_without_new_domains():
+    policy = EarlyStop(min_new_share=0.5, patience=2)
+
+    assert not policy.observe(_page("a.ru", "b.ru", "c.ru"))
+    # Одна страница без новых доменов - ещё не повод
+    assert not policy.observe(_page("a.ru", "b.ru", "d.ru"))
+    # Новые домены сбрасывают счётчик
+    assert not policy.observe(_page("e.ru", "f.ru"))
+    assert not policy.observe(_page("a.ru", "e.ru"))
+    assert policy.observe(_page("b.ru", "www.f.ru"))
+
+    assert policy.next_page == 6
+    assert policy.shares == {1: 1.0, 2: 0.333, 3: 1.0, 4: 0.0, 5: 0.0}
+
+
+def test_known_domains_and_their_subdomains_are_not_new():
+    known = known_domain_set(["www.a.ru", " B.ru ", ""])
+    policy = EarlyStop(known, min_new_share=0.5, patience=1)
+
+    assert known == {"a.ru", "b.ru"}
+    assert policy.is_known("shop.a.ru")
+    assert not policy.is_known("ru")
+    # Из трёх доменов новый только c.ru
+    assert policy.observe(_page("a.ru", "spb.b.ru", "c.ru"))
+    assert policy.shares == {1: 0.333}
+
+
+class _PrefixCache:
+    def __init__(self, pages: dict[int, list[str]]):
+        self.pages = pages
+        self.stored = []
+
+    def get_prefix(self, engine, query, depth, max_age=None):
+        return self.pages, False
+
+    def put_pages(self, *args):
+        self.stored.append(args)
+
+
+@pytest.mark.asyncio
+async def test_cached_pages_alone_trigger_stop(monkeypatch):
+    monkeypatch.setattr("src.config.settings.early_stop_min_new_share", 0.5)
+    monkeypatch.setattr("src.config.settings.early_stop_pages", 2)
+    cache = _PrefixCache({
+        1: _page("a.ru", "b.ru"),
+        2: _page("a.ru", "b.ru"),
+        3: _page("b.ru", "known.ru"),
+    })
+    parser = SearchParser(cache=cache, early_stop=True, known_domains=["known.ru"])
+
+    async def no_fetch(*args, **kwargs):
+        raise AssertionError("поисковик не должен открываться")
+
+    monkeypatch.setattr(parser, "_fetch_engine", no_fetch)
+    collected = set()
+    await parser._run_engine(None, YandexEngine(), "кирпич", "кирпич", 10, collected)
+
+    assert collected == set(_page("a.ru", "b.ru", "known.ru"))
+    assert cache.stored == []
+    assert parser.early_stops == [{
+        "engine": "yandex",
+        "keyword": "кирпич",
+        "stopped_at": 3,
+        "pages_saved": 7,
+        "new_domain_shares": {1: 1.0, 2: 0.0, 3: 0.0},
+    }]
+
+
+def test_pages_saved_counts_only_existing_pages():
+    parser = SearchParser(early_stop=True)
+    engine = YandexEngine()
+    engine.early_stop = EarlyStop()
+
+    # Выдача кончается на 6-й странице: при depth 10 сэкономлены 6-4 = 2, а не 6
+    engine.last_page = 6
+    parser._record_early_stop(engine, "кирпич", 10, 4, 4)
+    # Параллельные вкладки успели открыть последнюю страницу
+    parser._record_early_stop(engine, "кирпич", 10, 4, 6)
+    engine.last_page = None
+    parser._record_early_stop(engine, "кирпич", 10, 4, 4)
+
+    assert [s["pages_saved"] for s in parser.early_stops] == [2, 0, 6]
+    assert parser.pages_saved == 8
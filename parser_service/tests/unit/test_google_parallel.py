@@ -0,0 +1,146 @@
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from src.engines import GoogleEngine
+from src.rate_governor import RateGovernor
+
+SORRY_URL = "https://www.google.com/sorry/index?continue=search"
+
+
+def _page_number(url: str) -> int:
+    start = parse_qs(urlparse(url).query).get("start", ["0"])[0]
+    return int(start) // 10 + 1
+
+
+class _Locator:
+    def __init__(self, count: int):
+        self._count = count
+
+    async def count(self) -> int:
+        return self._count
+
+
+class _Serp:
+    """Выдача Google на last_page страниц; captcha_once - страницы, первый заход на которые даёт /sorry/"""
+
+    def __init__(self, last_page: int, captcha_once=()):
+        self.last_page = last_page
+        self.captcha_once = set(captcha_once)
+        self.visits: list[tuple[int, str]] = []
+
+
+class _Tab:
+    def __init__(self, serp: _Serp, name: str):
+        self.serp = serp
+        self.name = name
+        self.url = "about:blank"
+
+    async def goto(self, url: str, **kwargs):
+        n = _page_number(url)
+        self.serp.visits.append((n, self.name))
+        if n in self.serp.captcha_once:
+            self.serp.captcha_once.discard(n)
+            self.url = SORRY_URL
+        else:
+            self.url = url
+
+    def locator(self, selector: str) -> _Locator:
+        return _Locator(int(_page_number(self.url) < self.serp.last_page))
+
+    async def wait_for_selector(self, selector: str, timeout: float = None):
+        pass
+
+    async def evaluate(self, script: str, arg: dict) -> list[dict]:
+        n = _page_number(self.url)
+        return [{"href": f"https://p{n}-{i}.ru/", "title": "", "rank": i + 1} for i in range(2)]
+
+
+def _engine(monkeypatch, interval: float = 0.001) -> GoogleEngine:
+    monkeypatch.setattr("src.config.settings.pace_jitter", 0.0)
+
+    async def no_pause(*args, **kwargs):
+        pass
+
+    async def no_captcha(page) -> float:
+        return 0.0
+
+    monkeypatch.setattr("src.engines.human_pause", no_pause)
+    engine = GoogleEngine(parallel_tabs=3)
+    engine.recorder = None
+    engine.governor = RateGovernor("google", "test", interval, burst=1)
+    monkeypatch.setattr(engine, "behave", no_pause)
+    monkeypatch.setattr(engine, "wait_captcha", no_captcha)
+    return engine
+
+
+def test_search_url_pages_by_start_offset():
+    assert GoogleEngine.search_url("кирпич оптом") == "https://www.google.com/search?q=кирпич+оптом&hl=ru"
+    assert GoogleEngine.search_url("кирпич", 3).endswith("&hl=ru&start=20")
+
+
+@pytest.mark.asyncio
+async def test_parallel_tabs_fetch_pages_by_start(monkeypatch):
+    engine = _engine(monkeypatch)
+    serp = _Serp(last_page=10)
+    tabs = [_Tab(serp, f"tab{i}") for i in range(3)]
+    await tabs[0].goto(GoogleEngine.search_url("кирпич", 1))
+    serp.visits.clear()
+
+    collected = set()
+    await engine._parse_parallel(tabs, "кирпич", 6, collected)
+
+    assert sorted(n for n, _ in serp.visits) == [2, 3, 4, 5, 6]
+    assert {tab for _, tab in serp.visits} == {"tab0", "tab1", "tab2"}
+    assert sorted(engine.page_links) == [1, 2, 3, 4, 5, 6]
+    assert engine.page_links[4] == ["https://p4-0.ru/", "https://p4-1.ru/"]
+    assert not engine.parallel_fallback and engine.last_page is None
+
+
+@pytest.mark.asyncio
+async def test_tabs_stop_at_last_page(monkeypatch):
+    engine = _engine(monkeypatch)
+    serp = _Serp(last_page=3)
+    tabs = [_Tab(serp, f"tab{i}") for i in range(3)]
+    await tabs[0].goto(GoogleEngine.search_url("кирпич", 1))
+
+    await engine._parse_parallel(tabs, "кирпич", 8, set())
+
+    assert engine.last_page == 3
+    # Страницы за концом выдачи, открытые параллельно, не сохраняются
+    assert sorted(engine.page_links) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_captcha_in_tab_falls_back_to_sequential(monkeypatch):
+    engine = _engine(monkeypatch)
+    serp = _Serp(last_page=10, captcha_once={3})
+    tabs = [_Tab(serp, f"tab{i}") for i in range(3)]
+    await tabs[0].goto(GoogleEngine.search_url("кирпич", 1))
+    serp.visits.clear()
+
+    await engine._parse_parallel(tabs, "кирпич", 6, set())
+
+    assert engine.parallel_fallback
+    assert sorted(engine.page_links) == [1, 2, 3, 4, 5, 6]
+    assert engine.governor.captchas == 1
+    assert any(stats["captcha"] for stats in engine.tab_stats)
+    # Страница с капчей дособрана в основной вкладке
+    assert (3, "tab0") in serp.visits
+
+
+@pytest.mark.asyncio
+async def test_each_tab_has_its_own_pace(monkeypatch):
+    engine = _engine(monkeypatch, interval=0.2)
+    serp = _Serp(last_page=10)
+    tabs = [_Tab(serp, f"tab{i}") for i in range(3)]
+    await tabs[0].goto(GoogleEngine.search_url("кирпич", 1))
+
+    started = time.monotonic()
+    await engine._parse_parallel(tabs, "кирпич", 7, set())
+    elapsed = time.monotonic() - started
+
+    # 6 страниц по 3 вкладкам: по два перехода на вкладку (~0.2 с), а не 6 интервалов общего темпа
+    assert sorted(engine.page_links) == [1, 2, 3, 4, 5, 6, 7]
+    assert elapsed < 0.6
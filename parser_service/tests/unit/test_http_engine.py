@@ -0,0 +1,116 @@
+from pathlib import Path
+
+import httpx
+import lxml.html
+import pytest
+
+from src.engines import GoogleEngine, YandexEngine
+from src.http_engine import HttpSearchEngine, SerpBlockedError, extract_html, unwrap_redirect
+
+FIXTURES = Path(__file__).parent.parent / "fixtures" / "serp"
+
+
+def _doc(name: str):
+    return lxml.html.fromstring((FIXTURES / name).read_text(encoding="utf-8"))
+
+
+def _extract(engine: HttpSearchEngine, name: str) -> list[dict]:
+    return extract_html(
+        _doc(name),
+        engine.result_container_selector,
+        engine.result_link_selector,
+        engine.result_title_selector,
+        engine.fallback_link_selector,
+    )
+
+
+def _response(status: int, url: str, fixture: str = None) -> httpx.Response:
+    text = (FIXTURES / fixture).read_text(encoding="utf-8") if fixture else ""
+    return httpx.Response(status, text=text, request=httpx.Request("GET", url))
+
+
+def test_yandex_extraction_by_container():
+    engine = HttpSearchEngine(YandexEngine())
+
+    results = _extract(engine, "yandex_page1.html")
+
+    assert results == [
+        {
+            "href": "https://kirpich-torg.ru/catalog/?utm_source=yandex",
+            "title": "Кирпич облицовочный от производителя",
+            "rank": 1,
+        },
+        {"href": "https://stroybaza.ru/kirpich", "title": "Купить кирпич в Москве", "rank": 2},
+        {"href": "https://market.example.com/kirpich", "title": "Кирпич на маркетплейсе", "rank": 3},
+    ]
+    assert [engine.normalize_link(r["href"]) for r in results] == [
+        "https://kirpich-torg.ru/catalog/",
+        "https://stroybaza.ru/kirpich",
+        None,
+    ]
+
+
+def test_yandex_extraction_falls_back_without_containers():
+    results = _extract(HttpSearchEngine(YandexEngine()), "yandex_no_containers.html")
+
+    # Повтор ссылки пропущен, пустой текст - title None
+    assert results == [
+        {"href": "https://kirpich-torg.ru/", "title": "Кирпич-Торг", "rank": 1},
+        {"href": "https://stroybaza.ru/kirpich", "title": None, "rank": 2},
+    ]
+
+
+def test_google_extraction_unwraps_redirects():
+    engine = HttpSearchEngine(GoogleEngine())
+
+    results = _extract(engine, "google_page1.html")
+
+    assert [r["rank"] for r in results] == [1, 2, 3]
+    assert results[0]["title"] == "Кирпич облицовочный от производителя"
+    assert [engine.normalize_link(r["href"]) for r in results] == [
+        "https://kirpich-torg.ru/catalog/",
+        None,
+        "https://stroybaza.ru/kirpich",
+    ]
+
+
+@pytest.mark.parametrize(
+    "href, expected",
+    [
+        ("/url?q=https://kirpich-torg.ru/catalog/&sa=U&ved=2ahUKEwi", "https://kirpich-torg.ru/catalog/"),
+        ("/url?sa=U&ved=2ahUKEwi", "/url?sa=U&ved=2ahUKEwi"),
+        ("https://stroybaza.ru/kirpich", "https://stroybaza.ru/kirpich"),
+    ],
+)
+def test_unwrap_redirect(href, expected):
+    assert unwrap_redirect(href) == expected
+
+
+@pytest.mark.parametrize(
+    "response, reason",
+    [
+        (_response(403, "https://yandex.ru/search/?text=kirpich"), "HTTP 403"),
+        (_response(429, "https://www.google.com/search?q=kirpich"), "HTTP 429"),
+        (_response(503, "https://yandex.ru/search/?text=kirpich"), "HTTP 503"),
+        (_response(200, "https://yandex.ru/showcaptcha?cc=1&retpath=https%3A%2F%2Fyandex.ru"), "captcha redirect"),
+        (_response(200, "https://www.google.com/sorry/index?continue=https://www.google.com/search"), "captcha redirect"),
+        (_response(200, "https://yandex.ru/search/?text=kirpich", "yandex_captcha.html"), "marker 'showcaptcha'"),
+        (_response(200, "https://www.google.com/search?q=kirpich", "google_sorry.html"), "marker 'g-recaptcha'"),
+    ],
+)
+def test_check_blocked_reasons(response, reason):
+    engine = HttpSearchEngine(YandexEngine())
+
+    with pytest.raises(SerpBlockedError) as exc:
+        engine._check_blocked(response, 2)
+
+    assert exc.value.reason == reason
+    assert exc.value.page_number == 2
+    assert engine.client.blocked >= 1
+
+
+@pytest.mark.parametrize("fixture", ["yandex_page1.html", "google_page1.html"])
+def test_check_blocked_passes_results_page(fixture):
+    engine = HttpSearchEngine(YandexEngine())
+
+    engine._check_blocked(_response(200, "https://yandex.ru/search/?text=kirpich", fixture), 1)
@@ -0,0 +1,48 @@
+import httpx
+import pytest
+from prometheus_client import CONTENT_TYPE_LATEST
+from prometheus_client.parser import text_string_to_metric_families
+
+from src.metrics import _BUCKETS, observe, timed
+
+# Метрики глобальные для процесса - своя метка поисковика, чтобы не зависеть от других тестов
+ENGINE = "metrics-test"
+
+
+def _samples(text: str, name: str) -> dict:
+    return {
+        (sample.name, sample.labels.get("le"), sample.labels.get("status")): sample.value
+        for family in text_string_to_metric_families(text)
+        for sample in family.samples
+        if sample.name.startswith(name) and sample.labels.get("engine") == ENGINE
+    }
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_stage_histograms(api):
+    observe("extraction", 0.03, ENGINE)
+    observe("extraction", 7, ENGINE)
+    with pytest.raises(RuntimeError):
+        with timed("navigation", ENGINE):
+            raise RuntimeError("timeout")
+
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://parser") as client:
+        response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == CONTENT_TYPE_LATEST
+    assert "# TYPE parser_extraction_seconds histogram" in response.text
+
+    extraction = _samples(response.text, "parser_extraction_seconds")
+    buckets = {le: value for (name, le, _), value in extraction.items() if name.endswith("_bucket")}
+    # Все границы из _BUCKETS плюс +Inf, счётчики накопительные
+    assert len(buckets) == len(_BUCKETS) + 1
+    assert buckets["0.025"] == 0 and buckets["0.05"] == 1
+    assert buckets["5.0"] == 1 and buckets["10.0"] == 2 and buckets["+Inf"] == 2
+    assert extraction[("parser_extraction_seconds_count", None, "ok")] == 2
+    assert extraction[("parser_extraction_seconds_sum", None, "ok")] == pytest.approx(7.03)
+
+    # Блок timed, завершившийся исключением, попадает в status="error"
+    navigation = _samples(response.text, "parser_navigation_seconds_count")
+    assert navigation == {("parser_navigation_seconds_count", None, "error"): 1}
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src import rate_governor
+from src.rate_governor import GovernorRegistry, RateGovernor
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Фиктивное время модуля: asyncio.sleep только двигает часы"""
+    clock = SimpleNamespace(now=1000.0, sleeps=[])
+
+    async def sleep(seconds: float):
+        clock.sleeps.append(round(seconds, 6))
+        clock.now += seconds
+
+    monkeypatch.setattr(rate_governor, "time", SimpleNamespace(monotonic=lambda: clock.now, time=lambda: clock.now))
+    monkeypatch.setattr(rate_governor, "asyncio", SimpleNamespace(sleep=sleep))
+    monkeypatch.setattr("src.config.settings.pace_jitter", 0.0)
+    return clock
+
+
+def _governor(**kwargs) -> RateGovernor:
+    kwargs = {"min_interval": 2.0, "max_interval": 40.0, "burst": 1, "relax_after": 3, **kwargs}
+    return RateGovernor("yandex", "http://test:9222", 10.0, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_bucket_spaces_navigations_by_interval(clock):
+    governor = _governor(burst=2)
+
+    for _ in range(4):
+        await governor.acquire()
+    # Два перехода из запаса сразу, дальше - по одному в интервал
+    assert clock.sleeps == [10.0, 10.0]
+
+    clock.now += 100
+    clock.sleeps.clear()
+    await governor.acquire()
+    await governor.acquire()
+    # Простой пополняет запас не больше burst
+    assert clock.sleeps == []
+    await governor.acquire()
+    assert clock.sleeps == [10.0]
+
+
+def test_captcha_doubles_interval_up_to_max(clock):
+    governor = _governor()
+
+    governor.record(captcha=True)
+    assert governor.interval == 20.0 and governor.cautious
+    governor.record(captcha=True)
+    governor.record(captcha=True)
+    assert governor.interval == 40.0
+    assert governor.captchas == 3 and governor.last_captcha_at == clock.now
+    assert governor.stats()["captcha_ratio"] == 1.0
+
+
+def test_clean_streak_relaxes_interval_down_to_min():
+    governor = _governor()
+
+    for _ in range(2):
+        governor.record(captcha=False)
+    assert governor.interval == 10.0
+    governor.record(captcha=False)
+    assert governor.interval == 8.5 and not governor.cautious
+
+    # Капча обнуляет серию
+    governor.record(captcha=False)
+    governor.record(captcha=True)
+    for _ in range(2):
+        governor.record(captcha=False)
+    assert governor.interval == 17.0
+
+    for _ in range(200):
+        governor.record(captcha=False)
+    assert governor.interval == 2.0
+
+
+def test_factors_default_from_settings(monkeypatch):
+    monkeypatch.setattr("src.config.settings.pace_min_factor", 0.5)
+    monkeypatch.setattr("src.config.settings.pace_max_factor", 3.0)
+    governor = RateGovernor("google", "http://test:9222", 4.0)
+
+    assert (governor.min_interval, governor.max_interval) == (2.0, 12.0)
+
+
+def test_pressure_is_worst_engine_slowdown_on_endpoint():
+    registry = GovernorRegistry()
+    assert registry.pressure("http://a:9222") == 1.0
+
+    registry.get("yandex", "http://a:9222").record(captcha=True)
+    registry.get("google", "http://a:9222")
+    google_b = registry.get("google", "http://b:9222")
+    for _ in range(3):
+        google_b.record(captcha=True)
+
+    assert registry.pressure("http://a:9222") == 2.0
+    assert registry.pressure("http://b:9222") == 6.0
+    assert registry.get("yandex", "http://a:9222") is registry.get("yandex", "http://a:9222")
@@ -0,0 +1,70 @@
+import os
+import time
+
+from src.result_store import ResultStore
+
+
+def _store(tmp_path, **kwargs) -> ResultStore:
+    return ResultStore(directory=str(tmp_path), retention=60, max_bytes=0, **kwargs)
+
+
+def _flush(store: ResultStore):
+    """Дождаться потока записи, не вызывая purge"""
+    store._executor.submit(lambda: None).result()
+
+
+def test_records_keep_serp_rank(tmp_path):
+    store = _store(tmp_path)
+    # Позиции 2 и 4: соседние результаты отфильтрованы normalize_link
+    store.append("t1", "yandex", 1, ["https://a.ru/", "https://b.ru/"], "кирпич", [2, 4])
+    store.append("t1", "yandex", 2, ["https://c.ru/"], "кирпич")
+    _flush(store)
+
+    records = store.read("t1")
+    store.close()
+
+    assert [(r["page"], r["rank"], r["link"]) for r in records] == [
+        (1, 2, "https://a.ru/"),
+        (1, 4, "https://b.ru/"),
+        (2, None, "https://c.ru/"),
+    ]
+
+
+def test_append_purges_expired_segments_without_rotation(tmp_path):
+    store = _store(tmp_path, purge_interval=1)
+    store.append("old", "yandex", 1, ["https://a.ru/"])
+    _flush(store)
+    # Сегмент "old" давно не пишется и закрыт по возрасту
+    with store._lock:
+        store._conn.execute("UPDATE segments SET created_at = 0, updated_at = 0")
+        store._conn.commit()
+    old_segment = store._segment
+    store._segment_opened = 0
+    store._purged_at = time.time() - 2
+
+    store.append("new", "yandex", 1, ["https://b.ru/"])
+    _flush(store)
+
+    assert store.read("old") == []
+    assert [r["link"] for r in store.read("new")] == ["https://b.ru/"]
+    assert not os.path.exists(os.path.join(str(tmp_path), old_segment))
+    store.close()
+
+
+def test_append_purges_after_interval(tmp_path):
+    store = _store(tmp_path, purge_interval=1, segment_seconds=0)
+    store.append("old", "yandex", 1, ["https://a.ru/"])
+    _flush(store)
+    with store._lock:
+        store._conn.execute(
+            "INSERT INTO segments (name, bytes, created_at, updated_at) VALUES ('results-0.ndjson.gz', 10, 0, 0)"
+        )
+        store._conn.commit()
+    store._purged_at = time.time() - 2
+
+    store.append("old", "yandex", 2, ["https://b.ru/"])
+    _flush(store)
+
+    assert store.stats()["segments"] == 1
+    assert store.purged_segments == 1
+    store.close()
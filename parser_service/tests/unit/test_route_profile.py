@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.route_profile import RouteProfile, take_traffic
+
+
+class _Route:
+    def __init__(self, url: str, resource_type: str = "document"):
+        self.request = SimpleNamespace(url=url, resource_type=resource_type)
+        self.outcome = None
+
+    async def abort(self):
+        self.outcome = "aborted"
+
+    async def continue_(self):
+        self.outcome = "continued"
+
+
+class _Page:
+    """Вкладка, которая запоминает перехватчик page.route и слушателей page.on"""
+
+    def __init__(self, url: str = "https://yandex.ru/search/?text=x"):
+        self.url = url
+        self.handler = None
+        self.listeners = {}
+
+    async def route(self, pattern, handler):
+        self.handler = handler
+
+    def on(self, event, callback):
+        self.listeners[event] = callback
+
+    async def request(self, url: str, resource_type: str = "document") -> str:
+        route = _Route(url, resource_type)
+        await self.handler(route)
+        return route.outcome
+
+    def respond(self, headers: dict):
+        self.listeners["response"](SimpleNamespace(headers=headers))
+
+
+def _profile() -> RouteProfile:
+    return RouteProfile(block_types=["image", "font"], block_hosts=["mc.yandex.ru", "doubleclick.net"])
+
+
+@pytest.mark.asyncio
+async def test_blocks_resource_types_and_tracker_hosts():
+    profile, page = _profile(), _Page()
+    await profile.attach(page)
+
+    assert await page.request("https://yandex.ru/search/?text=x") == "continued"
+    assert await page.request("https://yastatic.net/logo.png", "image") == "aborted"
+    assert await page.request("https://fonts.gstatic.com/a.woff2", "font") == "aborted"
+    assert await page.request("https://mc.yandex.ru/watch/1", "script") == "aborted"
+    # Поддомен трекера блокируется, похожий чужой домен - нет
+    assert await page.request("https://stats.g.doubleclick.net/collect", "xhr") == "aborted"
+    assert await page.request("https://notdoubleclick.net/app.js", "script") == "continued"
+
+    assert profile.stats()["blocked"] == 4 and profile.stats()["allowed"] == 2
+    assert take_traffic(page) == {"requests": 6, "blocked": 4, "bytes": 0}
+
+
+@pytest.mark.asyncio
+async def test_captcha_page_loads_everything():
+    profile, page = _profile(), _Page("https://yandex.ru/showcaptcha?retpath=x")
+    await profile.attach(page)
+
+    assert await page.request("https://yandex.ru/captchaimg?aHR0c", "image") == "continued"
+    assert await page.request("https://mc.yandex.ru/watch/1", "script") == "continued"
+    assert profile.blocked == 0
+
+
+@pytest.mark.asyncio
+async def test_bytes_counted_from_content_length_and_reset_on_take():
+    profile, page = _profile(), _Page()
+    await profile.attach(page)
+
+    page.respond({"content-length": "1500"})
+    page.respond({"content-length": "500"})
+    # Без длины или с мусором в заголовке - не считаем
+    page.respond({})
+    page.respond({"content-length": "abc"})
+
+    assert take_traffic(page) == {"requests": 0, "blocked": 0, "bytes": 2000}
+    assert take_traffic(page) == {"requests": 0, "blocked": 0, "bytes": 0}
+    # Вкладка без профиля
+    assert take_traffic(_Page()) is None
+
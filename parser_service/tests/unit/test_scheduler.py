@@ -0,0 +1,302 @@
+import asyncio
+import time
+
+import pytest
+import pytest_asyncio
+
+from src.browser_pool import BrowserPool
+from src.scheduler import ParseJob, ParseScheduler, parked
+from src.task_feed import TaskFeed
+
+
+async def _until(predicate, timeout: float = 2.0):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(poll(), timeout)
+
+
+class _FakeTask:
+    """job.run как у parse_task: сбор через until_cancelled, ссылки из ленты при отмене"""
+
+    def __init__(self, api, links=(), park=False):
+        self.api = api
+        self.links = list(links)
+        self.park = park
+        self.feed = TaskFeed()
+        self.started = False
+        self.release = asyncio.Event()
+        self.result = None
+
+    async def collect(self) -> set[str]:
+        self.started = True
+        await self.feed.publish("yandex", 1, self.links)
+        if self.park:
+            async with parked():
+                await self.release.wait()
+        await self.release.wait()
+        return set(self.links)
+
+    async def run(self, job: ParseJob):
+        links, cancelled = await self.api.until_cancelled(job, self.collect())
+        if cancelled:
+            links = set(self.feed.links)
+        self.result = {"status": cancelled or "completed", "links": self.feed.ordered(links)}
+
+
+@pytest_asyncio.fixture
+async def scheduler():
+    scheduler = ParseScheduler(workers=1, engine_limits={"yandex": 1})
+    await scheduler.start()
+    yield scheduler
+    await scheduler.stop()
+
+
+def _free_slots(scheduler: ParseScheduler) -> int:
+    return scheduler._slots._value
+
+
+@pytest.mark.asyncio
+async def test_cancel_queued_job_finishes_without_slot(api, scheduler):
+    busy, queued = _FakeTask(api), _FakeTask(api, ["https://a.ru/"])
+    scheduler.submit(ParseJob("busy", busy.run))
+    await _until(lambda: busy.started)
+    job = ParseJob("queued", queued.run)
+    scheduler.submit(job)
+
+    assert scheduler.cancel("queued") is job
+    await _until(lambda: queued.result is not None)
+
+    # Сбор не начинался, единственный слот по-прежнему у busy
+    assert queued.result == {"status": "cancelled", "links": []}
+    assert not queued.started and not job.holds_slot
+    assert _free_slots(scheduler) == 0
+    assert scheduler.cancel("queued") is None
+
+    busy.release.set()
+    await _until(lambda: busy.result is not None)
+    assert busy.result["status"] == "completed"
+    assert _free_slots(scheduler) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_running_job_keeps_collected_links(api, scheduler):
+    task = _FakeTask(api, ["https://a.ru/", "https://b.ru/"])
+    job = ParseJob("running", task.run)
+    scheduler.submit(job)
+    await _until(lambda: task.started)
+
+    scheduler.cancel("running")
+    await _until(lambda: task.result is not None)
+
+    assert task.result == {"status": "cancelled", "links": ["https://a.ru/", "https://b.ru/"]}
+    assert job.cancel_reason == "cancelled"
+    assert _free_slots(scheduler) == 1
+    # Отменённая задача не попадает в оценку длительности
+    assert not scheduler._recent_runs
+
+
+@pytest.mark.asyncio
+async def test_deadline_gives_partial(api, scheduler):
+    task = _FakeTask(api, ["https://a.ru/"])
+    job = ParseJob("slow", task.run, deadline_seconds=0.05)
+    scheduler.submit(job)
+
+    await _until(lambda: task.result is not None)
+
+    assert task.result == {"status": "partial", "links": ["https://a.ru/"]}
+    assert job.cancel_reason == "deadline"
+    assert _free_slots(scheduler) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_parked_job_does_not_reacquire_slot(api, scheduler):
+    captcha = _FakeTask(api, ["https://a.ru/"], park=True)
+    job = ParseJob("captcha", captcha.run)
+    scheduler.submit(job)
+    await _until(lambda: job.parks == 1)
+
+    # Слот припаркованной задачи отдан следующей
+    other = _FakeTask(api)
+    scheduler.submit(ParseJob("other", other.run))
+    await _until(lambda: other.started)
+    assert _free_slots(scheduler) == 0
+
+    scheduler.cancel("captcha")
+    await _until(lambda: captcha.result is not None)
+
+    # Попытка занять слот повисла бы: он у other
+    assert captcha.result == {"status": "cancelled", "links": ["https://a.ru/"]}
+    assert not job.holds_slot and job.parks == 0
+    assert scheduler.stats()["parked"] == 0
+    assert _free_slots(scheduler) == 0
+
+    other.release.set()
+    await _until(lambda: other.result is not None)
+    assert _free_slots(scheduler) == 1
+
+
+@pytest.mark.asyncio
+async def test_parked_job_frees_its_engine_slot(scheduler):
+    captcha_solved = asyncio.Event()
+    progress = []
+
+    async def captcha(job: ParseJob):
+        async with scheduler.engine_slot("yandex"):
+            progress.append("captcha")
+            async with parked():
+                await captcha_solved.wait()
+            progress.append("resumed")
+            assert scheduler.stats()["engines"]["yandex"]["active"] == 1
+
+    async def next_keyword(job: ParseJob):
+        async with scheduler.engine_slot("yandex"):
+            progress.append("next")
+
+    job = ParseJob("captcha", captcha)
+    scheduler.submit(job)
+    await _until(lambda: job.parks == 1)
+    assert scheduler.stats()["engines"]["yandex"]["active"] == 0
+
+    # Лимит Яндекса 1, но следующий ключ не ждёт решения капчи
+    scheduler.submit(ParseJob("next", next_keyword))
+    await _until(lambda: "next" in progress)
+
+    captcha_solved.set()
+    await _until(lambda: job.finished_at is not None)
+    assert progress == ["captcha", "next", "resumed"]
+    assert scheduler.stats()["engines"]["yandex"]["active"] == 0
+    assert _free_slots(scheduler) == 1
+
+
+@pytest.mark.asyncio
+async def test_parked_engine_keeps_sibling_engine_slot():
+    scheduler = ParseScheduler(workers=1, engine_limits={"yandex": 1, "google": 1})
+    await scheduler.start()
+    google_done, captcha_solved = asyncio.Event(), asyncio.Event()
+
+    async def yandex():
+        async with scheduler.engine_slot("yandex"):
+            async with parked():
+                await captcha_solved.wait()
+
+    async def google():
+        async with scheduler.engine_slot("google"):
+            await google_done.wait()
+
+    async def both(job: ParseJob):
+        await asyncio.gather(yandex(), google())
+
+    job = ParseJob("both", both)
+    scheduler.submit(job)
+    await _until(lambda: job.parks == 1)
+
+    engines = scheduler.stats()["engines"]
+    assert engines["yandex"]["active"] == 0 and engines["google"]["active"] == 1
+
+    google_done.set()
+    captcha_solved.set()
+    await _until(lambda: job.finished_at is not None)
+    engines = scheduler.stats()["engines"]
+    assert engines["yandex"]["active"] == 0 and engines["google"]["active"] == 0
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_parked_job_frees_its_browser_lease(scheduler, monkeypatch):
+    pool = BrowserPool("http://127.0.0.1:9222", size=1)
+    pool.tabs = None
+
+    async def connected():
+        pass
+
+    monkeypatch.setattr(pool, "_ensure_connected", connected)
+    captcha_solved = asyncio.Event()
+    leased = []
+
+    async def captcha(job: ParseJob):
+        async with pool.lease():
+            async with parked():
+                await captcha_solved.wait()
+            leased.append(("resumed", pool.active_leases))
+
+    async def next_task(job: ParseJob):
+        async with pool.lease():
+            leased.append(("next", pool.active_leases))
+
+    job = ParseJob("captcha", captcha)
+    scheduler.submit(job)
+    await _until(lambda: job.parks == 1)
+    assert pool.active_leases == 0
+
+    scheduler.submit(ParseJob("next", next_task))
+    await _until(lambda: len(leased) == 1)
+    captcha_solved.set()
+    await _until(lambda: job.finished_at is not None)
+
+    assert leased == [("next", 1), ("resumed", 1)]
+    assert pool.active_leases == 0 and pool.total_leases == 2
+
+
+async def _noop(job: ParseJob):
+    pass
+
+
+def test_rank_ages_one_class_per_aging_period():
+    job = ParseJob("bulk", _noop, priority="bulk", enqueued_at=100.0)
+
+    assert job.rank(100.0, 120) == 2
+    assert job.rank(340.0, 120) == 0
+    # Без старения - только класс
+    assert job.rank(340.0, 0) == 2
+
+
+def test_interactive_jumps_ahead_of_bulk():
+    scheduler = ParseScheduler(workers=1, aging_seconds=120)
+    now = time.monotonic()
+    for i in range(3):
+        scheduler.submit(ParseJob(f"bulk-{i}", _noop, priority="bulk", enqueued_at=now - 10 + i))
+
+    assert scheduler.submit(ParseJob("interactive", _noop, priority="interactive")) == 0
+    assert [job.task_id for job in scheduler._ordered()] == ["interactive", "bulk-0", "bulk-1", "bulk-2"]
+
+
+def test_bulk_waiting_two_aging_periods_goes_before_fresh_interactive():
+    scheduler = ParseScheduler(workers=1, aging_seconds=120)
+    scheduler.submit(ParseJob("bulk", _noop, priority="bulk", enqueued_at=time.monotonic() - 240))
+
+    assert scheduler.submit(ParseJob("interactive", _noop, priority="interactive")) == 1
+    assert scheduler.position("bulk") == 0
+
+
+def test_promote_raises_class_but_never_lowers_it():
+    scheduler = ParseScheduler(workers=1, aging_seconds=120)
+    now = time.monotonic()
+    scheduler.submit(ParseJob("bulk", _noop, priority="bulk", enqueued_at=now - 5))
+    scheduler.submit(ParseJob("interactive", _noop, priority="interactive", enqueued_at=now - 1))
+
+    scheduler.promote("interactive", "bulk")
+    assert scheduler.job_info("interactive")["priority"] == "interactive"
+
+    # К bulk присоединился интерактивный запрос: та же очередь класса, раньше поставлена
+    scheduler.promote("bulk", "interactive")
+    assert [job.task_id for job in scheduler._ordered()] == ["bulk", "interactive"]
+    assert scheduler.stats()["queue_by_priority"] == {"interactive": 2, "normal": 0, "bulk": 0}
+
+
+@pytest.mark.asyncio
+async def test_freed_slot_goes_to_interactive(api, scheduler):
+    busy = _FakeTask(api)
+    scheduler.submit(ParseJob("busy", busy.run))
+    await _until(lambda: busy.started)
+    started = []
+
+    async def run(job: ParseJob):
+        started.append(job.task_id)
+
+    scheduler.submit(ParseJob("bulk", run, priority="bulk"))
+    scheduler.submit(ParseJob("interactive", run, priority="interactive"))
+    busy.release.set()
+    await _until(lambda: len(started) == 2)
+
+    assert started == ["interactive", "bulk"]
@@ -0,0 +1,57 @@
+import pytest
+
+from src.engines import YandexEngine
+from src.parser import SearchParser
+from src.serp_cache import SerpCache
+
+
+def _links(page: int) -> list[str]:
+    return [f"https://p{page}-{i}.ru/" for i in range(3)]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SerpCache(path=str(tmp_path / "serp_cache.sqlite3"), ttl=3600)
+    yield cache
+    cache.close()
+
+
+def test_put_pages_merges_new_pages_into_prefix(cache):
+    cache.put_pages("yandex", "Кирпич", {1: _links(1), 2: _links(2)})
+    cache.put_pages("yandex", "кирпич ", {3: _links(3), 4: _links(4)}, last_page=4)
+
+    pages, reached_last = cache.get_prefix("yandex", "кирпич", 10)
+
+    assert pages == {n: _links(n) for n in range(1, 5)}
+    assert reached_last
+
+
+def test_shallow_entry_is_a_partial_hit(cache):
+    cache.put_pages("yandex", "кирпич", {1: _links(1), 2: _links(2)})
+
+    assert cache.get_prefix("yandex", "кирпич", 4) == ({1: _links(1), 2: _links(2)}, False)
+    assert cache.get_pages("yandex", "кирпич", 4) is None
+    assert cache.stats()["partial_hits"] == 2
+
+
+@pytest.mark.asyncio
+async def test_deeper_request_resumes_after_cached_prefix(cache, monkeypatch):
+    cache.put_pages("yandex", "кирпич", {1: _links(1), 2: _links(2)})
+    parser = SearchParser(cache=cache)
+    fetched_from = []
+
+    async def fetch(session, engine, keyword, query, depth, collected_links):
+        fetched_from.append(engine.start_page)
+        for n in range(engine.start_page, depth + 1):
+            engine.page_links[n] = _links(n)
+            collected_links.update(_links(n))
+
+    monkeypatch.setattr(parser, "_fetch_engine", fetch)
+    collected = set()
+    await parser._run_engine(None, YandexEngine(), "кирпич", "кирпич", 4, collected)
+
+    assert fetched_from == [3]
+    assert parser.cache_resumed == ["yandex"]
+    assert collected == {link for n in range(1, 5) for link in _links(n)}
+    # Следующий запрос той же глубины - полное попадание
+    assert cache.get_pages("yandex", "кирпич", 4) == {n: _links(n) for n in range(1, 5)}
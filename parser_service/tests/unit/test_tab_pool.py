@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from src.route_profile import RouteProfile
+from src.tab_pool import HOME_URLS, TabPool
+
+
+class _Page:
+    def __init__(self, context: "_Context", opener: "_Page" = None):
+        self.context = context
+        self.url = "about:blank"
+        self._opener = opener
+        self._closed = False
+        self.routes = []
+        self.listeners = []
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    async def close(self):
+        self._closed = True
+
+    async def goto(self, url: str, **kwargs):
+        self.url = self.context.redirects.get(url, url)
+
+    async def opener(self):
+        return self._opener
+
+    async def route(self, pattern: str, handler):
+        self.routes.append(pattern)
+
+    def on(self, event: str, callback):
+        self.listeners.append(event)
+
+
+class _Context:
+    def __init__(self):
+        self.pages: list[_Page] = []
+        self.redirects: dict[str, str] = {}
+        self._on_page = None
+
+    async def new_page(self) -> _Page:
+        page = _Page(self)
+        self.pages.append(page)
+        return page
+
+    def on(self, event: str, handler):
+        self._on_page = handler
+
+    def open_window(self, opener: _Page = None) -> _Page:
+        """Окно, открытое не через new_page (target=_blank или пользователь)"""
+        page = _Page(self, opener)
+        self.pages.append(page)
+        self._on_page(page)
+        return page
+
+
+async def _settle(pool: TabPool):
+    await asyncio.gather(*list(pool._background))
+
+
+def _pool(**kwargs) -> tuple[TabPool, _Context]:
+    kwargs = {"warm_size": 0, "max_uses": 30, "idle_seconds": 600, **kwargs}
+    pool, context = TabPool(**kwargs), _Context()
+    pool.bind(context)
+    return pool, context
+
+
+@pytest.mark.asyncio
+async def test_released_tab_is_reused_by_same_engine():
+    pool, _ = _pool()
+    page = await pool.acquire("Google")
+    await pool.release(page)
+
+    # Дополнительная вкладка "Google#1" берётся из того же пула
+    assert await pool.acquire("Google#1") is page
+    assert await pool.acquire("Yandex") is not page
+    assert pool.stats()["created"] == 2 and pool.stats()["reused"] == 1
+
+
+@pytest.mark.asyncio
+async def test_warm_tab_is_opened_on_engine_home_page():
+    pool, context = _pool(warm_size=1)
+    busy = await pool.acquire("Yandex")
+    await _settle(pool)
+
+    warm = await pool.acquire("Yandex")
+    assert warm is not busy and warm.url == HOME_URLS["yandex"]
+    assert pool.stats()["reused"] == 1
+
+    # Прогрев упёрся в капчу - вкладка закрывается, а не ждёт в пуле
+    context.redirects[HOME_URLS["google"]] = "https://www.google.com/sorry/index"
+    await pool.acquire("Google")
+    await _settle(pool)
+    assert pool.stats()["engines"]["google"] == {"busy": 1, "idle": 0}
+
+
+@pytest.mark.asyncio
+async def test_tab_is_recycled_after_max_uses():
+    pool, _ = _pool(max_uses=2)
+    page = await pool.acquire("Yandex")
+    await pool.release(page)
+    assert await pool.acquire("Yandex") is page
+    await pool.release(page)
+
+    assert page.is_closed() and pool.recycled == 1
+    assert await pool.acquire("Yandex") is not page
+
+
+@pytest.mark.asyncio
+async def test_sweep_closes_tabs_idle_too_long():
+    pool, _ = _pool(idle_seconds=60)
+    stale, fresh = await pool.acquire("Yandex"), await pool.acquire("Yandex")
+    await pool.release(stale)
+    await pool.release(fresh)
+    pool._tabs[stale].released_at -= 120
+
+    await pool.sweep()
+
+    assert stale.is_closed() and not fresh.is_closed()
+    assert pool.stats()["open_tabs"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_or_captcha_tabs_are_not_returned():
+    pool, _ = _pool()
+    failed, captcha = await pool.acquire("Yandex"), await pool.acquire("Yandex")
+    captcha.url = "https://yandex.ru/showcaptcha?retpath=x"
+
+    await pool.release(failed, reusable=False)
+    await pool.release(captcha)
+
+    assert failed.is_closed() and captcha.is_closed()
+    assert pool.stats()["open_tabs"] == 0
+
+
+@pytest.mark.asyncio
+async def test_popups_of_pool_tabs_are_closed():
+    pool, context = _pool()
+    tab = await pool.acquire("Google")
+
+    popup = context.open_window(opener=tab)
+    user_tab = context.open_window()
+    await _settle(pool)
+
+    assert popup.is_closed() and pool.leaked_closed == 1
+    # Вкладки пользователя в профиле Chrome пул не трогает
+    assert not user_tab.is_closed()
+
+
+@pytest.mark.asyncio
+async def test_route_profile_is_attached_once_per_warm_tab():
+    pool, _ = _pool()
+    profile = RouteProfile(block_types=["image"], block_hosts=[])
+    page = await pool.acquire("Yandex")
+    await profile.attach(page)
+    await pool.release(page)
+
+    reused = await pool.acquire("Yandex")
+    await profile.attach(reused)
+
+    assert reused is page
+    assert page.routes == ["**/*"] and page.listeners == ["response"]
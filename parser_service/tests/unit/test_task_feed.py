@@ -0,0 +1,33 @@
+import pytest
+
+from src.task_feed import TaskFeed
+
+
+@pytest.mark.asyncio
+async def test_mirror_keeps_only_pages_within_depth():
+    feed = TaskFeed()
+    await feed.publish("yandex", 1, ["https://a.ru/"])
+    await feed.publish("yandex", 3, ["https://c.ru/"])
+
+    view = feed.mirror(2)
+    await feed.publish("yandex", 4, ["https://d.ru/"])
+    await feed.publish("google", 2, ["https://b.ru/", "https://c.ru/"])
+
+    # c.ru впервые пришла со страницы 3, но Google нашёл её на 2-й
+    assert view.links == ["https://a.ru/", "https://b.ru/", "https://c.ru/"]
+    assert view.chunks(1) == [
+        {"offset": 1, "engine": "google", "page": 2, "keyword": None, "links": ["https://b.ru/", "https://c.ru/"]}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_detached_mirror_is_not_closed_with_leader():
+    feed = TaskFeed()
+    kept, detached = feed.mirror(1), feed.mirror(1)
+    feed.detach(detached)
+
+    await feed.publish("yandex", 1, ["https://a.ru/"])
+    await feed.close("cancelled")
+
+    assert kept.links == ["https://a.ru/"] and kept.status == "cancelled"
+    assert detached.links == [] and detached.status is None
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.task_store import TaskStore
+
+
+def _store(tmp_path, **kwargs) -> TaskStore:
+    kwargs.setdefault("ttl", 60)
+    return TaskStore(path=str(tmp_path / "tasks.sqlite3"), **kwargs)
+
+
+def _flush(store: TaskStore):
+    store._executor.submit(lambda: None).result()
+
+
+def _stored(store: TaskStore) -> dict[str, str]:
+    with store._lock:
+        return dict(store._conn.execute("SELECT task_id, status FROM tasks").fetchall())
+
+
+def test_evicted_task_is_read_back_from_disk(tmp_path):
+    store = _store(tmp_path, max_memory=2)
+    for task_id in ("a", "b", "c"):
+        store[task_id] = {"status": "completed", "links": [f"https://{task_id}.ru/"]}
+    _flush(store)
+
+    # "a" вытеснена из памяти, но не потеряна
+    assert list(store._memory) == ["b", "c"]
+    assert store["a"]["links"] == ["https://a.ru/"]
+    assert list(store._memory) == ["c", "a"]
+    assert store.stats()["in_memory"] == 2 and store.stats()["stored"] == 3
+    store.close()
+
+
+def test_tasks_survive_restart(tmp_path):
+    store = _store(tmp_path)
+    store["t1"] = {"status": "completed", "links": ["https://a.ru/"]}
+    store.close()
+
+    store = _store(tmp_path)
+    assert store.get("t1") == {"status": "completed", "links": ["https://a.ru/"]}
+    assert store.get("missing") is None
+    store.close()
+
+
+def test_mark_interrupted_fails_unfinished_tasks(tmp_path):
+    store = _store(tmp_path)
+    store["queued"] = {"status": "queued"}
+    store["running"] = {"status": "running"}
+    store["done"] = {"status": "completed"}
+    store.close()
+
+    store = _store(tmp_path)
+    assert store.mark_interrupted() == 2
+    _flush(store)
+
+    assert _stored(store) == {"queued": "failed", "running": "failed", "done": "completed"}
+    assert "restarted" in store["running"]["error"]
+    assert store.mark_interrupted() == 0
+    store.close()
+
+
+def test_purge_drops_expired_tasks_from_disk_and_memory(tmp_path):
+    store = _store(tmp_path)
+    store["old"] = {"status": "completed"}
+    store["new"] = {"status": "completed"}
+    _flush(store)
+    with store._lock:
+        store._conn.execute("UPDATE tasks SET updated_at = 0 WHERE task_id = 'old'")
+        store._conn.commit()
+
+    assert store.purge_expired() == 1
+    assert "old" not in store and "new" in store
+    assert _stored(store) == {"new": "completed"}
+    store.close()
+
+
+def test_updates_of_one_task_are_written_once(tmp_path):
+    store = _store(tmp_path, max_memory=1)
+    gate = threading.Event()
+    # Поток записи занят - обновления копятся в очереди
+    store._executor.submit(gate.wait)
+    for done in range(1, 4):
+        store["batch"] = {"status": "running", "done": done}
+    store["other"] = {"status": "queued"}
+
+    # Вытеснена из памяти и ещё не записана - читается из очереди
+    assert store["batch"]["done"] == 3
+    assert store.stats()["pending_writes"] == 2
+    gate.set()
+    _flush(store)
+
+    assert store.stats()["pending_writes"] == 0
+    assert _stored(store) == {"batch": "running", "other": "queued"}
+    store.close()
+
+
+def test_pop_cancels_pending_write(tmp_path):
+    store = _store(tmp_path)
+    gate = threading.Event()
+    store._executor.submit(gate.wait)
+    store["t1"] = {"status": "queued"}
+
+    assert store.pop("t1") == {"status": "queued"}
+    gate.set()
+    _flush(store)
+
+    assert "t1" not in store and _stored(store) == {}
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_periodic_purge_runs_off_the_event_loop(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    monkeypatch.setattr(TaskStore, "PURGE_EVERY", 2)
+    store["old"] = {"status": "completed"}
+    await store.flush()
+    with store._lock:
+        store._conn.execute("UPDATE tasks SET updated_at = 0")
+        store._conn.commit()
+
+    store["new"] = {"status": "completed"}
+    await store.flush()
+    # Колбэк очистки памяти выполняется на loop
+    await asyncio.sleep(0)
+
+    assert "old" not in store._memory
+    assert _stored(store) == {"new": "completed"}
+    store.close()